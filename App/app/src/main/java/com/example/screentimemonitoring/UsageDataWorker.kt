@@ -15,7 +15,9 @@ import okhttp3.Request
 import okhttp3.RequestBody.Companion.toRequestBody
 import org.json.JSONArray
 import org.json.JSONObject
+import java.io.ByteArrayOutputStream
 import java.io.IOException
+import java.util.zip.GZIPOutputStream
 import java.util.Calendar
 
 
@@ -24,6 +26,8 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
 
     companion object {
         private const val TAG = "WorkerDebug"
+        private const val UPLOAD_PREFS = "upload_prefs"
+        private const val KEY_PENDING_PAYLOAD = "pending_payload"
     }
 
     override suspend fun doWork(): Result {
@@ -35,13 +39,26 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
         }
 
         return try {
-            val (jsonArray, totalScreenTimeSeconds) = getDailyUsageData()
+            // Retry WorkManager mengirim ulang snapshot yang sama (captured_at sama),
+            // jadi server mengenalinya sebagai duplikat, bukan baris baru
+            val payload = loadPendingPayload() ?: run {
+                val (jsonArray, totalScreenTimeSeconds) = getDailyUsageData()
+                buildPayload(jsonArray, totalScreenTimeSeconds).also { savePendingPayload(it) }
+            }
 
-            sendDataToServer(jsonArray, totalScreenTimeSeconds)
+            sendDataToServer(payload)
+            clearPendingPayload()
 
             Log.d(TAG, "Worker SUCCEEDED: Data sent to server.")
             Result.success()
 
+        } catch (e: PermanentUploadException) {
+
+            // Server menolak payload (4xx): kirim ulang tidak akan berhasil
+            Log.e(TAG, "Worker FAILED (rejected): ${e.message}. Snapshot dibuang.")
+            clearPendingPayload()
+            Result.failure()
+
         } catch (e: Exception) {
 
             Log.e(TAG, "Worker FAILED (Network/Logic Error): ${e.message}", e)
@@ -204,8 +221,7 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
         notificationManager.notify(1, notification)
     }
 
-    @Throws(IOException::class)
-    private fun sendDataToServer(jsonArray: JSONArray, totalScreenTimeSeconds: Long) {
+    private fun buildPayload(jsonArray: JSONArray, totalScreenTimeSeconds: Long): JSONObject {
         val finalPayload = JSONObject()
         val deviceId = android.provider.Settings.Secure.getString(
             applicationContext.contentResolver,
@@ -215,14 +231,49 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
         finalPayload.put("device_id", deviceId)
         finalPayload.put("total_screen_time_s", totalScreenTimeSeconds)
         finalPayload.put("usage_data", jsonArray)
+        // Kunci idempotency: dibuat sekali per snapshot dan ikut disimpan bersama
+        // payload, jadi kiriman ulang snapshot yang sama tidak disimpan dua kali
+        finalPayload.put("captured_at", System.currentTimeMillis())
+        return finalPayload
+    }
+
+    // Snapshot yang belum diterima server (2xx) disimpan agar retry memakai payload yang sama
+    private fun uploadPrefs() =
+        applicationContext.getSharedPreferences(UPLOAD_PREFS, Context.MODE_PRIVATE)
+
+    private fun loadPendingPayload(): JSONObject? {
+        val stored = uploadPrefs().getString(KEY_PENDING_PAYLOAD, null) ?: return null
+        return try {
+            JSONObject(stored)
+        } catch (e: org.json.JSONException) {
+            Log.e(TAG, "Snapshot tertunda rusak, dibuang: ${e.message}")
+            null
+        }
+    }
 
+    private fun savePendingPayload(payload: JSONObject) {
+        uploadPrefs().edit().putString(KEY_PENDING_PAYLOAD, payload.toString()).commit()
+    }
+
+    private fun clearPendingPayload() {
+        uploadPrefs().edit().remove(KEY_PENDING_PAYLOAD).commit()
+    }
+
+    class PermanentUploadException(message: String) : IOException(message)
+
+    @Throws(IOException::class)
+    private fun sendDataToServer(finalPayload: JSONObject) {
         val client = OkHttpClient()
         val mediaType = "application/json; charset=utf-8".toMediaType()
-        val body = finalPayload.toString().toRequestBody(mediaType)
+        // Body dikompres gzip; server membaca header Content-Encoding
+        val compressed = ByteArrayOutputStream()
+        GZIPOutputStream(compressed).use { it.write(finalPayload.toString().toByteArray(Charsets.UTF_8)) }
+        val body = compressed.toByteArray().toRequestBody(mediaType)
         val fullUrl = "${ServerConfig.BASE_URL}/receive_usage"
 
         val request = Request.Builder()
             .url(fullUrl)
+            .header("Content-Encoding", "gzip")
             .post(body)
             .build()
 
@@ -231,6 +282,9 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
             val responseBody = response.body?.string()
             Log.d(TAG, "Response: code=${response.code}, body=$responseBody")
 
+            if (response.code in 400..499 && response.code != 408 && response.code != 429) {
+                throw PermanentUploadException("HTTP FAILED: ${response.code}")
+            }
             if (!response.isSuccessful) {
                 throw IOException("HTTP FAILED: ${response.code}")
             }
@@ -238,6 +292,12 @@ class UsageDataWorker(appContext: Context, workerParams: WorkerParameters) :
             if (responseBody != null) {
                 val json = JSONObject(responseBody)
 
+                // 202: server masih memproses, belum ada level stres baru
+                if (!json.has("level")) {
+                    Log.d(TAG, "Data diterima (${response.code}), level belum tersedia")
+                    return
+                }
+
                 val level = json.optString("level", "rendah")
                 val message = json.optString("message", "")
                 val prefs = applicationContext.getSharedPreferences(
@@ -15,6 +15,8 @@ import seaborn as sns
 from datetime import datetime
 import os
 
+import report_render
+
 try:
     import fuzzy_logic
     print("✅ Modul 'fuzzy_logic' berhasil diimpor.")
@@ -49,6 +51,18 @@ YOUR_TEST_CASES = [
     # (screentime, temp, humid, air_quality, "Deskripsi Anda"),
 ]
 
+# Jumlah proses untuk render figur (None = sebanyak CPU, maksimal 5; 1 = berurutan)
+RENDER_WORKERS = None
+
+# Lewati figur yang input, kode plot dan rule base fuzzy-nya tidak berubah sejak
+# render terakhir (manifest: <output_dir>/render_manifest.json). False = render semua.
+REPORT_CACHE = True
+
+# Plot progresi: di atas PROGRESSION_MAX_POINTS titik kurva di-downsample (LTTB),
+# di atas PROGRESSION_LABEL_ALL titik hanya nilai ekstrem & perpindahan kategori diberi label
+PROGRESSION_MAX_POINTS = 2000
+PROGRESSION_LABEL_ALL = 50
+
 
 
 # ====================================
@@ -80,20 +94,8 @@ def generate_from_test_cases(test_cases):
 # VISUALIZATION FUNCTIONS
 # ====================================
 
-def create_visualizations(df, output_dir='case_results'):
-    """Create all 5 visualization types"""
-    
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Set style
-    plt.style.use('seaborn-v0_8-darkgrid')
-    sns.set_palette("husl")
-    
-    print("\n🎨 Creating Visualizations...\n")
-    
-    # ========================================
-    # 1. MAIN DASHBOARD (2x3 grid)
-    # ========================================
+@report_render.produces('01_main_dashboard.png')
+def plot_main_dashboard(df, output_dir):
     fig1, axes = plt.subplots(2, 3, figsize=(18, 10))
     fig1.suptitle('Custom Test Cases - Fuzzy Logic Analysis Dashboard', 
                   fontsize=16, fontweight='bold')
@@ -162,10 +164,10 @@ def create_visualizations(df, output_dir='case_results'):
     fig1.savefig(f'{output_dir}/01_main_dashboard.png', dpi=300, bbox_inches='tight')
     print("✅ [1/5] Main Dashboard (2x3 grid)")
     plt.close(fig1)
-    
-    # ========================================
-    # 2. CORRELATION HEATMAP
-    # ========================================
+
+
+@report_render.produces('02_correlation_heatmap.png', columns=['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value'])
+def plot_correlation_heatmap(df, output_dir):
     fig2, ax = plt.subplots(figsize=(10, 8))
     numeric_cols = ['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value']
     corr_matrix = df[numeric_cols].corr()
@@ -180,10 +182,10 @@ def create_visualizations(df, output_dir='case_results'):
     fig2.savefig(f'{output_dir}/02_correlation_heatmap.png', dpi=300, bbox_inches='tight')
     print("✅ [2/5] Correlation Heatmap")
     plt.close(fig2)
-    
-    # ========================================
-    # 3. BOX PLOTS BY CATEGORY
-    # ========================================
+
+
+@report_render.produces('03_boxplots_by_category.png', columns=['screentime', 'temperature', 'air_quality', 'category'])
+def plot_boxplots(df, output_dir):
     fig3, axes = plt.subplots(1, 3, figsize=(15, 5))
     fig3.suptitle('Input Variables Distribution by Stress Category', 
                   fontsize=14, fontweight='bold')
@@ -201,10 +203,10 @@ def create_visualizations(df, output_dir='case_results'):
     fig3.savefig(f'{output_dir}/03_boxplots_by_category.png', dpi=300, bbox_inches='tight')
     print("✅ [3/5] Box Plots by Category")
     plt.close(fig3)
-    
-    # ========================================
-    # 4. VALIDATION TABLE
-    # ========================================
+
+
+@report_render.produces('04_validation_table.png')
+def plot_validation_table(df, output_dir):
     fig4, ax = plt.subplots(figsize=(16, len(df)*0.5 + 2))
     ax.axis('tight')
     ax.axis('off')
@@ -257,19 +259,31 @@ def create_visualizations(df, output_dir='case_results'):
     plt.savefig(f'{output_dir}/04_validation_table.png', dpi=300, bbox_inches='tight')
     print("✅ [4/5] Validation Table")
     plt.close(fig4)
-    
-    # ========================================
-    # 5. LINE PLOT PROGRESSION
-    # ========================================
+
+
+@report_render.produces('05_line_plot_progression.png', columns=['stress_value'])
+def plot_progression(df, output_dir):
     fig5, ax = plt.subplots(figsize=(14, 6))
     
     # Sort by stress value for better visualization
-    df_sorted = df.sort_values('stress_value').reset_index(drop=True)
+    stress_sorted = np.sort(df['stress_value'].to_numpy())
+    x = np.arange(len(stress_sorted))
+    
+    if len(x) > PROGRESSION_LABEL_ALL:
+        labeled = report_render.key_points(stress_sorted, [35, 65])
+    else:
+        labeled = x
     
     # Plot line
-    ax.plot(range(len(df_sorted)), df_sorted['stress_value'], 
-            marker='o', linewidth=2, markersize=8, color='purple',
-            label='Stress Value')
+    if len(x) > PROGRESSION_MAX_POINTS:
+        shown = np.union1d(report_render.lttb(x, stress_sorted, PROGRESSION_MAX_POINTS), labeled)
+        ax.plot(x[shown], stress_sorted[shown], linewidth=2, color='purple',
+                label=f'Stress Value ({len(shown)} dari {len(x)} titik)')
+        ax.plot(x[labeled], stress_sorted[labeled], 'o', markersize=8, color='purple')
+    else:
+        ax.plot(x, stress_sorted, 
+                marker='o', linewidth=2, markersize=8, color='purple',
+                label='Stress Value')
     
     # Add boundaries
     ax.axhline(y=35, color='green', linestyle=':', linewidth=2, 
@@ -278,13 +292,13 @@ def create_visualizations(df, output_dir='case_results'):
                label='Medium/High Boundary')
     
     # Shade regions
-    ax.fill_between(range(len(df_sorted)), 0, 35, alpha=0.2, color='green')
-    ax.fill_between(range(len(df_sorted)), 35, 65, alpha=0.2, color='yellow')
-    ax.fill_between(range(len(df_sorted)), 65, 100, alpha=0.2, color='red')
+    ax.fill_between([0, len(x) - 1], 0, 35, alpha=0.2, color='green')
+    ax.fill_between([0, len(x) - 1], 35, 65, alpha=0.2, color='yellow')
+    ax.fill_between([0, len(x) - 1], 65, 100, alpha=0.2, color='red')
     
-    # Add value labels
-    for i, row in df_sorted.iterrows():
-        ax.text(i, row['stress_value'] + 3, f"{row['stress_value']:.1f}", 
+    # Add value labels (semua titik, atau ekstrem & perpindahan kategori)
+    for i in labeled:
+        ax.text(i, stress_sorted[i] + 3, f"{stress_sorted[i]:.1f}", 
                 ha='center', fontsize=7, bbox=dict(facecolor='white', 
                 alpha=0.7, boxstyle='round,pad=0.3'))
     
@@ -300,6 +314,27 @@ def create_visualizations(df, output_dir='case_results'):
     fig5.savefig(f'{output_dir}/05_line_plot_progression.png', dpi=300, bbox_inches='tight')
     print("✅ [5/5] Line Plot Progression")
     plt.close(fig5)
+
+
+FIGURES = [
+    plot_main_dashboard,
+    plot_correlation_heatmap,
+    plot_boxplots,
+    plot_validation_table,
+    plot_progression,
+]
+
+
+def create_visualizations(df, output_dir='case_results'):
+    """Create all 5 visualization types"""
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print("\n🎨 Creating Visualizations...\n")
+    
+    # Setiap figur dirender di proses terpisah (lihat report_render.py)
+    report_render.render_figures(FIGURES, df, output_dir, workers=RENDER_WORKERS,
+                                 cache=REPORT_CACHE)
     
     print(f"\n✅ All visualizations saved to: {output_dir}/\n")
 
@@ -0,0 +1,147 @@
+"""
+Resolver path folder perangkat di DATA_FOLDER.
+
+Layout:
+- "flat"    : data/device_<id>/                      (layout lama)
+- "sharded" : data/devices/<h1>/<h2>/device_<id>/    (h1/h2 = 2 karakter
+              pertama dan berikutnya dari sha1(device_id))
+
+Dengan puluhan ribu perangkat, satu folder datar membuat lookup direktori
+dan backup lambat; layout sharded membatasi isi setiap folder ke ~256 entri.
+
+Layout yang dipakai dicatat di data/layout.json. Tanpa file itu, folder
+data yang sudah berisi device_* dianggap "flat" (instalasi lama), dan
+folder data baru langsung memakai "sharded".
+
+Migrasi folder lama (jalankan saat server mati):
+    python data_layout.py migrate --data data
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+LAYOUT_FILENAME = "layout.json"
+DEVICE_PREFIX = "device_"
+SHARD_ROOT = "devices"
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+LAYOUT_FLAT = "flat"
+LAYOUT_SHARDED = "sharded"
+
+
+def shard_parts(device_id, levels=SHARD_LEVELS, width=SHARD_WIDTH):
+    digest = hashlib.sha1(device_id.encode("utf-8")).hexdigest()
+    return [digest[i * width:(i + 1) * width] for i in range(levels)]
+
+
+def _has_flat_devices(data_folder):
+    if not os.path.isdir(data_folder):
+        return False
+    with os.scandir(data_folder) as entries:
+        return any(e.is_dir() and e.name.startswith(DEVICE_PREFIX) for e in entries)
+
+
+class DataLayout:
+    def __init__(self, data_folder="data"):
+        self.data_folder = data_folder
+        self.layout, self.levels, self.width = self._load()
+
+    def _load(self):
+        path = os.path.join(self.data_folder, LAYOUT_FILENAME)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+            return config["layout"], config.get("levels", SHARD_LEVELS), config.get("width", SHARD_WIDTH)
+        if _has_flat_devices(self.data_folder):
+            return LAYOUT_FLAT, SHARD_LEVELS, SHARD_WIDTH
+        return LAYOUT_SHARDED, SHARD_LEVELS, SHARD_WIDTH
+
+    def save(self):
+        os.makedirs(self.data_folder, exist_ok=True)
+        path = os.path.join(self.data_folder, LAYOUT_FILENAME)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"layout": self.layout, "levels": self.levels, "width": self.width}, f)
+        os.replace(tmp_path, path)
+
+    def ensure(self):
+        """Catat layout hasil deteksi agar tidak berubah di start berikutnya."""
+        if not os.path.isfile(os.path.join(self.data_folder, LAYOUT_FILENAME)):
+            self.save()
+            print(f"[LAYOUT] Folder data memakai layout '{self.layout}'")
+
+    # --- RESOLVER ---
+    def device_folder(self, device_id):
+        name = f"{DEVICE_PREFIX}{device_id}"
+        if self.layout == LAYOUT_FLAT:
+            return os.path.join(self.data_folder, name)
+        return os.path.join(self.data_folder, SHARD_ROOT, *shard_parts(device_id, self.levels, self.width), name)
+
+    def dataset_path(self, device_id):
+        """File dataset aktif perangkat (untuk skrip analisis)."""
+        return os.path.join(self.device_folder(device_id), f"dataset_{device_id}.csv")
+
+    def iter_devices(self):
+        """Yield (device_id, folder) untuk semua perangkat yang punya folder."""
+        if self.layout == LAYOUT_FLAT:
+            roots = [self.data_folder]
+        else:
+            roots = [os.path.join(self.data_folder, SHARD_ROOT)]
+            for _ in range(self.levels):
+                roots = [e.path for root in roots if os.path.isdir(root)
+                         for e in os.scandir(root) if e.is_dir()]
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.is_dir() and entry.name.startswith(DEVICE_PREFIX):
+                        yield entry.name[len(DEVICE_PREFIX):], entry.path
+
+
+# ====================================
+# MIGRASI
+# ====================================
+def migrate(data_folder="data", dry_run=False):
+    """Pindahkan data/device_<id> ke layout sharded. Aman dijalankan ulang."""
+    layout = DataLayout(data_folder)
+    flat = DataLayout(data_folder)
+    flat.layout = LAYOUT_FLAT
+    layout.layout = LAYOUT_SHARDED
+
+    moved = 0
+    for device_id, folder in list(flat.iter_devices()):
+        target = layout.device_folder(device_id)
+        if os.path.exists(target):
+            print(f"[MIGRASI] Lewati {folder}: {target} sudah ada")
+            continue
+        print(f"[MIGRASI] {folder} -> {target}")
+        if not dry_run:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.rename(folder, target)
+        moved += 1
+
+    if not dry_run:
+        layout.save()
+    print(f"[MIGRASI] {moved} folder perangkat {'akan ' if dry_run else ''}dipindahkan; layout = sharded")
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Layout folder data perangkat")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="pindahkan folder device_* ke layout sharded")
+    migrate_parser.add_argument("--data", default="data", help="folder data server")
+    migrate_parser.add_argument("--dry-run", action="store_true")
+    resolve_parser = sub.add_parser("resolve", help="tampilkan folder untuk satu device_id")
+    resolve_parser.add_argument("device_id")
+    resolve_parser.add_argument("--data", default="data")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.data, args.dry_run)
+    else:
+        print(DataLayout(args.data).device_folder(args.device_id))
@@ -0,0 +1,106 @@
+"""
+Index idempotency untuk upload smartphone.
+
+WorkManager/OkHttp bisa mengirim ulang laporan yang sebenarnya sudah
+disimpan (mis. respons timeout). Setiap laporan membawa kunci idempotency
+(header Idempotency-Key, atau device_id + captured_at). Index ini:
+- menyimpan kunci terakhir (maks `capacity`) dalam LRU in-memory -> cek O(1)
+  tanpa membaca ulang file dataset
+- mengingat respons laporan asli, sehingga kiriman ulang mendapat level yang sama
+- mem-persist kunci yang selesai ke file JSON lines, dimuat ulang saat start
+
+Alur: claim(key) sebelum diproses, lalu complete(key, respons) jika berhasil
+atau release(key) jika gagal (agar retry tetap bisa masuk).
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_FILENAME = "idempotency_keys.jsonl"
+
+_PENDING = object()
+
+
+class DedupIndex:
+    def __init__(self, path, capacity=10000):
+        self.path = path
+        self.capacity = capacity
+        self._entries = OrderedDict()  # key -> respons (atau _PENDING)
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # baris terakhir bisa terpotong saat crash
+                self._log_lines += 1
+                self._entries[entry["key"]] = entry.get("response")
+                self._entries.move_to_end(entry["key"])
+                if len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def claim(self, key):
+        """(True, None) jika kunci baru; (False, respons/None) jika duplikat.
+
+        Respons None pada duplikat berarti laporan asli masih diproses.
+        """
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                response = self._entries[key]
+                return False, (None if response is _PENDING else response)
+            self.misses += 1
+            self._entries[key] = _PENDING
+            self._evict()
+            return True, None
+
+    def complete(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            self._evict()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "response": response}) + "\n")
+            self._log_lines += 1
+            if self._log_lines > 2 * self.capacity:
+                self._compact()
+
+    def release(self, key):
+        with self._lock:
+            if self._entries.get(key) is _PENDING:
+                del self._entries[key]
+
+    def _evict(self):
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def _compact(self):
+        # Tulis ulang log hanya dengan kunci yang masih ada di LRU
+        tmp_path = self.path + ".tmp"
+        lines = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, response in self._entries.items():
+                if response is _PENDING:
+                    continue
+                f.write(json.dumps({"key": key, "response": response}) + "\n")
+                lines += 1
+        os.replace(tmp_path, self.path)
+        self._log_lines = lines
+
+
+def load_default(data_folder="data", capacity=10000):
+    return DedupIndex(os.path.join(data_folder, DEFAULT_FILENAME), capacity)
@@ -0,0 +1,329 @@
+"""
+Penyimpanan detail penggunaan aplikasi per perangkat.
+
+Format yang didukung:
+- "csv"   : format lama, satu baris penuh per aplikasi untuk setiap snapshot
+- "delta" : hanya menyimpan perubahan per aplikasi sejak snapshot sebelumnya,
+            dengan keyframe (snapshot penuh) secara berkala
+
+Kedua format bisa menyimpan nama paket/aplikasi sebagai id dari
+package_dict.PackageDictionary (kolom package_id/app_id).
+
+Pembaca (iter_snapshots / read_detail_rows) mengenali format dari header
+file dan selalu mengembalikan snapshot penuh dengan nama asli.
+"""
+
+import csv
+import gzip
+import os
+import threading
+
+DETAIL_HEADER = ["timestamp_received", "package_name", "app_name", "foreground_time_s"]
+DELTA_HEADER = ["timestamp_received", "kind", "package_name", "app_name", "foreground_time_s"]
+INTERNED_DETAIL_HEADER = ["timestamp_received", "package_id", "app_id", "foreground_time_s"]
+INTERNED_DELTA_HEADER = ["timestamp_received", "kind", "package_id", "app_id", "foreground_time_s"]
+
+# Jumlah snapshot delta sebelum keyframe berikutnya (15 menit x 24 = 6 jam)
+KEYFRAME_INTERVAL = 24
+
+KIND_KEYFRAME = "K"   # baris snapshot penuh
+KIND_DELTA = "D"      # perubahan foreground_time_s (nilai baru - nilai lama)
+KIND_REMOVED = "X"    # aplikasi keluar dari daftar top apps
+KIND_UNCHANGED = "U"  # snapshot tanpa perubahan sama sekali
+
+# path -> {"apps": {package: (app_name, fg)}, "since_keyframe": int, "day": str}
+_delta_state = {}
+_lock = threading.Lock()
+
+# Statistik cache snapshot delta (hit = cukup tulis delta, miss = keyframe tanpa state)
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def detail_filename(device_id, fmt="csv", interned=False):
+    suffix = ".delta" if fmt == "delta" else ""
+    if interned:
+        suffix += ".ids"
+    return f"detail_{device_id}{suffix}.csv"
+
+
+def _encoder(dictionary):
+    if dictionary is None:
+        return lambda name: name
+    # String kosong tetap kosong (penanda "tidak berubah" di format delta)
+    return lambda name: dictionary.intern(name) if name != "" else ""
+
+
+def _to_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _snapshot_from_usage(usage_list):
+    apps = {}
+    for usage_item in usage_list:
+        package = usage_item.get("package", "N/A")
+        apps[package] = (
+            usage_item.get("app_name", "N/A"),
+            usage_item.get("foreground_time_s", 0)
+        )
+    return apps
+
+
+def _write_csv_rows(path, timestamp, usage_list, dictionary=None, exists=None):
+    if exists is None:
+        exists = os.path.isfile(path)
+    encode = _encoder(dictionary)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not exists:
+            writer.writerow(DETAIL_HEADER if dictionary is None else INTERNED_DETAIL_HEADER)
+
+        for usage_item in usage_list:
+            writer.writerow([
+                timestamp,
+                encode(usage_item.get("package", "N/A")),
+                encode(usage_item.get("app_name", "N/A")),
+                usage_item.get("foreground_time_s", 0)
+            ])
+        return f.tell()
+
+
+def _write_delta_rows(path, timestamp, usage_list, dictionary=None, exists=None):
+    if exists is None:
+        exists = os.path.isfile(path)
+    apps = _snapshot_from_usage(usage_list)
+    day = timestamp[:10]
+
+    state = _delta_state.get(path)
+    cache_stats["hits" if state is not None else "misses"] += 1
+    # Keyframe jika: file baru, state belum ada (server baru start),
+    # interval tercapai, atau hari berganti (counter harian Android reset)
+    need_keyframe = (
+        not exists
+        or state is None
+        or state["since_keyframe"] >= KEYFRAME_INTERVAL
+        or state["day"] != day
+    )
+
+    rows = []
+    if need_keyframe:
+        for package, (app_name, fg) in apps.items():
+            rows.append([timestamp, KIND_KEYFRAME, package, app_name, fg])
+        since_keyframe = 0
+    else:
+        previous = state["apps"]
+        for package, (app_name, fg) in apps.items():
+            if package not in previous:
+                rows.append([timestamp, KIND_DELTA, package, app_name, fg])
+                continue
+            old_name, old_fg = previous[package]
+            if fg != old_fg or app_name != old_name:
+                # app_name dikosongkan jika sama dengan sebelumnya
+                rows.append([
+                    timestamp, KIND_DELTA, package,
+                    app_name if app_name != old_name else "",
+                    fg - old_fg
+                ])
+        for package in previous:
+            if package not in apps:
+                rows.append([timestamp, KIND_REMOVED, package, "", ""])
+        if not rows:
+            rows.append([timestamp, KIND_UNCHANGED, "", "", ""])
+        since_keyframe = state["since_keyframe"] + 1
+
+    encode = _encoder(dictionary)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not exists:
+            writer.writerow(DELTA_HEADER if dictionary is None else INTERNED_DELTA_HEADER)
+        for timestamp_, kind, package, app_name, fg in rows:
+            writer.writerow([timestamp_, kind, encode(package), encode(app_name), fg])
+        size = f.tell()
+
+    _delta_state[path] = {"apps": apps, "since_keyframe": since_keyframe, "day": day}
+    return size
+
+
+def append_detail(path, timestamp, usage_list, fmt="csv", dictionary=None, exists=None):
+    """Tulis satu snapshot detail aplikasi ke file sesuai format.
+
+    Jika `dictionary` diberikan, nama paket/aplikasi disimpan sebagai id.
+    `exists` boleh diisi pemanggil yang sudah tahu file ada. Mengembalikan
+    ukuran file setelah menulis.
+    """
+    with _lock:
+        if fmt == "delta":
+            return _write_delta_rows(path, timestamp, usage_list, dictionary, exists)
+        return _write_csv_rows(path, timestamp, usage_list, dictionary, exists)
+
+
+def reset_delta_state(path=None):
+    """Lupakan snapshot terakhir sehingga penulisan berikutnya berupa keyframe."""
+    with _lock:
+        if path is None:
+            _delta_state.clear()
+        else:
+            _delta_state.pop(path, None)
+
+
+def forget_folder(folder):
+    """Buang snapshot terakhir untuk semua file di `folder` (ditulis proses lain)."""
+    prefix = os.path.join(folder, "")
+    with _lock:
+        for path in [p for p in _delta_state if p.startswith(prefix)]:
+            del _delta_state[path]
+
+
+# ====================================
+# PEMBACA
+# ====================================
+def _sorted_snapshot(apps):
+    return sorted(
+        ((package, app_name, fg) for package, (app_name, fg) in apps.items()),
+        key=lambda item: item[2],
+        reverse=True
+    )
+
+
+def _iter_csv_snapshots(reader):
+    current_ts = None
+    apps = {}
+    for row in reader:
+        if len(row) < 4:
+            continue
+        timestamp, package, app_name, fg = row[0], row[1], row[2], row[3]
+        if timestamp != current_ts:
+            if current_ts is not None:
+                yield current_ts, _sorted_snapshot(apps)
+            current_ts = timestamp
+            apps = {}
+        apps[package] = (app_name, _to_number(fg))
+    if current_ts is not None:
+        yield current_ts, _sorted_snapshot(apps)
+
+
+def _iter_delta_snapshots(reader):
+    current_ts = None
+    apps = {}
+    synced = False  # False sampai keyframe pertama ditemukan
+    for row in reader:
+        if len(row) < 5:
+            continue
+        timestamp, kind, package, app_name, fg = row[0], row[1], row[2], row[3], row[4]
+
+        if timestamp != current_ts:
+            if current_ts is not None and synced:
+                yield current_ts, _sorted_snapshot(apps)
+            current_ts = timestamp
+            if kind == KIND_KEYFRAME:
+                apps = {}
+                synced = True
+
+        if kind == KIND_KEYFRAME:
+            apps[package] = (app_name, _to_number(fg))
+        elif kind == KIND_DELTA:
+            old_name, old_fg = apps.get(package, (app_name, 0))
+            apps[package] = (app_name or old_name, old_fg + _to_number(fg))
+        elif kind == KIND_REMOVED:
+            apps.pop(package, None)
+
+    if current_ts is not None and synced:
+        yield current_ts, _sorted_snapshot(apps)
+
+
+def _iter_raw_snapshots(path):
+    """Snapshot dengan token mentah (nama atau id) + flag apakah file memakai id."""
+    if not os.path.isfile(path):
+        return
+
+    # Segmen arsip (segments.py) disimpan sebagai .csv.gz
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        interned = header in (INTERNED_DETAIL_HEADER, INTERNED_DELTA_HEADER)
+        if header in (DELTA_HEADER, INTERNED_DELTA_HEADER):
+            snapshots = _iter_delta_snapshots(reader)
+        else:
+            snapshots = _iter_csv_snapshots(reader)
+        for timestamp, apps in snapshots:
+            yield timestamp, apps, interned
+
+
+def _require_dictionary(dictionary, path):
+    if dictionary is None:
+        raise ValueError(f"{path} menyimpan id paket; berikan PackageDictionary untuk membacanya")
+
+
+def iter_snapshots(path, dictionary=None):
+    """Yield (timestamp, [(package, app_name, foreground_time_s), ...]) per snapshot."""
+    for timestamp, apps, interned in _iter_raw_snapshots(path):
+        if interned:
+            _require_dictionary(dictionary, path)
+            apps = [(dictionary.name(p), dictionary.name(a), fg) for p, a, fg in apps]
+        yield timestamp, apps
+
+
+def _iter_rows_in_range(path, start, end):
+    for timestamp, apps, interned in _iter_raw_snapshots(path):
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and timestamp > end:
+            break
+        for package, app_name, fg in apps:
+            yield timestamp, package, app_name, fg, interned
+
+
+def read_detail_rows(path, start=None, end=None, dictionary=None):
+    """Baris detail penuh (format lama) untuk snapshot dalam rentang [start, end]."""
+    rows = []
+    for timestamp, package, app_name, fg, interned in _iter_rows_in_range(path, start, end):
+        if interned:
+            _require_dictionary(dictionary, path)
+            package, app_name = dictionary.name(package), dictionary.name(app_name)
+        rows.append([timestamp, package, app_name, fg])
+    return rows
+
+
+def load_detail_dataframe(path, start=None, end=None, dictionary=None, categorical=True):
+    """DataFrame detail dengan kolom yang sama seperti detail_<id>.csv.
+
+    Dengan `categorical=True` kolom package_name/app_name bertipe category;
+    untuk file ber-id, kode kategori diambil langsung dari id kamus tanpa
+    membuat string per baris.
+    """
+    import pandas as pd
+
+    timestamps, packages, app_names, fgs = [], [], [], []
+    interned = False
+    for timestamp, package, app_name, fg, interned in _iter_rows_in_range(path, start, end):
+        timestamps.append(timestamp)
+        packages.append(package)
+        app_names.append(app_name)
+        fgs.append(fg)
+
+    if interned:
+        _require_dictionary(dictionary, path)
+        if categorical:
+            packages = dictionary.categorical(packages)
+            app_names = dictionary.categorical(app_names)
+        else:
+            packages = [dictionary.name(p) for p in packages]
+            app_names = [dictionary.name(a) for a in app_names]
+
+    df = pd.DataFrame({
+        "timestamp_received": timestamps,
+        "package_name": packages,
+        "app_name": app_names,
+        "foreground_time_s": fgs,
+    })
+    if categorical and not interned:
+        df["package_name"] = df["package_name"].astype("category")
+        df["app_name"] = df["app_name"].astype("category")
+    return df
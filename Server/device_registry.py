@@ -0,0 +1,139 @@
+"""
+Registry perangkat in-memory.
+
+Dimuat sekali saat start dengan memindai folder perangkat; perangkat
+baru ditambahkan saat kontak pertama. Untuk setiap perangkat disimpan
+path file, apakah file (beserta header) sudah ada, ukuran file, jumlah
+baris dataset, dan waktu first/last seen. Dengan begitu jalur ingest tidak
+perlu makedirs/isfile/getsize di setiap request; filesystem hanya disentuh
+untuk menulis data.
+
+Setiap perangkat juga membawa tren stres in-memory (trends.DeviceTrend).
+
+Jika file diubah dari luar proses ini (rotasi, worker lain), panggil
+forget(folder) agar status file diperiksa ulang sekali di kontak berikutnya.
+"""
+
+import os
+import threading
+from datetime import datetime
+
+import trends
+
+
+class DeviceInfo:
+    __slots__ = (
+        "device_id", "folder", "overall_csv", "detail_csv",
+        "first_seen", "last_seen", "reports",
+        "overall_exists", "detail_exists", "overall_bytes", "detail_bytes", "overall_rows",
+        "probed", "trend", "pending_writes",
+    )
+
+    def __init__(self, device_id, folder, overall_csv, detail_csv):
+        self.device_id = device_id
+        self.folder = folder
+        self.overall_csv = overall_csv
+        self.detail_csv = detail_csv
+        self.first_seen = None  # None jika perangkat sudah ada sebelum server start
+        self.last_seen = None
+        self.reports = 0        # laporan sejak server start
+        self.overall_rows = None
+        self.probed = False
+        self.trend = trends.DeviceTrend()
+        # (journal seq, record) yang gagal ditulis ke CSV, ditulis ulang sebelum laporan berikutnya
+        self.pending_writes = []
+
+    def probe(self):
+        """Baca status file dari disk (sekali, atau setelah forget)."""
+        self.overall_exists, self.overall_bytes = _stat(self.overall_csv)
+        self.detail_exists, self.detail_bytes = _stat(self.detail_csv)
+        if self.last_seen is None and self.overall_exists:
+            self.last_seen = datetime.fromtimestamp(os.path.getmtime(self.overall_csv))
+        self.probed = True
+
+    def file_rotated(self, path):
+        if path == self.overall_csv:
+            self.overall_exists, self.overall_bytes = False, 0
+        elif path == self.detail_csv:
+            self.detail_exists, self.detail_bytes = False, 0
+
+    def to_dict(self):
+        return {
+            "device_id": self.device_id,
+            "folder": self.folder,
+            "first_seen": self.first_seen.isoformat() if self.first_seen else None,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "reports": self.reports,
+            "overall_rows": self.overall_rows,
+            "overall_bytes": self.overall_bytes if self.probed else None,
+            "detail_bytes": self.detail_bytes if self.probed else None,
+        }
+
+
+def _stat(path):
+    try:
+        return True, os.path.getsize(path)
+    except OSError:
+        return False, 0
+
+
+class DeviceRegistry:
+    def __init__(self, paths, scan):
+        """`paths(device_id)` -> (folder, dataset csv, detail csv);
+        `scan()` -> iterable (device_id, folder) perangkat yang ada di disk."""
+        self.paths = paths
+        self.scan = scan
+        self._devices = {}
+        self._by_folder = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, device_id):
+        return device_id in self._devices
+
+    def load(self):
+        """Pindai folder data sekali saat start."""
+        start = datetime.now()
+        for device_id, _ in self.scan():
+            self._add(DeviceInfo(device_id, *self.paths(device_id)))
+        elapsed = (datetime.now() - start).total_seconds()
+        print(f"[REGISTRY] {len(self._devices)} perangkat dimuat ({elapsed:.2f}s)")
+
+    def _add(self, info):
+        self._devices[info.device_id] = info
+        self._by_folder[info.folder] = info
+
+    def get(self, device_id):
+        return self._devices.get(device_id)
+
+    def touch(self, device_id, now_dt):
+        """(DeviceInfo, True jika perangkat baru) untuk laporan yang masuk."""
+        info = self._devices.get(device_id)
+        is_new = False
+        if info is None:
+            with self._lock:
+                info = self._devices.get(device_id)
+                if info is None:
+                    info = DeviceInfo(device_id, *self.paths(device_id))
+                    os.makedirs(info.folder, exist_ok=True)
+                    info.first_seen = now_dt
+                    self._add(info)
+                    is_new = True
+        if not info.probed:
+            os.makedirs(info.folder, exist_ok=True)
+            info.probe()
+        info.last_seen = now_dt
+        info.reports += 1
+        return info, is_new
+
+    def forget(self, folder):
+        """File di `folder` mungkin berubah di luar proses ini: periksa ulang nanti."""
+        info = self._by_folder.get(folder)
+        if info is not None:
+            info.probed = False
+            info.overall_rows = None
+
+    def devices(self):
+        return list(self._devices.values())
@@ -1,6 +1,7 @@
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
+import threading
 
 
 screen_universe = np.arange(0, 12, 1) 
@@ -155,6 +156,9 @@ ctrl.Rule(screen['tinggi'] & temp['panas'] & humid['lembab'] & airq['baik'], str
 
 stress_ctrl = ctrl.ControlSystem(rules)
 stress_sim = ctrl.ControlSystemSimulation(stress_ctrl)
+# stress_sim menyimpan input/output di dalam objek, jadi tidak aman dipakai
+# beberapa thread sekaligus (mis. worker antrean ingest di server.py)
+_sim_lock = threading.Lock()
 
 
 def calculate_stress(screentime, temperature, humidity, air_quality):
@@ -166,16 +170,17 @@ def calculate_stress(screentime, temperature, humidity, air_quality):
     print(f"[FUZZY] Input - Screen: {screentime}h, Temp: {temperature}°C, Humid: {humidity}%, AQ: {air_quality}")
     
     try:
-        stress_sim.input['screen'] = screentime
-        stress_sim.input['temperature'] = temperature
-        stress_sim.input['humidity'] = humidity
-        stress_sim.input['air_quality'] = air_quality
-        stress_sim.compute()
-        
-        if 'stress' not in stress_sim.output:
-            raise KeyError("Output 'stress' tidak ditemukan setelah komputasi")
-            
-        value = float(stress_sim.output['stress'])
+        with _sim_lock:
+            stress_sim.input['screen'] = screentime
+            stress_sim.input['temperature'] = temperature
+            stress_sim.input['humidity'] = humidity
+            stress_sim.input['air_quality'] = air_quality
+            stress_sim.compute()
+
+            if 'stress' not in stress_sim.output:
+                raise KeyError("Output 'stress' tidak ditemukan setelah komputasi")
+
+            value = float(stress_sim.output['stress'])
         print(f"[FUZZY] Output - Stress Value: {value}")
         
     except KeyError as e:
@@ -213,6 +218,85 @@ def calculate_stress(screentime, temperature, humidity, air_quality):
 
 
 
+# ====================================
+# EVALUASI BATCH
+# ====================================
+# skfuzzy menerima array sebagai input. Simulasi batch dipisah dari stress_sim:
+# setelah menerima array, sebuah simulasi di-reset jika diberi input tunggal.
+BATCH_SIZE = 5000
+_batch_sim = None
+_batch_lock = threading.Lock()
+
+
+def categorize(values):
+    """Kategori (array string) untuk array stress value, batas sama dengan calculate_stress."""
+    values = np.asarray(values, dtype=float)
+    return np.where(values < 35, "Rendah", np.where(values < 65, "Sedang", "Tinggi"))
+
+
+def _compute_batch(chunk):
+    """Defuzzifikasi satu chunk; NaN untuk baris yang tidak memicu rule.
+
+    skfuzzy menggagalkan seluruh array jika satu baris saja tidak memicu
+    rule (EmptyMembershipError). Kekuatan rule tetap tersimpan setelah
+    kegagalan itu, jadi baris dengan aktivasi nol ditandai NaN dan sisa
+    baris dihitung ulang sekali. Dipanggil dengan _batch_lock dipegang.
+    """
+    _batch_sim.input['screen'] = chunk[:, 0]
+    _batch_sim.input['temperature'] = chunk[:, 1]
+    _batch_sim.input['humidity'] = chunk[:, 2]
+    _batch_sim.input['air_quality'] = chunk[:, 3]
+    try:
+        _batch_sim.compute()
+        return np.asarray(_batch_sim.output['stress'], dtype=float).reshape(len(chunk))
+    except (AssertionError, KeyError, ValueError):
+        firing = np.array([
+            np.broadcast_to(rule.aggregate_firing[_batch_sim], len(chunk))
+            for rule in stress_ctrl.rules
+        ])
+        inactive = firing.max(axis=0) <= 0
+        if not inactive.any():
+            raise
+        values = np.full(len(chunk), np.nan)
+        if not inactive.all():
+            values[~inactive] = _compute_batch(chunk[~inactive])
+        return values
+
+
+def calculate_stress_batch(screentime, temperature, humidity, air_quality):
+    """Versi vektor calculate_stress untuk banyak baris sekaligus.
+
+    Kombinasi input yang sama hanya dihitung sekali. Baris yang tidak
+    memicu rule mana pun mendapat nilai default 50 seperti calculate_stress.
+    Mengembalikan {"stress_value": ndarray, "category": ndarray}.
+    """
+    global _batch_sim
+    inputs = np.column_stack([
+        np.clip(np.asarray(screentime, dtype=float), 0, 12),
+        np.clip(np.asarray(temperature, dtype=float), 10, 46),
+        np.clip(np.asarray(humidity, dtype=float), 0, 100),
+        np.clip(np.asarray(air_quality, dtype=float), 0, 100),
+    ])
+    if len(inputs) == 0:
+        return {"stress_value": np.empty(0), "category": np.empty(0, dtype=str)}
+
+    unique_inputs, inverse = np.unique(inputs, axis=0, return_inverse=True)
+    unique_values = np.empty(len(unique_inputs))
+    with _batch_lock:
+        if _batch_sim is None:
+            _batch_sim = ctrl.ControlSystemSimulation(stress_ctrl)
+        for start in range(0, len(unique_inputs), BATCH_SIZE):
+            chunk = unique_inputs[start:start + BATCH_SIZE]
+            unique_values[start:start + BATCH_SIZE] = _compute_batch(chunk)
+
+    n_default = int(np.isnan(unique_values).sum())
+    unique_values = np.nan_to_num(unique_values, nan=50.0)
+    values = unique_values[inverse.ravel()]
+    print(f"[FUZZY] Batch: {len(inputs)} baris, {len(unique_inputs)} kombinasi input unik"
+          + (f", {n_default} kombinasi tanpa rule aktif (default 50)" if n_default else ""))
+    return {"stress_value": values, "category": categorize(values)}
+
+
 if __name__ == '__main__':
     print("="*60)
     print("TESTING FUZZY LOGIC SYSTEM")
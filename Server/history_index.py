@@ -0,0 +1,217 @@
+"""
+Index sparse timestamp -> byte offset untuk file dataset_<id>.csv.
+
+Setiap INDEX_STRIDE baris, satu entri (row_number, timestamp, offset)
+ditambahkan ke file <csv>.idx saat baris ditulis. Query rentang waktu cukup
+mencari entri terakhir sebelum `start` lalu seek langsung ke offset tersebut,
+tanpa memindai seluruh file.
+
+Timestamp dibandingkan sebagai string ISO 8601 (format datetime.isoformat()
+yang dipakai server), sehingga urutan leksikografis = urutan waktu.
+
+Segmen arsip .csv.gz (lihat segments.py) tidak punya index; query_range
+membacanya secara berurutan, dan offset cursor adalah offset tanpa kompresi.
+"""
+
+import bisect
+import csv
+import gzip
+import io
+import os
+import threading
+from datetime import datetime
+
+INDEX_STRIDE = 64
+
+# path csv -> {"entries": [(row, ts, offset)], "rows": int}
+_state = {}
+_lock = threading.Lock()
+
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def index_path(csv_path):
+    return csv_path + ".idx"
+
+
+def normalize_timestamp(value):
+    """Ubah input query (mis. '2025-12-16') ke format ISO yang sama dengan CSV."""
+    if value is None or value == "":
+        return None
+    return datetime.fromisoformat(value).isoformat()
+
+
+def _format_row(row):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _read_index(csv_path):
+    entries = []
+    path = index_path(csv_path)
+    if os.path.isfile(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) == 3:
+                    entries.append((int(row[0]), row[1], int(row[2])))
+    return entries
+
+
+def _iter_lines(f):
+    """Yield (offset, line_bytes) mulai dari posisi file saat ini."""
+    offset = f.tell()
+    for line in iter(f.readline, b""):
+        yield offset, line
+        offset += len(line)
+
+
+def _parse_line(line):
+    return next(csv.reader([line.decode("utf-8")]), [])
+
+
+def build_index(csv_path):
+    """Bangun ulang index dari awal (untuk file lama yang belum punya .idx)."""
+    entries = []
+    rows = 0
+    if os.path.isfile(csv_path):
+        with open(csv_path, "rb") as f:
+            f.readline()  # header
+            for offset, line in _iter_lines(f):
+                if not line.strip():
+                    continue
+                if rows % INDEX_STRIDE == 0:
+                    entries.append((rows, _parse_line(line)[0], offset))
+                rows += 1
+
+    with open(index_path(csv_path), "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(entries)
+    return {"entries": entries, "rows": rows}
+
+
+def _load_state(csv_path):
+    state = _state.get(csv_path)
+    if state is not None:
+        cache_stats["hits"] += 1
+        return state
+    cache_stats["misses"] += 1
+
+    if os.path.isfile(csv_path) and not os.path.isfile(index_path(csv_path)):
+        state = build_index(csv_path)
+    else:
+        entries = _read_index(csv_path)
+        rows = 0
+        if entries:
+            # Hitung baris setelah entri terakhir saja
+            last_row, _, last_offset = entries[-1]
+            with open(csv_path, "rb") as f:
+                f.seek(last_offset)
+                rows = last_row + sum(1 for _, line in _iter_lines(f) if line.strip())
+        state = {"entries": entries, "rows": rows}
+
+    _state[csv_path] = state
+    return state
+
+
+def append_row(csv_path, row, header, exists=None):
+    """Tambahkan satu baris CSV dan perbarui index jika baris jatuh di stride.
+
+    `exists` boleh diisi pemanggil yang sudah tahu file ada (tanpa cek isfile).
+    Mengembalikan ukuran file setelah menulis.
+    """
+    with _lock:
+        if exists is None:
+            exists = os.path.isfile(csv_path)
+        state = _load_state(csv_path) if exists else {"entries": [], "rows": 0}
+        _state[csv_path] = state
+
+        with open(csv_path, "ab") as f:
+            if not exists:
+                f.write(_format_row(header))
+            offset = f.tell()
+            f.write(_format_row(row))
+            size = f.tell()
+
+        if state["rows"] % INDEX_STRIDE == 0:
+            entry = (state["rows"], str(row[0]), offset)
+            state["entries"].append(entry)
+            mode = "a" if exists else "w"
+            with open(index_path(csv_path), mode, newline="", encoding="utf-8") as f:
+                csv.writer(f).writerow(entry)
+        state["rows"] += 1
+        return size
+
+
+def row_count(csv_path):
+    """Jumlah baris data (tanpa header) menurut state index."""
+    with _lock:
+        if csv_path not in _state and not os.path.isfile(csv_path):
+            return 0
+        return _load_state(csv_path)["rows"]
+
+
+def forget(csv_path):
+    """Buang state in-memory satu file (mis. setelah file dirotasi)."""
+    with _lock:
+        _state.pop(csv_path, None)
+
+
+def forget_folder(folder):
+    """Buang state in-memory untuk semua file di `folder` (ditulis proses lain)."""
+    prefix = os.path.join(folder, "")
+    with _lock:
+        for path in [p for p in _state if p.startswith(prefix)]:
+            del _state[path]
+
+
+def _seek_offset(csv_path, start):
+    with _lock:
+        entries = _load_state(csv_path)["entries"]
+    if not entries:
+        return None
+    if start is None:
+        return entries[0][2]
+    timestamps = [ts for _, ts, _ in entries]
+    # Entri terakhir yang timestamp-nya < start
+    position = bisect.bisect_left(timestamps, start) - 1
+    return entries[max(position, 0)][2]
+
+
+def query_range(csv_path, start=None, end=None, limit=500, cursor=None):
+    """Generator baris (dict) dalam [start, end], maksimal `limit` baris.
+
+    Nilai return generator (StopIteration.value / `yield from`) adalah cursor
+    untuk halaman berikutnya, atau None jika rentang sudah habis.
+    """
+    if not os.path.isfile(csv_path):
+        return None
+
+    compressed = csv_path.endswith(".gz")
+    with (gzip.open if compressed else open)(csv_path, "rb") as f:
+        header = _parse_line(f.readline())
+        if cursor:
+            offset = int(cursor)
+        elif compressed:
+            offset = f.tell()
+        else:
+            offset = _seek_offset(csv_path, start)
+        if offset is None:
+            return None
+        f.seek(offset)
+
+        count = 0
+        for line_offset, line in _iter_lines(f):
+            if not line.strip():
+                continue
+            values = _parse_line(line)
+            timestamp = values[0]
+            if start is not None and timestamp < start:
+                continue
+            if end is not None and timestamp > end:
+                return None
+            if count >= limit:
+                return str(line_offset)
+            yield dict(zip(header, values))
+            count += 1
+    return None
+
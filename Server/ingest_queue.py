@@ -0,0 +1,113 @@
+"""
+Antrean ingest terbatas antara handler HTTP dan pekerjaan fuzzy/penyimpanan.
+
+- submit() langsung gagal dengan QueueFull jika antrean penuh, sehingga
+  handler bisa membalas 429 + Retry-After tanpa ikut menumpuk.
+- Worker thread memproses item satu per satu (FIFO) dan mengisi Future.
+- shutdown() berhenti menerima item baru lalu menunggu antrean habis,
+  jadi laporan yang sudah diterima tidak hilang saat server dimatikan
+  (cek _closed dan put dilakukan di bawah lock yang sama).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as ResultTimeout
+
+_STOP = object()
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"antrean ingest penuh, coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+
+
+class QueueClosed(Exception):
+    pass
+
+
+class IngestQueue:
+    def __init__(self, handler, maxsize=64, workers=2, on_wait=None, on_done=None):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.on_wait = on_wait    # on_wait(detik menunggu di antrean)
+        self.on_done = on_done    # on_done(detik pemrosesan)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._closed = False
+        self._start_lock = threading.Lock()
+        # submit() dan shutdown() berbagi lock ini: tidak ada item yang masuk setelah _closed
+        self._submit_lock = threading.Lock()
+        # Rata-rata waktu proses (EWMA) untuk estimasi Retry-After
+        self._service_time = 0.2
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def retry_after(self):
+        """Perkiraan detik sampai antrean cukup kosong (minimal 1)."""
+        backlog = self.depth() * self._service_time / max(1, self.workers)
+        return max(1, int(backlog + 0.999))
+
+    def submit(self, item):
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise QueueClosed("server sedang shutdown")
+            if not self._threads:
+                self.start()
+            try:
+                self._queue.put_nowait((item, future, time.perf_counter()))
+            except queue.Full:
+                raise QueueFull(self.retry_after())
+        return future
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is _STOP:
+                    return
+                item, future, enqueued = entry
+                started = time.perf_counter()
+                if self.on_wait is not None:
+                    self.on_wait(started - enqueued)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self.handler(item))
+                except BaseException as e:
+                    future.set_exception(e)
+                elapsed = time.perf_counter() - started
+                self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+                if self.on_done is not None:
+                    self.on_done(elapsed)
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout=None):
+        """Tolak item baru, proses semua yang sudah diterima, lalu hentikan worker."""
+        with self._submit_lock:
+            self._closed = True
+        if not self._threads:
+            return
+        pending = self.depth()
+        if pending:
+            print(f"[INGEST] Menunggu {pending} laporan di antrean selesai diproses...")
+        self._queue.join()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -0,0 +1,313 @@
+"""
+Write-ahead journal untuk snapshot smartphone.
+
+Setiap snapshot yang diterima ditulis utuh sebagai satu baris
+"<crc32> <json>" ke journal-<pid>.log SEBELUM ditulis ke dataset/detail CSV.
+Jika server crash di antara kedua penulisan CSV, snapshot bisa diputar
+ulang saat start (replay) sehingga tidak ada snapshot setengah jadi.
+
+Group commit: append() menunggu sampai barisnya di-fsync, tetapi fsync
+dijalankan oleh satu thread flusher setiap `group_commit_s` detik untuk
+semua baris yang terkumpul. Banyak request konkuren berbagi satu fsync.
+
+Checkpoint: setelah snapshot tertulis ke CSV, pemanggil memanggil
+applied(seq). Jika semua snapshot yang pernah di-append sudah diterapkan
+dan file sudah melebihi checkpoint_bytes, journal dikosongkan (beserta
+.log.1), jadi replay setelah crash hanya membaca beberapa ratus KB, bukan
+puluhan MB. Saat shutdown bersih (setelah antrean ingest dikosongkan)
+close() menghapus file journal proses ini.
+
+Jika penulisan CSV gagal, pemanggil memanggil failed(seq): record disalin
+ke journal-<pid>.log.failed (di-fsync) sehingga checkpoint/rotasi tidak
+menghapusnya. File itu baru dihapus setelah semua record di dalamnya
+berhasil ditulis ulang (applied), dan diputar ulang paling awal saat start.
+
+Journal dirotasi ke journal-<pid>.log.1 jika melebihi max_bytes (mis.
+checkpoint tertahan karena beban terus-menerus). Saat rotasi berikutnya
+file .1 lama sudah pasti diterapkan ke CSV atau disalin ke .log.failed
+(penerapan terjadi beberapa milidetik setelah append), jadi aman ditimpa.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+
+FILE_PREFIX = "journal-"
+FILE_SUFFIX = ".log"
+
+
+def _encode(record):
+    payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+    return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+
+
+def _decode(line):
+    """Record dari satu baris, atau None jika baris rusak/terpotong."""
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    crc, payload = line[:8], line[9:-1]
+    try:
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class Journal:
+    def __init__(self, folder, group_commit_s=0.005, max_bytes=16 * 1024 * 1024,
+                 checkpoint_bytes=256 * 1024):
+        self.folder = folder
+        self.group_commit_s = group_commit_s
+        self.max_bytes = max_bytes
+        self.checkpoint_bytes = checkpoint_bytes
+        self.path = None
+        self._cond = threading.Condition()
+        self._fd = None
+        self._size = 0
+        self._written = 0  # nomor urut baris terakhir yang ditulis
+        self._synced = 0   # nomor urut baris terakhir yang sudah di-fsync
+        self._thread = None
+        self._pid = None
+        self._unapplied = {}  # seq -> baris, sudah di-append tapi belum tertulis ke CSV
+        self._failed = set()  # seq yang gagal ditulis, disimpan di file .failed
+        self.appends = 0
+        self.fsyncs = 0
+        self.checkpoints = 0
+        self.failures = 0
+        self.last_batch = 0
+
+    def _open(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
+
+    def append(self, record):
+        """Tulis record dan tunggu sampai tersimpan permanen (fsync)."""
+        line = _encode(record)
+        with self._cond:
+            # Proses hasil fork (gunicorn --preload) memakai file journal sendiri
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.path = os.path.join(self.folder, f"{FILE_PREFIX}{self._pid}{FILE_SUFFIX}")
+                self._open()
+                self._written = self._synced = 0
+                self._unapplied = {}
+                self._failed = set()
+                self._thread = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+                self._thread.start()
+
+            os.write(self._fd, line)
+            self._size += len(line)
+            self._written += 1
+            seq = self._written
+            self._unapplied[seq] = line
+            self.appends += 1
+            self._cond.notify_all()
+            while self._synced < seq:
+                self._cond.wait()
+        return seq
+
+    def applied(self, seq):
+        """Snapshot `seq` sudah diterapkan ke CSV; checkpoint jika tidak ada yang tertunda."""
+        with self._cond:
+            self._unapplied.pop(seq, None)
+            if seq in self._failed:
+                self._failed.discard(seq)
+                if not self._failed and os.path.exists(self.path + ".failed"):
+                    os.remove(self.path + ".failed")
+            if not self._unapplied and self._size >= self.checkpoint_bytes and self._pid == os.getpid():
+                self._checkpoint()
+
+    def failed(self, seq):
+        """Snapshot `seq` gagal ditulis ke CSV: simpan di file .failed sampai applied(seq)."""
+        with self._cond:
+            line = self._unapplied.pop(seq, None)
+            if line is None:
+                return
+            fd = os.open(self.path + ".failed", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._failed.add(seq)
+            self.failures += 1
+
+    def _checkpoint(self):
+        # Semua baris sudah di-fsync (append menunggu fsync) dan diterapkan
+        os.ftruncate(self._fd, 0)
+        self._size = 0
+        if os.path.exists(self.path + ".1"):
+            os.remove(self.path + ".1")
+        self.checkpoints += 1
+
+    def close(self):
+        """Shutdown bersih: hapus journal proses ini jika semua snapshot sudah diterapkan."""
+        with self._cond:
+            if self._fd is None or self._pid != os.getpid():
+                return
+            if self._unapplied:
+                print(f"[JOURNAL] {len(self._unapplied)} snapshot belum diterapkan, "
+                      f"{self.path} disimpan untuk replay")
+                return
+            os.close(self._fd)
+            self._fd = None
+            self._pid = None
+            for path in (self.path, self.path + ".1"):
+                if os.path.exists(path):
+                    os.remove(path)
+            if self._failed:
+                print(f"[JOURNAL] {len(self._failed)} snapshot gagal ditulis, "
+                      f"{self.path}.failed disimpan untuk replay")
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._synced == self._written:
+                    self._cond.wait()
+            # Beri kesempatan request lain ikut dalam fsync yang sama
+            time.sleep(self.group_commit_s)
+            with self._cond:
+                target = self._written
+                fd = self._fd
+            os.fsync(fd)
+            with self._cond:
+                self.last_batch = target - self._synced
+                self._synced = target
+                self.fsyncs += 1
+                if self._size > self.max_bytes:
+                    self._rotate()
+                self._cond.notify_all()
+
+    def _rotate(self):
+        # Baris yang ditulis setelah fsync di atas ikut tersimpan sebelum file ditutup
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._synced = self._written
+        os.replace(self.path, self.path + ".1")
+        self._open()
+
+
+# ====================================
+# REPLAY
+# ====================================
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def orphaned_files(folder):
+    """File journal milik proses yang sudah mati, urut dari yang lebih lama."""
+    if not os.path.isdir(folder):
+        return []
+    files = []
+    for name in os.listdir(folder):
+        if not name.startswith(FILE_PREFIX):
+            continue
+        pid_part = name[len(FILE_PREFIX):].split(".", 1)[0]
+        if not pid_part.isdigit() or _pid_alive(int(pid_part)):
+            continue
+        path = os.path.join(folder, name)
+        rank = 0 if name.endswith(".failed") else 1 if name.endswith(".1") else 2
+        files.append((int(pid_part), rank, os.path.getmtime(path), path))
+    # Urutan proses mengikuti file tertua; untuk pid yang sama .log.failed
+    # (record gagal, lebih tua dari baris sesudahnya) lalu .log.1 lalu .log
+    oldest = {}
+    for pid, _, mtime, _ in files:
+        oldest[pid] = min(mtime, oldest.get(pid, mtime))
+    return [path for pid, rank, _, path in sorted(files, key=lambda f: (oldest[f[0]], f[0], f[1]))]
+
+
+def read_records(path):
+    records = []
+    with open(path, "rb") as f:
+        for line in f:
+            record = _decode(line)
+            if record is not None:
+                records.append(record)
+    return records
+
+
+# ====================================
+# PERBAIKAN EKOR FILE CSV
+# ====================================
+def truncate_torn_tail(path):
+    """Potong baris terakhir yang tidak lengkap (tanpa newline). True jika dipotong."""
+    if not os.path.isfile(path):
+        return False
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return False
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return False
+        chunk = min(size, 64 * 1024)
+        f.seek(size - chunk)
+        data = f.read()
+        keep = size - chunk + data.rfind(b"\n") + 1
+        f.truncate(keep)
+    return True
+
+
+def _tail_lines(path):
+    """(offset, line) baris-baris di ekor file, cukup untuk satu snapshot terakhir."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        chunk = min(size, 256 * 1024)
+        f.seek(size - chunk)
+        data = f.read()
+    base = size - chunk
+    if base > 0:
+        # Baris pertama potongan mungkin tidak utuh
+        skip = data.find(b"\n") + 1
+        base += skip
+        data = data[skip:]
+    lines = []
+    offset = base
+    for line in data.splitlines(keepends=True):
+        lines.append((offset, line))
+        offset += len(line)
+    return lines
+
+
+def last_timestamp(path):
+    if not os.path.isfile(path):
+        return None
+    for _, line in reversed(_tail_lines(path)):
+        if line.strip():
+            timestamp = line.split(b",", 1)[0].decode("utf-8")
+            # Baris header bukan data
+            return None if timestamp.startswith("timestamp") else timestamp
+    return None
+
+
+def truncate_rows_from(path, timestamp):
+    """Hapus baris di ekor file yang timestamp-nya >= `timestamp`."""
+    if not os.path.isfile(path):
+        return False
+    cut = None
+    for offset, line in reversed(_tail_lines(path)):
+        row_ts = line.split(b",", 1)[0].decode("utf-8")
+        if not line.strip() or row_ts.startswith("timestamp") or row_ts < timestamp:
+            break
+        cut = offset
+    if cut is None:
+        return False
+    with open(path, "rb+") as f:
+        f.truncate(cut)
+    return True
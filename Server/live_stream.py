@@ -0,0 +1,139 @@
+"""
+Broadcaster untuk endpoint SSE /stream (update stres per perangkat dan ruangan).
+
+- Jalur ingest cukup memanggil publish(): event dimasukkan ke satu inbox
+  (O(1), tidak bergantung jumlah penonton).
+- Satu thread fan-out menggabungkan (coalesce) event per perangkat/ruangan
+  selama `coalesce_s` detik, lalu hanya mengirim event terbaru ke setiap
+  subscriber yang filternya cocok.
+- Setiap subscriber punya buffer terbatas; klien lambat kehilangan event
+  tertua, bukan memperlambat server.
+
+Catatan: di mode multi-worker setiap proses punya broadcaster sendiri, jadi
+subscriber hanya menerima event yang diproses oleh worker yang sama.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class Subscriber:
+    def __init__(self, devices, rooms, buffer_size):
+        self.devices = set(devices or ())
+        self.rooms = set(rooms or ())
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def wants(self, event):
+        if not self.devices and not self.rooms:
+            return True
+        if event["type"] == "device":
+            return event["device"] in self.devices
+        return event["room"] in self.rooms
+
+    def push(self, event):
+        with self._cond:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(event)
+            self._cond.notify()
+
+    def next_events(self, timeout):
+        """Semua event yang tertunda; list kosong jika timeout (untuk heartbeat)."""
+        with self._cond:
+            if not self.buffer and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self.buffer)
+            self.buffer.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class Broadcaster:
+    def __init__(self, buffer_size=100, coalesce_s=0.5, max_subscribers=500):
+        self.buffer_size = buffer_size
+        self.coalesce_s = coalesce_s
+        self.max_subscribers = max_subscribers
+        self._inbox = deque()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._subs_lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.published = 0
+        self.coalesced = 0
+        self.dropped_closed = 0  # event yang dibuang dari subscriber yang sudah lepas
+
+    # --- sisi ingest ---
+    def publish(self, event):
+        # Tanpa subscriber tidak ada yang perlu dikerjakan
+        if not self._subscribers:
+            return
+        self._inbox.append(event)
+        self.published += 1
+        self._wake.set()
+
+    # --- sisi penonton ---
+    def subscribe(self, devices=None, rooms=None):
+        """Subscriber baru, atau None jika jumlah subscriber sudah maksimum."""
+        self._ensure_thread()
+        with self._subs_lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(devices, rooms, self.buffer_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._subs_lock:
+            self._subscribers.discard(subscriber)
+            self.dropped_closed += subscriber.dropped
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def dropped_total(self):
+        with self._subs_lock:
+            return self.dropped_closed + sum(s.dropped for s in self._subscribers)
+
+    # --- fan-out ---
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sse-broadcaster", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Tunggu sebentar agar update beruntun digabung jadi satu
+            time.sleep(self.coalesce_s)
+            self._wake.clear()
+
+            latest = {}
+            while self._inbox:
+                event = self._inbox.popleft()
+                scope_key = (event["type"], event.get("device") or event.get("room"))
+                if scope_key in latest:
+                    self.coalesced += 1
+                latest[scope_key] = event
+            if not latest:
+                continue
+
+            with self._subs_lock:
+                subscribers = list(self._subscribers)
+            for event in latest.values():
+                event["id"] = next(self._seq)
+                for subscriber in subscribers:
+                    if subscriber.wants(event):
+                        subscriber.push(event)
@@ -0,0 +1,297 @@
+"""
+LOAD TEST - SIMULASI ARMADA SMARTPHONE DAN SENSOR RUANGAN
+==========================================================
+Menjalankan N smartphone virtual (payload sama seperti UsageDataWorker)
+dan M sensor (RealisticSensor dari room_generator.py) terhadap server lokal.
+
+- Kedatangan request bersifat open-loop (Poisson), tidak menunggu respons,
+  sehingga titik jenuh server terlihat dari naiknya latensi/error.
+- Latensi diukur dari waktu kedatangan terjadwal, bukan saat thread pool
+  sempat mengirim, jadi antrean di sisi klien ikut terhitung (tanpa
+  coordinated omission).
+- Perangkat mulai bertahap selama `ramp_s` detik.
+- Hasil (throughput, p50/p95/p99, error rate, timeline per detik) disimpan
+  ke file JSON.
+
+Usage:
+    python load_test.py --phones 200 --sensors 5 --duration 60
+"""
+
+import argparse
+import heapq
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from room_generator import RealisticSensor
+
+# ====================================
+# ⭐ KONFIGURASI DEFAULT ⭐
+# ====================================
+CONFIG = {
+    'server_url': 'http://127.0.0.1:5000',
+    'n_phones': 50,
+    'n_sensors': 3,
+    'phone_rate': 1 / 15.0,      # request per detik per HP (1 per 15 detik)
+    'sensor_rate': 1 / 5.0,      # request per detik per sensor
+    'ramp_s': 10,                # waktu sampai semua perangkat aktif
+    'duration_s': 60,            # lama pengujian (termasuk ramp)
+    'max_workers': 64,           # koneksi paralel maksimum
+    'timeout_s': 10,
+    'random_seed': 42,
+    'output_file': 'load_test_results.json',
+}
+
+APP_POOL = [
+    ("com.mobile.legends", "com.mobile.legends"),
+    ("com.ss.android.ugc.trill", "com.ss.android.ugc.trill"),
+    ("com.whatsapp", "com.whatsapp"),
+    ("com.instagram.android", "com.instagram.android"),
+    ("com.google.android.youtube", "com.google.android.youtube"),
+    ("com.facebook.katana", "com.facebook.katana"),
+    ("com.twitter.android", "com.twitter.android"),
+    ("com.android.chrome", "com.android.chrome"),
+    ("com.miui.home", "System launcher"),
+    ("com.example.screentimemonitoring", "Mentarooms"),
+    ("com.spotify.music", "Spotify"),
+    ("com.shopee.id", "Shopee"),
+]
+
+
+# ====================================
+# PERANGKAT VIRTUAL
+# ====================================
+class SimulatedPhone:
+    """Meniru payload UsageDataWorker: total harian kumulatif + top 10 aplikasi."""
+
+    def __init__(self, rng):
+        self.device_id = f"{rng.getrandbits(64):016x}"
+        self.rng = rng
+        apps = rng.sample(APP_POOL, k=len(APP_POOL))
+        self.usage = {pkg: [name, rng.randint(0, 3600)] for pkg, name in apps}
+
+    def next_payload(self):
+        # Setiap laporan, beberapa aplikasi bertambah waktu foreground-nya
+        for pkg in self.rng.sample(list(self.usage), k=3):
+            self.usage[pkg][1] += self.rng.randint(0, 600)
+
+        top = sorted(self.usage.items(), key=lambda item: item[1][1], reverse=True)[:10]
+        usage_data = [
+            {"package": pkg, "app_name": name, "foreground_time_s": sec}
+            for pkg, (name, sec) in top
+        ]
+        return {
+            "device_id": self.device_id,
+            "total_screen_time_s": sum(sec for _, (_, sec) in top),
+            "usage_data": usage_data,
+        }
+
+
+class SimulatedSensor:
+    def __init__(self, index):
+        self.sensor = RealisticSensor()
+        self.room_id = f"room_{index}"
+
+    def next_payload(self):
+        payload = self.sensor.get_sensor_data()
+        payload["room_id"] = self.room_id
+        return payload
+
+
+# ====================================
+# PENGUKURAN
+# ====================================
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.status = defaultdict(Counter)
+        self.errors = Counter()
+        self.timeline = defaultdict(lambda: {"sent": 0, "ok": 0, "errors": 0, "latencies": []})
+
+    def record(self, kind, second, latency, status, error=None):
+        with self.lock:
+            bucket = self.timeline[second]
+            bucket["sent"] += 1
+            if error is None and 200 <= status < 300:
+                self.latencies[kind].append(latency)
+                bucket["ok"] += 1
+                bucket["latencies"].append(latency)
+            else:
+                bucket["errors"] += 1
+                self.errors[kind] += 1
+            self.status[kind][str(status if error is None else error)] += 1
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def send(kind, url, payload, results, t0, at):
+    # Diukur dari kedatangan terjadwal (t0 + at): waktu menunggu worker pool termasuk latensi
+    start = t0 + at
+    second = int(at)
+    try:
+        response = _session().post(url, json=payload, timeout=CONFIG['timeout_s'])
+        results.record(kind, second, time.perf_counter() - start, response.status_code)
+    except requests.exceptions.RequestException as e:
+        results.record(kind, second, time.perf_counter() - start, 0, type(e).__name__)
+
+
+# ====================================
+# PENJADWAL
+# ====================================
+def run_load_test():
+    rng = random.Random(CONFIG['random_seed'])
+    random.seed(CONFIG['random_seed'])
+
+    phones = [SimulatedPhone(rng) for _ in range(CONFIG['n_phones'])]
+    sensors = [SimulatedSensor(i) for i in range(CONFIG['n_sensors'])]
+    usage_url = f"{CONFIG['server_url']}/receive_usage"
+    sensor_url = f"{CONFIG['server_url']}/receive_sensor"
+
+    # Heap berisi (waktu_kirim, jenis, index); awal tersebar selama ramp
+    schedule = []
+    for i in range(len(phones)):
+        heapq.heappush(schedule, (rng.uniform(0, CONFIG['ramp_s']), "usage", i))
+    for i in range(len(sensors)):
+        heapq.heappush(schedule, (rng.uniform(0, CONFIG['ramp_s']), "sensor", i))
+
+    results = Results()
+    dispatch_lag = []
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=CONFIG['max_workers']) as pool:
+        while schedule:
+            at, kind, index = heapq.heappop(schedule)
+            if at >= CONFIG['duration_s']:
+                break
+            delay = at - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                dispatch_lag.append(-delay)
+
+            if kind == "usage":
+                pool.submit(send, kind, usage_url, phones[index].next_payload(), results, t0, at)
+                rate = CONFIG['phone_rate']
+            else:
+                pool.submit(send, kind, sensor_url, sensors[index].next_payload(), results, t0, at)
+                rate = CONFIG['sensor_rate']
+
+            heapq.heappush(schedule, (at + rng.expovariate(rate), kind, index))
+
+    elapsed = time.perf_counter() - t0
+    return summarize(results, elapsed, dispatch_lag)
+
+
+def summarize(results, elapsed, dispatch_lag):
+    report = {
+        "generated": datetime.now().isoformat(),
+        "config": dict(CONFIG),
+        "elapsed_s": round(elapsed, 3),
+        "dispatch_lag_p99_s": percentile(dispatch_lag, 99),
+        "endpoints": {},
+        "timeline": [],
+    }
+
+    for kind in ("usage", "sensor"):
+        latencies = results.latencies[kind]
+        total = sum(results.status[kind].values())
+        report["endpoints"][kind] = {
+            "requests": total,
+            "ok": len(latencies),
+            "errors": results.errors[kind],
+            "error_rate": round(results.errors[kind] / total, 4) if total else 0.0,
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_s": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies) if latencies else None,
+            },
+            "status": dict(results.status[kind]),
+        }
+
+    for second in sorted(results.timeline):
+        bucket = results.timeline[second]
+        report["timeline"].append({
+            "t": second,
+            "sent": bucket["sent"],
+            "ok": bucket["ok"],
+            "errors": bucket["errors"],
+            "p95_s": percentile(bucket["latencies"], 95),
+        })
+
+    return report
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(" HASIL LOAD TEST")
+    print("=" * 60)
+    for kind, stats in report["endpoints"].items():
+        lat = stats["latency_s"]
+        fmt = lambda v: f"{v * 1000:.1f} ms" if v is not None else "-"
+        print(f"\n[{kind}] {stats['requests']} request, {stats['errors']} error "
+              f"({stats['error_rate'] * 100:.2f}%), {stats['throughput_rps']} req/s")
+        print(f"   p50={fmt(lat['p50'])}  p95={fmt(lat['p95'])}  p99={fmt(lat['p99'])}  max={fmt(lat['max'])}")
+    print(f"\n⏱️  Durasi: {report['elapsed_s']} detik")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test server stress detection")
+    parser.add_argument("--url", dest="server_url")
+    parser.add_argument("--phones", dest="n_phones", type=int)
+    parser.add_argument("--sensors", dest="n_sensors", type=int)
+    parser.add_argument("--phone-rate", dest="phone_rate", type=float, help="request/detik per HP")
+    parser.add_argument("--sensor-rate", dest="sensor_rate", type=float, help="request/detik per sensor")
+    parser.add_argument("--ramp", dest="ramp_s", type=float)
+    parser.add_argument("--duration", dest="duration_s", type=float)
+    parser.add_argument("--workers", dest="max_workers", type=int)
+    parser.add_argument("--output", dest="output_file")
+    args = parser.parse_args()
+    CONFIG.update({k: v for k, v in vars(args).items() if v is not None})
+
+
+if __name__ == "__main__":
+    parse_args()
+
+    print("=" * 60)
+    print("🚦 LOAD TEST - FLEET SIMULATOR")
+    print("=" * 60)
+    print(f"📡 Target: {CONFIG['server_url']}")
+    print(f"📱 HP: {CONFIG['n_phones']} @ {CONFIG['phone_rate']:.3f} req/s")
+    print(f"🌡️  Sensor: {CONFIG['n_sensors']} @ {CONFIG['sensor_rate']:.3f} req/s")
+    print(f"⏱️  Ramp {CONFIG['ramp_s']} s, durasi {CONFIG['duration_s']} s")
+    print("=" * 60)
+
+    report = run_load_test()
+    print_report(report)
+
+    with open(CONFIG['output_file'], "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil disimpan ke: {CONFIG['output_file']}")
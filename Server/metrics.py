@@ -0,0 +1,167 @@
+"""
+Metrik ringan bergaya Prometheus untuk server.
+
+Jalur panas (inc / observe) tidak memakai lock: setiap event hanya
+di-append ke collections.deque (atomic di CPython). Agregasi ke counter dan
+histogram dilakukan saat /metrics di-scrape, atau oleh thread yang kebetulan
+melihat antrean melewati FOLD_THRESHOLD (dengan try-lock, tanpa menunggu).
+
+Gauge dihitung lewat callback hanya saat render(), sehingga tidak menambah
+biaya apa pun di request.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FOLD_THRESHOLD = 10000
+
+_events = deque()
+_fold_lock = threading.Lock()
+
+# name -> {"type", "help", "buckets"}
+_definitions = {}
+# name -> {labels_tuple: value} (counter) / {labels_tuple: [bucket_counts, sum, count]} (histogram)
+_values = {}
+# name -> (help, type, callback)
+_callbacks = {}
+
+
+def define_counter(name, help_text):
+    _definitions[name] = {"type": "counter", "help": help_text, "buckets": None}
+    _values.setdefault(name, {})
+
+
+def define_histogram(name, help_text, buckets=DEFAULT_BUCKETS):
+    _definitions[name] = {"type": "histogram", "help": help_text, "buckets": tuple(buckets)}
+    _values.setdefault(name, {})
+
+
+def register_callback(name, help_text, callback, metric_type="gauge"):
+    """callback() -> angka, atau list (labels_dict, angka)."""
+    _callbacks[name] = (help_text, metric_type, callback)
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    _events.append((name, _labels_key(labels), amount))
+    if len(_events) > FOLD_THRESHOLD:
+        _fold(blocking=False)
+
+
+def observe(name, value, **labels):
+    inc(name, value, **labels)
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def _fold(blocking=True):
+    if not _fold_lock.acquire(blocking=blocking):
+        return
+    try:
+        while True:
+            try:
+                name, key, value = _events.popleft()
+            except IndexError:
+                break
+            definition = _definitions.get(name)
+            if definition is None:
+                continue
+            series = _values[name]
+            if definition["type"] == "counter":
+                series[key] = series.get(key, 0) + value
+            else:
+                buckets = definition["buckets"]
+                state = series.get(key)
+                if state is None:
+                    state = [[0] * len(buckets), 0.0, 0]
+                    series[key] = state
+                for i, upper in enumerate(buckets):
+                    if value <= upper:
+                        state[0][i] += 1
+                        break
+                state[1] += value
+                state[2] += 1
+    finally:
+        _fold_lock.release()
+
+
+def pending_events():
+    return len(_events)
+
+
+def _escape_label(value):
+    # Exposition format: \\, \" dan \n harus di-escape di nilai label
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None):
+    items = list(key)
+    if extra:
+        items += list(extra)
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, _escape_label(v))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render():
+    """Teks exposition format Prometheus (text/plain; version=0.0.4)."""
+    _fold()
+    lines = []
+
+    for name, definition in _definitions.items():
+        lines.append(f"# HELP {name} {definition['help']}")
+        lines.append(f"# TYPE {name} {definition['type']}")
+        series = dict(_values[name])
+        if definition["type"] == "counter":
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            continue
+
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for upper, bucket_count in zip(definition["buckets"], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', upper)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+    for name, (help_text, metric_type, callback) in _callbacks.items():
+        try:
+            result = callback()
+        except Exception as e:
+            print(f"[METRICS] Callback {name} gagal: {type(e).__name__}: {e}")
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if isinstance(result, (int, float)):
+            lines.append(f"{name} {_format_value(result)}")
+        else:
+            for labels, value in result:
+                lines.append(f"{name}{_format_labels(_labels_key(labels))} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+"""
+Kamus nama paket/aplikasi -> id integer kecil.
+
+Nama seperti `com.ss.android.ugc.trill` muncul di setiap baris detail untuk
+setiap snapshot. Dengan kamus ini file detail cukup menyimpan id, dan
+DataFrame analisis memakai kolom categorical yang berbagi satu daftar nama.
+
+File kamus bersifat append-only (id,name); id tidak pernah berubah.
+Penambahan nama baru dikunci dengan flock (jika tersedia) dan selalu membaca
+ulang ekor file lebih dulu, sehingga beberapa worker proses tidak pernah
+memberi id yang sama untuk nama berbeda.
+"""
+
+import csv
+import os
+import threading
+
+DICT_HEADER = ["id", "name"]
+DEFAULT_DICT_FILENAME = "package_dict.csv"
+
+
+class PackageDictionary:
+    def __init__(self, path):
+        self.path = path
+        self._ids = {}
+        self._names = []
+        self._lock = threading.Lock()
+        self._offset = 0  # posisi byte file yang sudah dibaca
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        """Baca entri baru sejak pembacaan terakhir (termasuk tulisan proses lain)."""
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Hanya proses baris lengkap; sisa baris parsial dibaca lain kali
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        for row in csv.reader(data[:end].decode("utf-8").splitlines()):
+            if len(row) < 2 or row == DICT_HEADER:
+                continue
+            self._add(int(row[0]), row[1])
+        self._offset += end
+
+    def _file_lock(self):
+        try:
+            import fcntl
+        except ImportError:
+            return None
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _file_unlock(self, fd):
+        if fd is None:
+            return
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _add(self, name_id, name):
+        # File bisa memuat id yang lebih besar jika ditulis proses lain
+        while len(self._names) <= name_id:
+            self._names.append(None)
+        self._names[name_id] = name
+        self._ids[name] = name_id
+
+    def intern(self, name):
+        """Id untuk `name`; nama baru langsung dipersist ke file kamus."""
+        name = str(name)
+        name_id = self._ids.get(name)
+        if name_id is not None:
+            self.hits += 1
+            return name_id
+
+        with self._lock:
+            fd = self._file_lock()
+            try:
+                self._load()
+                name_id = self._ids.get(name)
+                if name_id is not None:
+                    self.hits += 1
+                    return name_id
+
+                self.misses += 1
+                name_id = len(self._names)
+                exists = os.path.isfile(self.path)
+                with open(self.path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if not exists:
+                        writer.writerow(DICT_HEADER)
+                    writer.writerow([name_id, name])
+                self._load()
+                return name_id
+            finally:
+                self._file_unlock(fd)
+
+    def name(self, name_id):
+        name_id = int(name_id)
+        if name_id >= len(self._names) or self._names[name_id] is None:
+            # Mungkin ditambahkan oleh proses lain
+            with self._lock:
+                self._load()
+        if 0 <= name_id < len(self._names) and self._names[name_id] is not None:
+            return self._names[name_id]
+        raise KeyError(f"id paket tidak dikenal: {name_id}")
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def categorical(self, ids):
+        """pandas.Categorical dari deretan id, memakai seluruh kamus sebagai kategori."""
+        import pandas as pd
+
+        categories = [n if n is not None else f"<unknown:{i}>" for i, n in enumerate(self._names)]
+        return pd.Categorical.from_codes([int(i) for i in ids], categories=categories)
+
+
+def load_default(data_folder="data"):
+    """Kamus bersama milik folder data server."""
+    return PackageDictionary(os.path.join(data_folder, DEFAULT_DICT_FILENAME))
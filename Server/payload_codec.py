@@ -0,0 +1,171 @@
+"""
+Decoder body request dari smartphone dan sensor.
+
+- Content-Encoding: gzip  -> body didekompres dulu (dengan batas ukuran)
+- Content-Type: application/json (default, juga untuk content type lain
+  seperti get_json(force=True) sebelumnya)
+- Content-Type: application/msgpack / application/x-msgpack -> MessagePack
+  (perlu paket `msgpack`; tanpa paket itu request dibalas 415)
+
+Selain bentuk JSON biasa, `usage_data` boleh dikirim ringkas sebagai list
+[package, app_name, foreground_time_s] per aplikasi sehingga key tidak
+diulang di setiap item. Hasil decode selalu dinormalisasi ke bentuk dict
+yang dipakai server.py.
+"""
+
+import json
+import math
+import re
+import zlib
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Batas ukuran body setelah dekompresi (lindungi dari "gzip bomb")
+MAX_DECODED_BYTES = 1024 * 1024
+# Batas jumlah aplikasi per laporan (UsageDataWorker mengirim top 10)
+MAX_USAGE_ITEMS = 500
+
+# device_id/room_id dipakai sebagai nama folder/file dan label metrik
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,128}")
+
+JSON_TYPES = ("application/json", "text/json")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class PayloadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _media_type(content_type):
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def decompress(body, content_encoding):
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    if encoding not in ("gzip", "x-gzip", "deflate"):
+        raise PayloadError(f"Content-Encoding tidak didukung: {encoding}", 415)
+
+    # wbits 47 = deteksi otomatis header zlib/gzip
+    decompressor = zlib.decompressobj(47 if encoding != "deflate" else 15)
+    try:
+        data = decompressor.decompress(body, MAX_DECODED_BYTES + 1)
+    except zlib.error as e:
+        raise PayloadError(f"body {encoding} tidak valid: {e}")
+    if len(data) > MAX_DECODED_BYTES or decompressor.unconsumed_tail:
+        raise PayloadError(f"body melebihi {MAX_DECODED_BYTES} byte setelah dekompresi", 413)
+    return data
+
+
+def decode_body(body, content_type=None, content_encoding=None):
+    """Bytes body request -> object Python (biasanya dict)."""
+    data = decompress(body, content_encoding)
+    if not data:
+        return None
+
+    media_type = _media_type(content_type)
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise PayloadError("MessagePack tidak tersedia di server (pip install msgpack)", 415)
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise PayloadError(f"body MessagePack tidak valid: {e}")
+
+    try:
+        # json.loads menerima bytes langsung (UTF-8/16/32 dideteksi otomatis)
+        return json.loads(data)
+    except ValueError as e:
+        raise PayloadError(f"body JSON tidak valid: {e}")
+
+
+def _number(value, field):
+    # bool adalah subclass int, tapi bukan angka yang valid di sini
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise PayloadError(f"'{field}' harus berupa angka")
+    # json.loads/msgpack menerima NaN, Infinity dan integer yang tidak muat di float
+    try:
+        finite = math.isfinite(value)
+    except OverflowError:
+        finite = False
+    if not finite:
+        raise PayloadError(f"'{field}' harus berupa angka berhingga")
+    return value
+
+
+def _identifier(value, field):
+    if not isinstance(value, str) or not value:
+        raise PayloadError(f"'{field}' harus berupa string")
+    if not IDENTIFIER_PATTERN.fullmatch(value) or value in (".", ".."):
+        raise PayloadError(f"'{field}' mengandung karakter tidak valid")
+    return value
+
+
+def _usage_item(item, index):
+    if isinstance(item, (list, tuple)):
+        if len(item) != 3:
+            raise PayloadError(f"usage_data[{index}] harus [package, app_name, foreground_time_s]")
+        package, app_name, seconds = item
+    elif isinstance(item, dict):
+        package = item.get("package")
+        app_name = item.get("app_name", package)
+        seconds = item.get("foreground_time_s", 0)
+    else:
+        raise PayloadError(f"usage_data[{index}] harus object atau list")
+
+    if not isinstance(package, str) or not package:
+        raise PayloadError(f"usage_data[{index}].package harus berupa string")
+    if not isinstance(app_name, str):
+        app_name = str(app_name)
+    seconds = _number(seconds, f"usage_data[{index}].foreground_time_s")
+    if seconds < 0:
+        raise PayloadError(f"usage_data[{index}].foreground_time_s tidak boleh negatif")
+    return {"package": package, "app_name": app_name, "foreground_time_s": seconds}
+
+
+def validate_usage(data):
+    """Validasi + normalisasi payload /receive_usage."""
+    if not isinstance(data, dict):
+        raise PayloadError("payload harus berupa object")
+
+    device_id = _identifier(data.get("device_id", "unknown_device"), "device_id")
+
+    total = _number(data.get("total_screen_time_s", 0), "total_screen_time_s")
+    if total < 0:
+        raise PayloadError("'total_screen_time_s' tidak boleh negatif")
+
+    usage = data.get("usage_data", [])
+    if not isinstance(usage, list):
+        raise PayloadError("'usage_data' harus berupa list")
+    if len(usage) > MAX_USAGE_ITEMS:
+        raise PayloadError(f"'usage_data' maksimal {MAX_USAGE_ITEMS} item")
+
+    # Waktu snapshot di HP (opsional), bagian dari kunci idempotency
+    captured_at = data.get("captured_at")
+    if captured_at is not None and (isinstance(captured_at, bool) or not isinstance(captured_at, (str, int, float))):
+        raise PayloadError("'captured_at' harus berupa string atau angka")
+
+    normalized = dict(data)
+    normalized["device_id"] = device_id
+    normalized["total_screen_time_s"] = total
+    normalized["usage_data"] = [_usage_item(item, i) for i, item in enumerate(usage)]
+    return normalized
+
+
+def validate_sensor(data):
+    """Validasi payload /receive_sensor; field yang tidak dikirim tetap boleh kosong."""
+    if not isinstance(data, dict):
+        raise PayloadError("payload harus berupa object")
+    if "room_id" in data:
+        # room_id menjadi bagian nama file rollup (data/rooms/) dan label metrik
+        _identifier(data["room_id"], "room_id")
+    for field in ("temperature", "humidity", "air_quality"):
+        if field in data:
+            _number(data[field], field)
+    return data
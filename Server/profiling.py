@@ -0,0 +1,156 @@
+"""
+Profiling request secara sampling untuk handler Flask.
+
+Request diprofil jika lolos sampling (sample_rate) atau membawa header
+profiling (mis. `X-Profile: 1`). Untuk setiap request yang diprofil:
+- cProfile disimpan sebagai <waktu>_<endpoint>_<ms>.prof (buka dengan pstats/snakeviz)
+- thread sampler mencatat stack handler setiap `sample_interval` detik, dan
+  hasilnya diakumulasi ke collapsed.txt (format "a;b;c count" untuk
+  flamegraph.pl / speedscope)
+
+Total ukuran file .prof dibatasi max_bytes; file tertua dihapus lebih dulu.
+Hanya satu request yang diprofil pada satu waktu agar overhead tetap kecil.
+
+Handler yang menyerahkan pekerjaannya ke thread lain (mis. antrean ingest)
+tidak memakai wrap(): keputusan sampling diambil di handler dengan
+claim(), lalu pekerjaan diprofil di thread worker dengan run_claimed()
+(atau slot dilepas dengan release() jika pekerjaan batal dijalankan).
+"""
+
+import cProfile
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, target_thread_id, interval):
+        super().__init__(daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    def __init__(self, output_dir="profiles", sample_rate=0.0, header="X-Profile",
+                 max_bytes=50 * 1024 * 1024, sample_interval=0.001):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.header = header
+        self.max_bytes = max_bytes
+        self.sample_interval = sample_interval
+        self.collapsed = Counter()
+        self._busy = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _should_profile(self):
+        if self.header and request.headers.get(self.header, "").lower() in ("1", "true", "yes"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def wrap(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._should_profile():
+                return func(*args, **kwargs)
+            # Satu request profil dalam satu waktu; sisanya jalan normal
+            if not self._busy.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return self._run_profiled(func, args, kwargs)
+            finally:
+                self._busy.release()
+        return wrapper
+
+    def claim(self):
+        """Keputusan sampling untuk request saat ini; True = slot profil dipegang."""
+        return self._should_profile() and self._busy.acquire(blocking=False)
+
+    def release(self):
+        """Lepas slot dari claim() tanpa menjalankan pekerjaan."""
+        self._busy.release()
+
+    def run_claimed(self, name, func, *args, **kwargs):
+        """Profil func di thread saat ini (slot dari claim()), lalu lepas slotnya."""
+        try:
+            return self._run_profiled(func, args, kwargs, name)
+        finally:
+            self._busy.release()
+
+    def _run_profiled(self, func, args, kwargs, name=None):
+        profiler = cProfile.Profile()
+        sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+        sampler.start()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            sampler.stop()
+            try:
+                self._save(name or func.__name__, profiler, sampler.stacks, elapsed_ms)
+            except OSError as e:
+                print(f"[PROFILE] Gagal menyimpan profil: {e}")
+
+    def _save(self, name, profiler, stacks, elapsed_ms):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        prof_path = os.path.join(self.output_dir, f"{stamp}_{name}_{elapsed_ms:.0f}ms.prof")
+        profiler.dump_stats(prof_path)
+
+        with self._write_lock:
+            self.collapsed.update(stacks)
+            collapsed_path = os.path.join(self.output_dir, "collapsed.txt")
+            tmp_path = collapsed_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for stack, count in self.collapsed.most_common():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp_path, collapsed_path)
+            self._rotate()
+
+        print(f"[PROFILE] {name} {elapsed_ms:.1f} ms -> {prof_path}")
+
+    def _rotate(self):
+        profiles = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and entry.name.endswith(".prof"):
+                stat = entry.stat()
+                profiles.append((stat.st_mtime, stat.st_size, entry.path))
+        profiles.sort()
+
+        total = sum(size for _, size, _ in profiles)
+        for _, size, path in profiles:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
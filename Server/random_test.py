@@ -16,6 +16,8 @@ from datetime import datetime
 import os
 import random
 
+import report_render
+
 try:
     import fuzzy_logic
     print("✅ Modul 'fuzzy_logic' berhasil diimpor.")
@@ -37,6 +39,8 @@ CONFIG = {
     'n_samples': 100,           # Jumlah data yang di-generate
     'random_seed': 42,          # Seed untuk reproducibility (ganti angka untuk hasil berbeda)
     'output_dir': 'random_results',
+    'render_workers': None,     # Proses render figur (None = sebanyak CPU, 1 = berurutan)
+    'report_cache': True,       # Lewati figur yang input & kodenya tidak berubah (lihat report_render.py)
     
     # Distribusi data (dalam persen)
     'distribution': {
@@ -183,20 +187,8 @@ def print_statistics(stats):
 # VISUALIZATIONS
 # ====================================
 
-def create_visualizations(df, output_dir):
-    """Create all visualization plots"""
-    
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Set style
-    plt.style.use('seaborn-v0_8-darkgrid')
-    sns.set_palette("husl")
-    
-    print("🎨 Creating Visualizations...\n")
-    
-    # ========================================
-    # 1. MAIN DASHBOARD (2x3 grid)
-    # ========================================
+@report_render.produces('01_main_dashboard.png')
+def plot_main_dashboard(df, output_dir):
     fig1, axes = plt.subplots(2, 3, figsize=(18, 10))
     fig1.suptitle(f'Random Test Data Analysis - Fuzzy Logic Stress Detection ({len(df)} samples)', 
                   fontsize=16, fontweight='bold')
@@ -279,10 +271,10 @@ def create_visualizations(df, output_dir):
     fig1.savefig(f'{output_dir}/01_main_dashboard.png', dpi=300, bbox_inches='tight')
     print("✅ [1/5] Main Dashboard (2x3 grid)")
     plt.close(fig1)
-    
-    # ========================================
-    # 2. CORRELATION HEATMAP
-    # ========================================
+
+
+@report_render.produces('02_correlation_heatmap.png', columns=['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value'])
+def plot_correlation_heatmap(df, output_dir):
     fig2, ax = plt.subplots(figsize=(10, 8))
     numeric_cols = ['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value']
     corr_matrix = df[numeric_cols].corr()
@@ -297,10 +289,10 @@ def create_visualizations(df, output_dir):
     fig2.savefig(f'{output_dir}/02_correlation_heatmap.png', dpi=300, bbox_inches='tight')
     print("✅ [2/5] Correlation Heatmap")
     plt.close(fig2)
-    
-    # ========================================
-    # 3. BOX PLOTS BY CATEGORY
-    # ========================================
+
+
+@report_render.produces('03_boxplots_by_category.png', columns=['screentime', 'temperature', 'air_quality', 'category'])
+def plot_boxplots(df, output_dir):
     fig3, axes = plt.subplots(1, 3, figsize=(15, 5))
     fig3.suptitle('Input Variables Distribution by Stress Category', 
                   fontsize=14, fontweight='bold')
@@ -318,10 +310,10 @@ def create_visualizations(df, output_dir):
     fig3.savefig(f'{output_dir}/03_boxplots_by_category.png', dpi=300, bbox_inches='tight')
     print("✅ [3/5] Box Plots by Category")
     plt.close(fig3)
-    
-    # ========================================
-    # 4. SAMPLE DATA TABLE (first 20 rows)
-    # ========================================
+
+
+@report_render.produces('04_sample_table.png')
+def plot_sample_table(df, output_dir):
     fig4, ax = plt.subplots(figsize=(16, 12))
     ax.axis('tight')
     ax.axis('off')
@@ -377,10 +369,10 @@ def create_visualizations(df, output_dir):
     plt.savefig(f'{output_dir}/04_sample_table.png', dpi=300, bbox_inches='tight')
     print("✅ [4/5] Sample Data Table")
     plt.close(fig4)
-    
-    # ========================================
-    # 5. STRESS DISTRIBUTION ANALYSIS
-    # ========================================
+
+
+@report_render.produces('05_stress_analysis.png', columns=['stress_value', 'category', 'combined_input'])
+def plot_stress_analysis(df, output_dir):
     fig5, axes = plt.subplots(2, 2, figsize=(14, 10))
     fig5.suptitle('Stress Value Analysis', fontsize=14, fontweight='bold')
     
@@ -416,10 +408,7 @@ def create_visualizations(df, output_dir):
     axes[1, 0].legend()
     axes[1, 0].grid(alpha=0.3)
     
-    # 5.4 Scatter: All variables combined
-    # Create combined score for x-axis
-    df['combined_input'] = (df['screentime']/12 + df['temperature']/40 + 
-                           df['humidity']/100 + df['air_quality']/5) / 4 * 100
+    # 5.4 Scatter: All variables combined (combined_input dihitung di create_visualizations)
     axes[1, 1].scatter(df['combined_input'], df['stress_value'], 
                       c=df['stress_value'], cmap='RdYlGn_r', 
                       s=50, alpha=0.6, edgecolors='black', linewidth=0.5)
@@ -432,6 +421,31 @@ def create_visualizations(df, output_dir):
     fig5.savefig(f'{output_dir}/05_stress_analysis.png', dpi=300, bbox_inches='tight')
     print("✅ [5/5] Stress Distribution Analysis")
     plt.close(fig5)
+
+
+FIGURES = [
+    plot_main_dashboard,
+    plot_correlation_heatmap,
+    plot_boxplots,
+    plot_sample_table,
+    plot_stress_analysis,
+]
+
+
+def create_visualizations(df, output_dir):
+    """Create all visualization plots"""
+    
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print("🎨 Creating Visualizations...\n")
+    
+    # Create combined score for x-axis (plot 5.4, ikut diekspor ke CSV)
+    df['combined_input'] = (df['screentime']/12 + df['temperature']/40 + 
+                           df['humidity']/100 + df['air_quality']/5) / 4 * 100
+    
+    # Setiap figur dirender di proses terpisah (lihat report_render.py)
+    report_render.render_figures(FIGURES, df, output_dir, workers=CONFIG['render_workers'],
+                                 cache=CONFIG['report_cache'])
     
     print(f"\n✅ All visualizations saved to: {output_dir}/\n")
 
@@ -0,0 +1,336 @@
+"""
+Render figur laporan secara paralel (visualization.py, case_test.py, random_test.py).
+
+Dataset yang sudah dihitung disimpan sekali ke folder sementara (Parquet
+jika pyarrow tersedia, selain itu pickle), lalu setiap figur dirender di
+proses terpisah dalam ProcessPoolExecutor. Setiap worker membaca dataset
+sekali dan menyimpannya di cache proses. Waktu render setiap figur dicatat:
+
+    [RENDER] plot_main_dashboard: 2.41s
+    [RENDER] 5 figur dalam 3.02s (3 worker)
+
+Fungsi figur harus didefinisikan di level modul (bisa di-pickle) dengan
+signature figure(df, *args, output_dir) dan tidak boleh mengubah df.
+
+Cache: figur yang ditandai @produces(file, columns) diberi kunci hash dari
+kolom df yang dipakainya, argumen tambahan (mis. ringkasan), kode fungsi
+figur beserta konstanta/fungsi yang dirujuknya (termasuk helper modul proyek
+seperti report_render.lttb), versi rule base fuzzy
+(isi fuzzy_logic.py) dan versi matplotlib/seaborn. Kunci dicatat di
+<output_dir>/render_manifest.json; figur yang kuncinya sama dan file
+hasilnya masih ada tidak dirender ulang.
+
+Untuk plot garis dengan banyak titik tersedia lttb() (Largest-Triangle-
+Three-Buckets) dan key_points() (indeks ekstrem + perpindahan kategori)
+agar jumlah titik & label yang digambar tetap terbatas.
+"""
+
+import fnmatch
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+STYLE = 'seaborn-v0_8-darkgrid'
+PALETTE = 'husl'
+
+MANIFEST_FILENAME = "render_manifest.json"
+
+_dataset_cache = {}
+
+
+def produces(*outputs, columns=None):
+    """Tandai file yang ditulis figur (boleh pola glob) dan kolom df yang dipakainya (None = semua)."""
+    def decorate(figure):
+        figure.outputs = outputs
+        figure.columns = columns
+        return figure
+    return decorate
+
+
+# ====================================
+# KUNCI CACHE
+# ====================================
+def _hash_value(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr(list(value.columns)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(repr(value.name).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f"{value.dtype}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            h.update(repr(key).encode())
+            _hash_value(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+def _referenced_names(code):
+    """co_names fungsi beserta code object bersarang (lambda, comprehension)."""
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names.extend(_referenced_names(const))
+    return names
+
+
+def _is_project_module(module, function):
+    """Modul di folder yang sama dengan fungsi (mis. report_render), bukan library."""
+    module_file = getattr(module, "__file__", None)
+    function_file = inspect.getsourcefile(function)
+    return (module_file is not None and function_file is not None
+            and os.path.dirname(os.path.abspath(module_file)) == os.path.dirname(os.path.abspath(function_file)))
+
+
+def _code_fingerprint(h, function, seen):
+    """Kode fungsi + konstanta/fungsi modul yang dirujuknya (parameter plot).
+
+    Termasuk atribut modul proyek yang dipanggil lewat nama modul, mis.
+    report_render.lttb di visualization.py.
+    """
+    if function in seen:
+        return
+    seen.add(function)
+    h.update(inspect.getsource(function).encode())
+    module_globals = function.__globals__
+    names = _referenced_names(function.__code__)
+    for name in names:
+        value = module_globals.get(name)
+        if inspect.isfunction(value) and value.__module__ == function.__module__:
+            _code_fingerprint(h, value, seen)
+        elif inspect.ismodule(value) and _is_project_module(value, function):
+            for attribute in names:
+                target = getattr(value, attribute, None)
+                if inspect.isfunction(target) and target.__module__ == value.__name__:
+                    _code_fingerprint(h, target, seen)
+                elif isinstance(target, (int, float, str, tuple, list, dict)):
+                    h.update(f"{name}.{attribute}".encode())
+                    _hash_value(h, target)
+        elif isinstance(value, (int, float, str, tuple, list, dict)):
+            h.update(name.encode())
+            _hash_value(h, value)
+
+
+def rulebase_version():
+    """Hash isi fuzzy_logic.py (membership function + rule), tanpa mengimpornya."""
+    spec = importlib.util.find_spec("fuzzy_logic")
+    if spec is None or spec.origin is None:
+        return None
+    with open(spec.origin, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def figure_key(figure, df, args, rulebase=None):
+    import matplotlib
+    import seaborn as sns
+
+    h = hashlib.sha256()
+    h.update(f"{figure.__module__}.{figure.__name__}".encode())
+    _code_fingerprint(h, figure, set())
+    columns = getattr(figure, "columns", None)
+    _hash_value(h, df if columns is None else df[list(columns)])
+    _hash_value(h, args)
+    _hash_value(h, [rulebase, matplotlib.__version__, sns.__version__, STYLE, PALETTE])
+    return h.hexdigest()
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _is_fresh(entry, key, output_dir):
+    if entry is None or entry.get("key") != key or not entry.get("outputs"):
+        return False
+    return all(
+        os.path.isfile(os.path.join(output_dir, name)) and os.path.getsize(os.path.join(output_dir, name)) == size
+        for name, size in entry["outputs"].items()
+    )
+
+
+# ====================================
+# DOWNSAMPLING PLOT GARIS
+# ====================================
+def lttb(x, y, n_out):
+    """Indeks n_out titik yang mempertahankan bentuk kurva (x, y) (LTTB).
+
+    Titik pertama & terakhir selalu dipilih; di setiap bucket dipilih titik
+    yang membentuk segitiga terbesar dengan titik terpilih sebelumnya dan
+    rata-rata bucket berikutnya.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    edges = np.append(edges, n)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x = x[end:edges[i + 2]].mean()
+        next_y = y[end:edges[i + 2]].mean()
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def key_points(y, boundaries):
+    """Indeks nilai minimum, maksimum dan titik pertama setelah y melewati boundaries."""
+    y = np.asarray(y)
+    if len(y) == 0:
+        return np.array([], dtype=int)
+    bands = np.digitize(y, boundaries)
+    transitions = np.flatnonzero(np.diff(bands)) + 1
+    return np.unique(np.concatenate([[np.argmin(y), np.argmax(y)], transitions]))
+
+
+def default_workers(n_figures):
+    return max(1, min(n_figures, os.cpu_count() or 1))
+
+
+def save_dataset(df, args, folder):
+    """Tulis df (+ argumen tambahan) ke `folder`; mengembalikan path dataset."""
+    if PARQUET_AVAILABLE:
+        data_path = os.path.join(folder, "dataset.parquet")
+        df.to_parquet(data_path, index=False)
+    else:
+        data_path = os.path.join(folder, "dataset.pkl")
+        df.to_pickle(data_path)
+    with open(os.path.join(folder, "args.pkl"), "wb") as f:
+        pickle.dump(args, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return data_path
+
+
+def _load_dataset(data_path):
+    cached = _dataset_cache.get(data_path)
+    if cached is None:
+        if data_path.endswith(".parquet"):
+            df = pd.read_parquet(data_path)
+        else:
+            df = pd.read_pickle(data_path)
+        with open(os.path.join(os.path.dirname(data_path), "args.pkl"), "rb") as f:
+            args = pickle.load(f)
+        cached = _dataset_cache[data_path] = (df, args)
+    return cached
+
+
+def _apply_style():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.switch_backend("Agg")
+    plt.style.use(STYLE)
+    sns.set_palette(PALETTE)
+
+
+def _render_one(figure, data_path, output_dir):
+    _apply_style()
+    df, args = _load_dataset(data_path)
+    start = time.perf_counter()
+    figure(df, *args, output_dir)
+    return time.perf_counter() - start
+
+
+def render_figures(figures, df, output_dir, *args, workers=None, cache=True):
+    """Render figur yang berubah; mengembalikan {nama figur: detik} (yang dirender)."""
+    start = time.perf_counter()
+    manifest = load_manifest(output_dir) if cache else {}
+    rulebase = rulebase_version() if cache else None
+
+    keys = {}
+    pending = []
+    for figure in figures:
+        if cache and getattr(figure, "outputs", None):
+            keys[figure.__name__] = figure_key(figure, df, args, rulebase)
+            if _is_fresh(manifest.get(figure.__name__), keys[figure.__name__], output_dir):
+                print(f"[CACHE] {figure.__name__}: tidak berubah, dilewati")
+                continue
+        pending.append(figure)
+
+    workers = workers or default_workers(len(pending))
+    timings = {}
+    if workers <= 1 or len(pending) <= 1:
+        # Tanpa pool: df dipakai langsung, tanpa menulis file sementara
+        workers = 1
+        _apply_style()
+        for figure in pending:
+            figure_start = time.perf_counter()
+            figure(df, *args, output_dir)
+            timings[figure.__name__] = time.perf_counter() - figure_start
+            print(f"[RENDER] {figure.__name__}: {timings[figure.__name__]:.2f}s")
+    else:
+        folder = tempfile.mkdtemp(prefix="render_")
+        try:
+            data_path = save_dataset(df, args, folder)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(figure, pool.submit(_render_one, figure, data_path, output_dir)) for figure in pending]
+                for figure, future in futures:
+                    timings[figure.__name__] = future.result()
+                    print(f"[RENDER] {figure.__name__}: {timings[figure.__name__]:.2f}s")
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    if cache and pending:
+        for figure in pending:
+            if figure.__name__ not in keys:
+                continue
+            outputs = {
+                name: os.path.getsize(os.path.join(output_dir, name))
+                for name in sorted(os.listdir(output_dir))
+                if any(fnmatch.fnmatch(name, pattern) for pattern in figure.outputs)
+            }
+            manifest[figure.__name__] = {
+                "key": keys[figure.__name__],
+                "outputs": outputs,
+                "seconds": round(timings[figure.__name__], 3),
+                "rendered_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        _save_manifest(output_dir, manifest)
+
+    print(f"[RENDER] {len(pending)}/{len(figures)} figur dirender dalam "
+          f"{time.perf_counter() - start:.2f}s ({workers} worker)")
+    return timings
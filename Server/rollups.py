@@ -0,0 +1,201 @@
+"""
+Rollup per jam / per hari yang diperbarui secara inkremental.
+
+Setiap data yang masuk langsung ditambahkan ke bucket yang sedang terbuka
+(count, sum, min, max, last). Ketika data pertama untuk periode berikutnya
+datang, bucket lama ditutup dan ditulis ke file rollup_<resolusi>_<key>.csv
+lewat history_index, sehingga query rentang waktu cukup membaca bucket,
+bukan baris mentah.
+
+Scope:
+- "device" : stress, temperature, humidity, air_quality (per jam)
+             screen_time_s (per hari)
+- "room"   : temperature, humidity, air_quality dari sensor IoT (per jam)
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import history_index
+
+ROLLUP_HEADER = ["bucket_start", "metric", "count", "sum", "min", "max", "last"]
+
+RESOLUTIONS = ("hour", "day")
+
+DEVICE_HOURLY_METRICS = ("stress", "temperature", "humidity", "air_quality")
+DEVICE_DAILY_METRICS = ("screen_time_s",)
+ROOM_HOURLY_METRICS = ("temperature", "humidity", "air_quality")
+
+
+class Bucket:
+    __slots__ = ("count", "sum", "min", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+
+    def merge(self, other):
+        """Gabungkan bucket periode yang sama (other dianggap lebih baru)."""
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.last = other.last
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "avg": round(self.sum / self.count, 4) if self.count else None
+        }
+
+
+def bucket_start(dt, resolution):
+    if resolution == "day":
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+class RollupStore:
+    def __init__(self, data_folder, device_folder=None):
+        self.data_folder = data_folder
+        # device_folder(device_id) -> folder perangkat (mengikuti layout data)
+        self.device_folder = device_folder or (lambda key: os.path.join(data_folder, f"device_{key}"))
+        # (scope, key, resolution) -> (bucket_start_iso, {metric: Bucket})
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def path(self, scope, key, resolution):
+        if scope == "room":
+            return os.path.join(self.data_folder, "rooms", f"rollup_{resolution}_room_{key}.csv")
+        return os.path.join(self.device_folder(key), f"rollup_{resolution}_{key}.csv")
+
+    def _persist(self, scope, key, resolution, start_iso, buckets):
+        path = self.path(scope, key, resolution)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for metric, bucket in buckets.items():
+            history_index.append_row(
+                path,
+                [start_iso, metric, bucket.count, bucket.sum, bucket.min, bucket.max, bucket.last],
+                ROLLUP_HEADER
+            )
+
+    def _add(self, scope, key, resolution, dt, values):
+        slot = (scope, key, resolution)
+        start_iso = bucket_start(dt, resolution).isoformat()
+
+        current = self._open.get(slot)
+        if current is None or current[0] != start_iso:
+            if current is not None:
+                # Periode berganti: tutup & simpan bucket lama
+                self._persist(scope, key, resolution, current[0], current[1])
+            current = (start_iso, {})
+            self._open[slot] = current
+
+        for metric, value in values.items():
+            if value is None:
+                continue
+            current[1].setdefault(metric, Bucket()).add(value)
+
+    def record_usage(self, device_id, dt, stress, temperature, humidity, air_quality, screen_time_s):
+        with self._lock:
+            self._add("device", device_id, "hour", dt, {
+                "stress": stress,
+                "temperature": temperature,
+                "humidity": humidity,
+                "air_quality": air_quality
+            })
+            self._add("device", device_id, "day", dt, {"screen_time_s": screen_time_s})
+
+    def record_sensor(self, room_id, dt, temperature, humidity, air_quality):
+        with self._lock:
+            self._add("room", room_id, "hour", dt, {
+                "temperature": temperature,
+                "humidity": humidity,
+                "air_quality": air_quality
+            })
+
+    def open_buckets(self):
+        """Jumlah bucket yang belum dipersist (buffer tulis rollup)."""
+        return len(self._open)
+
+    def flush(self, folder_lock=None):
+        """Simpan semua bucket yang masih terbuka (dipanggil saat shutdown).
+
+        folder_lock(folder) opsional: context manager untuk mengunci folder
+        tujuan (mode multi-worker).
+        """
+        with self._lock:
+            for (scope, key, resolution), (start_iso, buckets) in self._open.items():
+                if folder_lock is None:
+                    self._persist(scope, key, resolution, start_iso, buckets)
+                    continue
+                folder = os.path.dirname(self.path(scope, key, resolution))
+                with folder_lock(folder):
+                    self._persist(scope, key, resolution, start_iso, buckets)
+            self._open.clear()
+
+    def query(self, scope, key, resolution, start=None, end=None):
+        """Bucket dalam [start, end] (datetime), urut waktu, termasuk bucket terbuka."""
+        start_iso = bucket_start(start, resolution).isoformat() if start else None
+        end_iso = end.isoformat() if end else None
+
+        merged = {}
+        path = self.path(scope, key, resolution)
+        rows = history_index.query_range(path, start_iso, end_iso, limit=float("inf"))
+        for row in rows:
+            bucket = Bucket()
+            bucket.count = int(row["count"])
+            bucket.sum = float(row["sum"])
+            bucket.min = float(row["min"])
+            bucket.max = float(row["max"])
+            bucket.last = float(row["last"])
+            # Bucket yang sama bisa tersimpan dua kali (flush saat restart)
+            target = merged.setdefault(row["bucket_start"], {})
+            if row["metric"] in target:
+                target[row["metric"]].merge(bucket)
+            else:
+                target[row["metric"]] = bucket
+
+        with self._lock:
+            current = self._open.get((scope, key, resolution))
+            if current is not None:
+                open_start, open_buckets = current
+                in_range = (start_iso is None or open_start >= start_iso) and \
+                           (end_iso is None or open_start <= end_iso)
+                if in_range:
+                    target = merged.setdefault(open_start, {})
+                    for metric, bucket in open_buckets.items():
+                        copy = Bucket()
+                        copy.merge(bucket)
+                        if metric in target:
+                            target[metric].merge(copy)
+                        else:
+                            target[metric] = copy
+
+        return [
+            {"bucket_start": start_key,
+             "metrics": {metric: bucket.to_dict() for metric, bucket in metrics.items()}}
+            for start_key, metrics in sorted(merged.items())
+        ]
+
+    def query_days(self, scope, key, resolution, days, now=None):
+        now = now or datetime.now()
+        return self.query(scope, key, resolution, start=now - timedelta(days=days), end=now)
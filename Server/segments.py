@@ -0,0 +1,355 @@
+"""
+Rotasi file data per perangkat menjadi segmen + arsip terkompresi.
+
+File aktif (dataset_<id>.csv, detail_<id>*.csv) tetap ditulis di tempat
+yang sama. Sebelum menulis, maybe_rotate() memeriksa apakah file aktif
+sudah berisi data hari sebelumnya (rotasi harian) atau melebihi
+SEGMENT_MAX_BYTES; jika ya file dipindah ke:
+
+    device_<id>/segments/<nama>.<timestamp_pertama>.csv
+
+lalu dicatat di device_<id>/manifest.json bersama rentang waktunya.
+Thread background mengompres segmen tertutup menjadi .csv.gz dan
+memperbarui manifest.
+
+Pembaca (segment_paths, read_dataset, iter_dataset_chunks, query_range)
+hanya membuka segmen yang rentang waktunya beririsan dengan jendela yang
+diminta.
+"""
+
+import contextlib
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+
+import history_index
+
+MANIFEST_FILENAME = "manifest.json"
+SEGMENT_DIR = "segments"
+
+# Ukuran maksimum file aktif sebelum dirotasi walau masih di hari yang sama
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+# ====================================
+# MANIFEST
+# ====================================
+def manifest_path(device_folder):
+    return os.path.join(device_folder, MANIFEST_FILENAME)
+
+
+def load_manifest(device_folder):
+    path = manifest_path(device_folder)
+    if not os.path.isfile(path):
+        return {"segments": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(device_folder, manifest):
+    path = manifest_path(device_folder)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _resolve(device_folder, entry):
+    path = os.path.join(device_folder, entry["file"])
+    # Kompresi bisa selesai di antara membaca manifest dan membuka file
+    if not os.path.isfile(path) and os.path.isfile(path + ".gz"):
+        return path + ".gz"
+    return path
+
+
+# ====================================
+# BACA FILE AKTIF
+# ====================================
+def _first_timestamp(path):
+    with open(path, "rb") as f:
+        f.readline()  # header
+        for line in f:
+            if line.strip():
+                return line.split(b",", 1)[0].decode("utf-8")
+    return None
+
+
+def _last_timestamp(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        chunk = min(size, 64 * 1024)
+        f.seek(size - chunk)
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    return lines[-1].split(b",", 1)[0].decode("utf-8") if lines else None
+
+
+# ====================================
+# ROTASI
+# ====================================
+class SegmentStore:
+    def __init__(self, max_bytes=SEGMENT_MAX_BYTES, rotate_daily=True, compress=True, folder_lock=None):
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        # folder_lock(device_folder) -> context manager (lock antar proses di mode multi-worker)
+        self.folder_lock = folder_lock or (lambda folder: contextlib.nullcontext())
+        self._first_ts = {}  # path file aktif -> timestamp baris pertama
+        self._lock = threading.Lock()
+        self._compress_queue = queue.Queue()
+        self._thread = None
+        self.rotations = 0
+
+    def maybe_rotate(self, device_folder, path, now_iso, on_rotate=None, size=None):
+        """Rotasi file aktif jika perlu. Dipanggil di dalam lock tulis perangkat.
+
+        on_rotate(path) dipanggil setelah file dipindah, untuk membuang cache
+        penulis (index offset, state delta) milik file lama. `size` (ukuran
+        file yang sudah diketahui pemanggil, 0 = belum ada) menghindari stat.
+        """
+        if size == 0:
+            return False
+        with self._lock:
+            first_ts = self._first_ts.get(path)
+            if first_ts is None:
+                if size is None and not os.path.isfile(path):
+                    return False
+                first_ts = _first_timestamp(path)
+                if first_ts is None:
+                    return False
+                self._first_ts[path] = first_ts
+
+            new_day = self.rotate_daily and first_ts[:10] != now_iso[:10]
+            if size is None:
+                size = os.path.getsize(path)
+            if not new_day and size < self.max_bytes:
+                return False
+
+            entry = self._rotate(device_folder, path, first_ts)
+            self._first_ts.pop(path, None)
+
+        if on_rotate is not None:
+            on_rotate(path)
+        print(f"[SEGMENT] {os.path.basename(path)} dirotasi -> {entry['file']}")
+        if self.compress:
+            self._schedule(device_folder, entry["file"])
+        return True
+
+    def _rotate(self, device_folder, path, first_ts):
+        os.makedirs(os.path.join(device_folder, SEGMENT_DIR), exist_ok=True)
+        source = os.path.basename(path)
+        stem, ext = os.path.splitext(source)
+        stamp = first_ts.replace(":", "").replace("-", "")[:15]
+        name = os.path.join(SEGMENT_DIR, f"{stem}.{stamp}{ext}")
+        # Rotasi berbasis ukuran bisa menghasilkan timestamp pertama yang sama
+        suffix = 1
+        while os.path.exists(os.path.join(device_folder, name)) or os.path.exists(os.path.join(device_folder, name + ".gz")):
+            name = os.path.join(SEGMENT_DIR, f"{stem}.{stamp}_{suffix}{ext}")
+            suffix += 1
+
+        target = os.path.join(device_folder, name)
+        entry = {
+            "source": source,
+            "file": name,
+            "start": first_ts,
+            "end": _last_timestamp(path),
+            "bytes": os.path.getsize(path),
+            "compressed": False,
+        }
+        os.replace(path, target)
+        index = history_index.index_path(path)
+        if os.path.isfile(index):
+            os.replace(index, history_index.index_path(target))
+
+        manifest = load_manifest(device_folder)
+        manifest["segments"].append(entry)
+        _save_manifest(device_folder, manifest)
+        self.rotations += 1
+        return entry
+
+    def forget_folder(self, device_folder):
+        """Buang cache timestamp pertama (file mungkin dirotasi proses lain)."""
+        prefix = os.path.join(device_folder, "")
+        with self._lock:
+            for path in [p for p in self._first_ts if p.startswith(prefix)]:
+                del self._first_ts[path]
+
+    # ====================================
+    # KOMPRESI BACKGROUND
+    # ====================================
+    def _schedule(self, device_folder, name):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="segment-compress", daemon=True)
+                self._thread.start()
+        self._compress_queue.put((device_folder, name))
+
+    def pending(self):
+        return self._compress_queue.qsize()
+
+    def resume(self, device_folders):
+        """Jadwalkan ulang segmen yang belum terkompresi (mis. server mati saat mengompres)."""
+        if not self.compress:
+            return
+        for device_folder in device_folders:
+            if not os.path.isfile(manifest_path(device_folder)):
+                continue
+            for segment in load_manifest(device_folder)["segments"]:
+                if not segment["compressed"]:
+                    self._schedule(device_folder, segment["file"])
+
+    def _run(self):
+        while True:
+            device_folder, name = self._compress_queue.get()
+            try:
+                self._compress(device_folder, name)
+            except OSError as e:
+                print(f"[SEGMENT] Gagal mengompres {name}: {e}")
+
+    def _compress(self, device_folder, name):
+        raw = os.path.join(device_folder, name)
+        if not os.path.isfile(raw):
+            return
+        tmp_path = raw + ".gz.tmp"
+        with open(raw, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+
+        # Urutan lock sama dengan jalur tulis: lock folder dulu, baru lock store
+        with self.folder_lock(device_folder), self._lock:
+            os.replace(tmp_path, raw + ".gz")
+            manifest = load_manifest(device_folder)
+            for segment in manifest["segments"]:
+                if segment["file"] == name:
+                    segment["file"] = name + ".gz"
+                    segment["compressed"] = True
+                    segment["bytes"] = os.path.getsize(raw + ".gz")
+            _save_manifest(device_folder, manifest)
+            os.remove(raw)
+            index = history_index.index_path(raw)
+            if os.path.isfile(index):
+                os.remove(index)
+        history_index.forget(raw)
+
+
+# ====================================
+# PEMBACA
+# ====================================
+class StaleCursor(ValueError):
+    """Cursor menunjuk file yang tidak ada lagi (atau format cursor lama)."""
+
+
+def _segment_files(active_path, start=None, end=None):
+    """(timestamp_pertama, path) segmen + file aktif yang beririsan dengan [start, end]."""
+    device_folder = os.path.dirname(active_path)
+    source = os.path.basename(active_path)
+    files = []
+    for entry in load_manifest(device_folder)["segments"]:
+        if entry["source"] != source:
+            continue
+        if start is not None and entry["end"] is not None and entry["end"] < start:
+            continue
+        if end is not None and entry["start"] > end:
+            continue
+        files.append((entry["start"], _resolve(device_folder, entry)))
+    if os.path.isfile(active_path):
+        files.append((_first_timestamp(active_path), active_path))
+    return files
+
+
+def segment_paths(active_path, start=None, end=None):
+    """Path segmen (urut waktu) + file aktif yang beririsan dengan [start, end]."""
+    return [path for _, path in _segment_files(active_path, start, end)]
+
+
+def read_dataset(active_path, start=None, end=None):
+    """DataFrame dataset_<id>.csv gabungan semua segmen dalam jendela waktu.
+
+    Untuk CSV biasa tanpa manifest, hanya file itu sendiri yang dibaca.
+    """
+    import pandas as pd
+
+    frames = [pd.read_csv(path) for path in segment_paths(active_path, start, end)]
+    if not frames:
+        raise FileNotFoundError(f"Tidak ada data untuk {active_path}")
+    df = pd.concat(frames, ignore_index=True)
+    if "timestamp" in df.columns:
+        if start is not None:
+            df = df[df["timestamp"] >= start]
+        if end is not None:
+            df = df[df["timestamp"] <= end]
+    return df.reset_index(drop=True)
+
+
+def iter_dataset_chunks(active_path, start=None, end=None, chunksize=200_000):
+    """Seperti read_dataset, tetapi menghasilkan DataFrame per `chunksize` baris
+    (memori tetap untuk dataset yang tidak muat di RAM)."""
+    import pandas as pd
+
+    paths = segment_paths(active_path, start, end)
+    if not paths:
+        raise FileNotFoundError(f"Tidak ada data untuk {active_path}")
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if "timestamp" in chunk.columns:
+                if start is not None:
+                    chunk = chunk[chunk["timestamp"] >= start]
+                if end is not None:
+                    chunk = chunk[chunk["timestamp"] <= end]
+            if len(chunk):
+                yield chunk
+
+
+def parse_cursor(cursor):
+    """(timestamp_pertama_file, offset) dari cursor "<timestamp>@<offset>"."""
+    file_ts, sep, offset = cursor.rpartition("@")
+    if not sep or not file_ts:
+        raise StaleCursor("format cursor tidak dikenal, ulangi query tanpa cursor")
+    return file_ts, int(offset)
+
+
+def query_range(active_path, start=None, end=None, limit=500, cursor=None):
+    """Seperti history_index.query_range, tetapi melintasi semua segmen.
+
+    Cursor berbentuk "<timestamp_pertama_file>@<offset>". File diidentifikasi
+    lewat timestamp baris pertamanya, yang tidak berubah saat file aktif
+    dirotasi menjadi segmen atau segmen dikompres. Cursor yang file-nya
+    tidak ditemukan lagi memunculkan StaleCursor (offset-nya tidak dipakai
+    di file lain). Validasi cursor dengan parse_cursor/resolve_cursor
+    sebelum mulai streaming respons.
+    """
+    files = _segment_files(active_path, start, end)
+    cursor_offset = None
+    if cursor:
+        files, cursor_offset = _seek_cursor(files, cursor)
+
+    count = 0
+    for i, (file_ts, path) in enumerate(files):
+        offset = cursor_offset if i == 0 else None
+        rows = history_index.query_range(path, start, end, limit - count, offset or None)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration as stop:
+                next_offset = stop.value
+                break
+            yield row
+            count += 1
+        if next_offset is not None:
+            return f"{file_ts}@{next_offset}"
+    return None
+
+
+def _seek_cursor(files, cursor):
+    file_ts, offset = parse_cursor(cursor)
+    for i, (ts, _) in enumerate(files):
+        if ts == file_ts:
+            return files[i:], offset
+    raise StaleCursor("cursor sudah tidak berlaku (file-nya tidak ditemukan), ulangi query tanpa cursor")
+
+
+def resolve_cursor(active_path, cursor, start=None, end=None):
+    """Periksa cursor terhadap manifest saat ini; StaleCursor/ValueError jika tidak valid."""
+    _seek_cursor(_segment_files(active_path, start, end), cursor)
@@ -0,0 +1,125 @@
+"""
+Deteksi anomali online untuk data sensor IoT per ruangan.
+
+Untuk setiap (ruangan, metrik) disimpan ring buffer WINDOW nilai terakhir
+yang diterima. Nilai baru dinilai dengan skor robust
+
+    skor = |x - median| / max(1.4826 * MAD, batas_bawah)
+
+sehingga satu lonjakan tidak ikut menggeser acuan seperti rata-rata biasa.
+Memori tetap (WINDOW nilai per metrik) berapa pun panjang alirannya.
+
+Keputusan per nilai:
+- "warmup"      : sampel belum cukup (MIN_SAMPLES), nilai diterima
+- "ok"          : skor <= THRESHOLD
+- "flagged"     : outlier, tetap diterima (mode "flag")
+- "quarantined" : outlier, tidak dipakai sebagai input fuzzy (mode "quarantine")
+- "level_shift" : outlier ke-LEVEL_SHIFT_AFTER berturut-turut, diterima (lihat bawah)
+
+Outlier tidak masuk ring buffer. Jika LEVEL_SHIFT_AFTER outlier berturut-
+turut jatuh di sisi yang sama, dianggap perubahan kondisi nyata (mis.
+jendela dibuka, sensor dipindah): buffer diisi ulang dengan nilai-nilai
+tersebut dan nilai terakhir diterima.
+
+Di mode multi-worker setiap proses menilai laporan yang diterimanya sendiri.
+"""
+
+import threading
+from collections import deque
+from statistics import median
+
+METRICS = ("temperature", "humidity", "air_quality")
+
+WINDOW = 60
+MIN_SAMPLES = 10
+THRESHOLD = 6.0
+LEVEL_SHIFT_AFTER = 5
+
+# Skala minimum per metrik agar sensor yang sangat stabil (MAD = 0) tidak
+# menandai perubahan kecil sebagai anomali
+MIN_SCALE = {"temperature": 0.5, "humidity": 2.0, "air_quality": 2.0}
+
+DECISIONS = ("warmup", "ok", "flagged", "quarantined", "level_shift")
+
+
+class MetricDetector:
+    def __init__(self, min_scale, window=WINDOW):
+        self.min_scale = min_scale
+        self.values = deque(maxlen=window)
+        self.pending = []  # outlier berturut-turut (kandidat perubahan level)
+
+    def check(self, value):
+        """(is_outlier, skor, median) untuk nilai baru, tanpa mengubah state."""
+        if len(self.values) < MIN_SAMPLES:
+            return False, 0.0, None
+        center = median(self.values)
+        mad = median(abs(v - center) for v in self.values)
+        scale = max(1.4826 * mad, self.min_scale)
+        score = abs(value - center) / scale
+        return score > THRESHOLD, score, center
+
+    def accept(self, value):
+        self.values.append(value)
+        self.pending.clear()
+
+    def reject(self, value, center):
+        """Catat outlier; True jika outlier berturut-turut menandakan perubahan level."""
+        side = value > center
+        if self.pending and (self.pending[-1] > center) != side:
+            self.pending.clear()
+        self.pending.append(value)
+        if len(self.pending) < LEVEL_SHIFT_AFTER:
+            return False
+        self.values.clear()
+        self.values.extend(self.pending)
+        self.pending.clear()
+        return True
+
+
+class SensorAnomalyDetector:
+    def __init__(self, mode="quarantine"):
+        """mode: "quarantine" (outlier dibuang), "flag" (hanya ditandai), "off"."""
+        self.mode = mode
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self.last_scores = {}  # (room, metric) -> skor nilai terakhir
+
+    def evaluate(self, room_id, reading):
+        """Nilai setiap metrik di `reading`.
+
+        Mengembalikan (accepted, decisions): accepted berisi metrik yang boleh
+        dipakai sebagai input fuzzy, decisions berisi {metrik: {decision, score, median}}.
+        """
+        if self.mode == "off":
+            return dict(reading), {}
+        accepted, decisions = {}, {}
+        with self._lock:
+            detectors = self._rooms.get(room_id)
+            if detectors is None:
+                detectors = {metric: MetricDetector(MIN_SCALE[metric]) for metric in METRICS}
+                self._rooms[room_id] = detectors
+
+            for metric, value in reading.items():
+                detector = detectors[metric]
+                value = float(value)
+                is_outlier, score, center = detector.check(value)
+                if center is None:
+                    decision = "warmup"
+                elif not is_outlier:
+                    decision = "ok"
+                elif detector.reject(value, center):
+                    decision = "level_shift"
+                else:
+                    decision = "quarantined" if self.mode == "quarantine" else "flagged"
+
+                if decision in ("warmup", "ok"):
+                    detector.accept(value)
+                if decision != "quarantined":
+                    accepted[metric] = reading[metric]
+                decisions[metric] = {
+                    "decision": decision,
+                    "score": round(score, 2),
+                    "median": None if center is None else round(center, 3),
+                }
+                self.last_scores[(room_id, metric)] = score
+        return accepted, decisions
@@ -1,9 +1,34 @@
-from flask import Flask, request, jsonify
+import time
+# Awal import server.py, untuk mengukur cold start
+STARTUP_BEGIN = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response, g
 from datetime import datetime, timedelta
 import csv
 import os
-import fuzzy_logic
 import json
+import atexit
+import importlib
+import detail_storage
+import package_dict
+import history_index
+import rollups
+import metrics
+import profiling
+import shared_state
+import ingest_queue
+import payload_codec
+import dedup_index
+import warmup
+import live_stream
+import segments
+import journal
+import device_registry
+import data_layout
+import sensor_anomaly
+import signal
+import threading
+import sys
 
 app = Flask(__name__)
 
@@ -13,6 +38,11 @@ LAST_HUMIDITY = 30
 LAST_AIRQUALITY = 20
 LAST_IOT_TIMESTAMP = datetime.min
 
+# Sensor tanpa room_id dianggap berada di ruangan default
+DEFAULT_ROOM_ID = "default"
+# room_id -> datetime data sensor terakhir (untuk metrik kesegaran sensor)
+SENSOR_LAST_SEEN = {}
+
 TIME_PROXIMITY_THRESHOLD = timedelta(minutes=5)
 SMARTPHONE_DATA_RECEIVED = False
 
@@ -25,117 +55,782 @@ def format_hms(seconds):
 DATA_FOLDER = "data"
 os.makedirs(DATA_FOLDER, exist_ok=True)
 
-@app.route('/receive_usage', methods=['POST'])
-def receive_usage():
-    global LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, SMARTPHONE_DATA_RECEIVED, LAST_IOT_TIMESTAMP
+# Folder perangkat: data/devices/<h1>/<h2>/device_<id> (sharded) atau
+# data/device_<id> (instalasi lama, pindahkan dengan `python data_layout.py migrate`)
+LAYOUT = data_layout.DataLayout(DATA_FOLDER)
+LAYOUT.ensure()
+
+# Format file detail aplikasi: "csv" (baris penuh) atau "delta" (perubahan + keyframe)
+DETAIL_FORMAT = "csv"
+# Simpan nama paket/aplikasi sebagai id dari kamus bersama (data/package_dict.csv)
+INTERN_PACKAGE_NAMES = False
+PACKAGE_DICT = package_dict.load_default(DATA_FOLDER) if INTERN_PACKAGE_NAMES else None
+
+OVERALL_HEADER = ["timestamp", "source", "temperature", "humidity", "air_quality", "total_usage_time", "fuzzy_level", "message"]
+
+# Batas baris per halaman untuk /devices/<id>/history
+HISTORY_DEFAULT_LIMIT = 500
+HISTORY_MAX_LIMIT = 5000
+
+# --- MODE MULTI-WORKER ---
+# STRESS_MULTI_WORKER=1 (mis. gunicorn -w 4 server:app): data sensor dan registry
+# perangkat disimpan di SQLite bersama, penulisan file per perangkat dikunci antar proses
+MULTI_WORKER = os.environ.get("STRESS_MULTI_WORKER", "0") == "1"
+SHARED = shared_state.SharedState(os.path.join(DATA_FOLDER, "shared_state.db")) if MULTI_WORKER else None
+
+def _forget_device_caches(folder):
+    history_index.forget_folder(folder)
+    detail_storage.forget_folder(folder)
+    SEGMENTS.forget_folder(folder)
+    REGISTRY.forget(folder)
+
+# Mode single process: worker IngestQueue tetap berjalan paralel, jadi tiap folder tetap dikunci
+_FOLDER_LOCKS = {}
+_FOLDER_LOCKS_GUARD = threading.Lock()
+
+def _write_lock(folder):
+    """Kepemilikan tulis satu folder perangkat (antar thread, atau antar proses di mode multi-worker)."""
+    if SHARED is None:
+        key = os.path.abspath(folder)
+        with _FOLDER_LOCKS_GUARD:
+            lock = _FOLDER_LOCKS.get(key)
+            if lock is None:
+                lock = _FOLDER_LOCKS[key] = threading.Lock()
+        return lock
+    return SHARED.device_lock(folder, _forget_device_caches)
+
+def _current_sensor():
+    """(temperature, humidity, air_quality, timestamp) terakhir dari sensor IoT."""
+    global LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, LAST_IOT_TIMESTAMP
+    if SHARED is not None:
+        latest = SHARED.latest_sensor()
+        if latest is not None:
+            _, LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, LAST_IOT_TIMESTAMP = latest
+    return LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, LAST_IOT_TIMESTAMP
+
+# --- ROTASI FILE PER PERANGKAT ---
+# dataset_<id>.csv / detail_<id>.csv dipindah ke device_<id>/segments/ setiap
+# ganti hari atau jika melebihi SEGMENT_MAX_BYTES, lalu dikompres di background
+ROTATE_DAILY = True
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+COMPRESS_SEGMENTS = True
+SEGMENTS = segments.SegmentStore(SEGMENT_MAX_BYTES, ROTATE_DAILY, COMPRESS_SEGMENTS, folder_lock=_write_lock)
+SEGMENTS.resume(folder for _, folder in LAYOUT.iter_devices())
+
+def _forget_rotated_file(path):
+    history_index.forget(path)
+    detail_storage.reset_delta_state(path)
+
+# --- WRITE-AHEAD JOURNAL ---
+# Snapshot ditulis ke data/journal/journal-<pid>.log dan di-fsync per kelompok
+# (group commit) sebelum ditulis ke CSV; diputar ulang saat start setelah crash
+JOURNAL_ENABLED = True
+JOURNAL_FOLDER = os.path.join(DATA_FOLDER, "journal")
+JOURNAL_GROUP_COMMIT_S = 0.005
+JOURNAL_MAX_BYTES = 16 * 1024 * 1024
+# Journal dikosongkan begitu semua snapshot di dalamnya sudah tertulis ke CSV
+# dan ukurannya melewati batas ini, jadi replay saat start tetap singkat
+JOURNAL_CHECKPOINT_BYTES = 256 * 1024
+JOURNAL = journal.Journal(
+    JOURNAL_FOLDER, JOURNAL_GROUP_COMMIT_S, JOURNAL_MAX_BYTES, JOURNAL_CHECKPOINT_BYTES
+) if JOURNAL_ENABLED else None
+if JOURNAL is not None:
+    # Didaftarkan sebelum INGEST.shutdown (atexit LIFO): dihapus setelah antrean kosong
+    atexit.register(JOURNAL.close)
+
+def _last_dataset_timestamp(overall_csv):
+    last = journal.last_timestamp(overall_csv)
+    if last is None:
+        # File aktif kosong/baru dirotasi: pakai akhir segmen terakhir
+        source = os.path.basename(overall_csv)
+        ends = [e["end"] for e in segments.load_manifest(os.path.dirname(overall_csv))["segments"]
+                if e["source"] == source and e["end"] is not None]
+        last = max(ends) if ends else None
+    return last
+
+def _apply_record(record):
+    """Tulis satu snapshot dari journal (lock folder sudah dipegang); False jika sudah ada di CSV."""
+    now = record["timestamp"]
+    _, overall_csv, detail_csv = _device_paths(record["device_id"])
+
+    if journal.truncate_torn_tail(overall_csv):
+        # Entri index bisa menunjuk ke baris yang terpotong; bangun ulang
+        if os.path.isfile(history_index.index_path(overall_csv)):
+            os.remove(history_index.index_path(overall_csv))
+        history_index.forget(overall_csv)
+    journal.truncate_torn_tail(detail_csv)
+
+    last = _last_dataset_timestamp(overall_csv)
+    if last is not None and now < last:
+        return False
+
+    if last != now:
+        history_index.append_row(overall_csv, record["row"], OVERALL_HEADER)
+    # Detail snapshot ini mungkin tertulis sebagian: hapus lalu tulis ulang
+    journal.truncate_rows_from(detail_csv, now)
+    detail_storage.reset_delta_state(detail_csv)
+    if record["usage"]:
+        detail_storage.append_detail(detail_csv, now, record["usage"], DETAIL_FORMAT, PACKAGE_DICT)
+    return last != now
+
+def _replay_record(record):
+    """Terapkan satu snapshot dari journal; False jika sudah ada di CSV."""
+    device_folder = _device_paths(record["device_id"])[0]
+    os.makedirs(device_folder, exist_ok=True)
+    with _write_lock(device_folder):
+        return _apply_record(record)
+
+def _replay_journal():
+    if JOURNAL is None or not journal.orphaned_files(JOURNAL_FOLDER):
+        return
+    start = time.perf_counter()
+    applied = skipped = 0
+    # Di mode multi-worker hanya satu worker yang memutar ulang file yang sama
+    with _write_lock(JOURNAL_FOLDER):
+        for path in journal.orphaned_files(JOURNAL_FOLDER):
+            for record in journal.read_records(path):
+                if _replay_record(record):
+                    applied += 1
+                else:
+                    skipped += 1
+            os.remove(path)
+    STARTUP_TIMINGS["journal_replay"] = time.perf_counter() - start
+    print(f"[JOURNAL] Replay selesai: {applied} snapshot diterapkan, {skipped} sudah tersimpan")
+
+# Rollup per jam/hari, diperbarui di setiap request dan disimpan saat periode ditutup
+ROLLUPS = rollups.RollupStore(DATA_FOLDER, LAYOUT.device_folder)
+ROLLUP_DEFAULT_DAYS = 30
+ROLLUP_MAX_DAYS = 366
+atexit.register(ROLLUPS.flush, _write_lock)
+
+# --- METRIK ---
+metrics.define_counter("stress_requests_total", "Jumlah request HTTP per endpoint dan status")
+metrics.define_histogram("stress_request_duration_seconds", "Latensi request HTTP per endpoint")
+metrics.define_histogram("stress_stage_duration_seconds", "Latensi per tahap pemrosesan (json_parse, fuzzy, journal, rotate, rollup, storage_write, trend)")
+
+def _known_devices():
+    if SHARED is not None:
+        return SHARED.device_count()
+    return len(REGISTRY)
+
+def _sensor_age():
+    now_dt = datetime.now()
+    last_seen = SHARED.sensor_last_seen() if SHARED is not None else SENSOR_LAST_SEEN
+    return [({"room": room}, (now_dt - seen).total_seconds()) for room, seen in last_seen.items()]
+
+def _cache_stats(stats_name):
+    caches = [
+        ("history_index", history_index.cache_stats),
+        ("detail_delta_state", detail_storage.cache_stats),
+    ]
+    if PACKAGE_DICT is not None:
+        caches.append(("package_dict", {"hits": PACKAGE_DICT.hits, "misses": PACKAGE_DICT.misses}))
+    caches.append(("idempotency", {"hits": DEDUP.hits, "misses": DEDUP.misses}))
+    return [({"cache": name}, stats[stats_name]) for name, stats in caches]
 
-    data = request.get_json(force=True)
-    if not data:
-        return jsonify({"status": "error", "message": "no json received"}), 400
+def _write_buffer_depth():
+    return [
+        ({"buffer": "rollups"}, ROLLUPS.open_buckets()),
+        ({"buffer": "metrics_events"}, metrics.pending_events()),
+        ({"buffer": "segment_compress"}, SEGMENTS.pending()),
+    ]
+
+if JOURNAL is not None:
+    metrics.register_callback("stress_journal_appends_total", "Snapshot yang ditulis ke journal", lambda: JOURNAL.appends, "counter")
+    metrics.register_callback("stress_journal_fsyncs_total", "fsync journal (group commit)", lambda: JOURNAL.fsyncs, "counter")
+    metrics.register_callback("stress_journal_checkpoints_total", "Journal dikosongkan setelah semua snapshot diterapkan", lambda: JOURNAL.checkpoints, "counter")
+    metrics.register_callback("stress_journal_write_failures_total", "Snapshot yang gagal ditulis ke CSV dan disimpan untuk ditulis ulang", lambda: JOURNAL.failures, "counter")
+    metrics.register_callback("stress_journal_last_batch", "Jumlah snapshot pada fsync terakhir", lambda: JOURNAL.last_batch)
+
+metrics.register_callback("stress_known_devices", "Jumlah perangkat yang punya folder data", _known_devices)
+metrics.register_callback("stress_sensor_age_seconds", "Umur data sensor terakhir per ruangan", _sensor_age)
+metrics.register_callback("stress_cache_hits_total", "Cache hit per cache", lambda: _cache_stats("hits"), "counter")
+metrics.register_callback("stress_cache_misses_total", "Cache miss per cache", lambda: _cache_stats("misses"), "counter")
+metrics.register_callback("stress_write_buffer_depth", "Jumlah item yang menunggu ditulis ke disk", _write_buffer_depth)
+
+# --- WARM-UP FUZZY ENGINE ---
+# fuzzy_logic (numpy + skfuzzy + ControlSystem) dimuat di background agar server
+# langsung bind port. Request scoring menunggu maksimal FUZZY_WAIT_S detik;
+# jika engine belum siap dibalas 503 + Retry-After. Pemuatan yang gagal
+# dicoba lagi oleh request berikutnya (paling cepat FUZZY_RETRY_AFTER_S detik).
+FUZZY_WAIT_S = 2
+FUZZY_RETRY_AFTER_S = 5
+STARTUP_TIMINGS = {}
+
+def _prime_fuzzy():
+    module = importlib.import_module("fuzzy_logic")
+    # Komputasi pertama skfuzzy lebih lambat; lakukan sekali sebelum siap
+    module.calculate_stress(4, 27, 60, 20)
+    return module
+
+FUZZY = warmup.BackgroundLoader("fuzzy_logic", [
+    ("import_numpy", lambda: importlib.import_module("numpy")),
+    ("import_skfuzzy", lambda: importlib.import_module("skfuzzy.control")),
+    ("build_engine", lambda: importlib.import_module("fuzzy_logic")),
+    ("first_compute", _prime_fuzzy),
+], retry_after_s=FUZZY_RETRY_AFTER_S)
+
+def _startup_timings():
+    timings = dict(STARTUP_TIMINGS)
+    timings.update({f"fuzzy_{phase}": seconds for phase, seconds in FUZZY.timings.items()})
+    return timings
+
+metrics.register_callback(
+    "stress_startup_seconds", "Durasi tahap cold start server",
+    lambda: [({"phase": phase}, seconds) for phase, seconds in _startup_timings().items()]
+)
+metrics.register_callback("stress_fuzzy_ready", "1 jika fuzzy engine sudah dimuat", lambda: int(FUZZY.ready))
+
+# --- ANOMALI SENSOR ---
+# Lonjakan sensor (mis. air_quality 61 di tengah bacaan ~0.4) dinilai per
+# ruangan dengan median/MAD sebelum menjadi input fuzzy untuk semua perangkat.
+# "quarantine": outlier tidak dipakai, "flag": hanya ditandai, "off": nonaktif
+SENSOR_ANOMALY_MODE = os.environ.get("STRESS_SENSOR_ANOMALY_MODE", "quarantine")
+ANOMALY = sensor_anomaly.SensorAnomalyDetector(SENSOR_ANOMALY_MODE)
+metrics.define_counter("stress_sensor_readings_total", "Nilai sensor per ruangan, metrik dan keputusan detektor anomali")
+metrics.register_callback(
+    "stress_sensor_anomaly_score", "Skor robust (|x - median| / MAD) nilai sensor terakhir",
+    lambda: [({"room": room, "metric": metric}, score) for (room, metric), score in list(ANOMALY.last_scores.items())]
+)
+
+# --- LIVE STREAM (SSE) ---
+# /stream?device=a,b&room=x : update stres terbaru untuk dashboard
+STREAM_BUFFER_SIZE = 100     # event per subscriber sebelum yang tertua dibuang
+STREAM_COALESCE_S = 0.5      # jendela penggabungan update beruntun
+STREAM_MAX_SUBSCRIBERS = 500
+STREAM_HEARTBEAT_S = 15
+STREAM = live_stream.Broadcaster(STREAM_BUFFER_SIZE, STREAM_COALESCE_S, STREAM_MAX_SUBSCRIBERS)
+
+metrics.register_callback("stress_stream_subscribers", "Jumlah subscriber /stream aktif", STREAM.subscriber_count)
+metrics.register_callback("stress_stream_events_total", "Event yang dipublish ke broadcaster", lambda: STREAM.published, "counter")
+metrics.register_callback("stress_stream_coalesced_total", "Event yang digabung dengan update berikutnya", lambda: STREAM.coalesced, "counter")
+metrics.register_callback("stress_stream_dropped_total", "Event yang dibuang karena buffer subscriber penuh", STREAM.dropped_total, "counter")
+
+# --- PROFILING (opsional) ---
+# Fraksi request yang diprofil (0.01 = 1%), atau paksa dengan header "X-Profile: 1"
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_HEADER = "X-Profile"
+PROFILE_DIR = "profiles"
+PROFILE_MAX_BYTES = 50 * 1024 * 1024
+PROFILER = profiling.RequestProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_HEADER, PROFILE_MAX_BYTES)
+
+def _read_payload(validate):
+    """Decode body (JSON/MessagePack, opsional gzip) lalu validasi skemanya.
+
+    Mengembalikan (data, None) atau (None, response error).
+    """
+    with metrics.timer("stress_stage_duration_seconds", stage="json_parse"):
+        try:
+            data = payload_codec.decode_body(
+                request.get_data(cache=False),
+                request.headers.get("Content-Type"),
+                request.headers.get("Content-Encoding")
+            )
+            if not data:
+                return None, (jsonify({"status": "error", "message": "no json received"}), 400)
+            return validate(data), None
+        except payload_codec.PayloadError as e:
+            return None, (jsonify({"status": "error", "message": str(e)}), e.status)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.endpoint or "unknown"
+    start = getattr(g, "request_start", None)
+    if start is not None:
+        metrics.observe("stress_request_duration_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("stress_requests_total", endpoint=endpoint, status=response.status_code)
+    return response
+
+def _device_paths(device_id):
+    """(folder, dataset csv, detail csv) milik satu perangkat."""
+    device_folder = LAYOUT.device_folder(device_id)
+    return (
+        device_folder,
+        os.path.join(device_folder, f"dataset_{device_id}.csv"),
+        os.path.join(device_folder, detail_storage.detail_filename(device_id, DETAIL_FORMAT, INTERN_PACKAGE_NAMES))
+    )
+
+# Registry perangkat: path, status file, first/last seen (dimuat di akhir modul)
+REGISTRY = device_registry.DeviceRegistry(_device_paths, LAYOUT.iter_devices)
+
+def _retry_pending_writes(info):
+    """Tulis ulang snapshot yang sebelumnya gagal (lock folder sudah dipegang), urut dari yang terlama."""
+    if not info.pending_writes:
+        return
+    while info.pending_writes:
+        seq, record = info.pending_writes[0]
+        _apply_record(record)
+        info.pending_writes.pop(0)
+        JOURNAL.applied(seq)
+        print(f"[JOURNAL] Snapshot {record['device_id']} @ {record['timestamp']} berhasil ditulis ulang")
+    # Ukuran file berubah di luar _write_snapshot
+    info.probe()
+    info.overall_rows = None
+
+def _write_snapshot(info, now, row, usage_list):
+    # --- SIMPAN DATA OVERALL KE FOLDER PERANGKAT (+ index offset) ---
+    info.overall_bytes = history_index.append_row(info.overall_csv, row, OVERALL_HEADER, info.overall_exists)
+    info.overall_exists = True
+    info.overall_rows = history_index.row_count(info.overall_csv)
+
+    # --- SIMPAN DATA DETAIL KE FOLDER PERANGKAT ---
+    if usage_list:
+        info.detail_bytes = detail_storage.append_detail(
+            info.detail_csv, now, usage_list, DETAIL_FORMAT, PACKAGE_DICT, info.detail_exists
+        )
+        info.detail_exists = True
+
+def _process_usage(data):
+    """Fuzzy + penyimpanan satu laporan smartphone (dijalankan worker antrean ingest)."""
+    global SMARTPHONE_DATA_RECEIVED
 
     # Ambil ID unik handphone
     device_id = data.get("device_id", "unknown_device")
 
-    DEVICE_FOLDER = os.path.join(DATA_FOLDER, f"device_{device_id}")
-    os.makedirs(DEVICE_FOLDER, exist_ok=True)
+    received_dt = datetime.now()
 
-    if not SMARTPHONE_DATA_RECEIVED:
-        SMARTPHONE_DATA_RECEIVED = True
-        print(f"\n[INFO] Koneksi diterima dari perangkat: {device_id}\n")
+    info, is_new = REGISTRY.touch(device_id, received_dt)
+    DEVICE_FOLDER = info.folder
 
-    # --- KONFIGURASI FILE DINAMIS PER HP ---
-    OVERALL_CSV = os.path.join(DEVICE_FOLDER, f"dataset_{device_id}.csv")
-    DETAIL_CSV = os.path.join(DEVICE_FOLDER, f"detail_{device_id}.csv")
-    
-    overall_exists = os.path.isfile(OVERALL_CSV)
-    detail_exists = os.path.isfile(DETAIL_CSV)
+    if SHARED is not None:
+        if SHARED.touch_device(device_id, received_dt):
+            print(f"\n[INFO] Koneksi diterima dari perangkat baru: {device_id}\n")
+    elif is_new:
+        SMARTPHONE_DATA_RECEIVED = True
+        print(f"\n[INFO] Koneksi diterima dari perangkat baru: {device_id}\n")
 
     # --- PROSES DATA ---
     total_sec_all = data.get("total_screen_time_s", 0)
     usage_list = data.get("usage_data", [])
 
-    now_dt = datetime.now()
-    now = now_dt.isoformat()
     formatted_total = format_hms(total_sec_all)
     total_hours = total_sec_all / 3600
 
+    temperature, humidity, air_quality, iot_timestamp = _current_sensor()
+
     # Hitung Fuzzy Logic
-    result = fuzzy_logic.calculate_stress(
-        total_hours,
-        LAST_TEMPERATURE,
-        LAST_HUMIDITY,
-        LAST_AIRQUALITY
-    )
+    fuzzy_logic = FUZZY.get(FUZZY_WAIT_S)
+    with metrics.timer("stress_stage_duration_seconds", stage="fuzzy"):
+        result = fuzzy_logic.calculate_stress(
+            total_hours,
+            temperature,
+            humidity,
+            air_quality
+        )
 
     level = result["category"]
     message = result["message"]
 
     # PROXIMITY CHECK IOT
-    time_difference = now_dt - LAST_IOT_TIMESTAMP
+    time_difference = received_dt - iot_timestamp
 
     if timedelta(seconds=0) <= time_difference <= TIME_PROXIMITY_THRESHOLD:
-        iot_message = f"IoT data (T:{LAST_TEMPERATURE}) saved due to proximity rule."
+        iot_message = f"IoT data (T:{temperature}) saved due to proximity rule."
 
-        print(f"[INFO] PROXIMITY LOGGED: Data IoT ({LAST_IOT_TIMESTAMP.strftime('%H:%M:%S')}) disimpan ke CSV.")
+        print(f"[INFO] PROXIMITY LOGGED: Data IoT ({iot_timestamp.strftime('%H:%M:%S')}) disimpan ke CSV.")
 
     else:
-        print(f"[INFO] PROXIMITY CHECK: Data IoT terakhir ({LAST_IOT_TIMESTAMP.strftime('%H:%M:%S')}) terlalu jauh. Tidak disimpan.")
+        print(f"[INFO] PROXIMITY CHECK: Data IoT terakhir ({iot_timestamp.strftime('%H:%M:%S')}) terlalu jauh. Tidak disimpan.")
 
-    # --- SIMPAN DATA OVERALL KE FOLDER PERANGKAT ---
-    with open(OVERALL_CSV, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not overall_exists:
-            writer.writerow(["timestamp", "source", "temperature", "humidity", "air_quality", "total_usage_time", "fuzzy_level", "message"])
-        
-        writer.writerow([now, "android_summary", LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, formatted_total, level, message])
+    def on_rotate(path):
+        _forget_rotated_file(path)
+        info.file_rotated(path)
 
-    # --- SIMPAN DATA DETAIL KE FOLDER PERANGKAT ---
-    if usage_list:
-        with open(DETAIL_CSV, "a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            if not detail_exists:
-                writer.writerow(["timestamp_received", "package_name", "app_name", "foreground_time_s"])
-            
-            for usage_item in usage_list:
-                writer.writerow([
-                    now,
-                    usage_item.get("package", "N/A"),
-                    usage_item.get("app_name", "N/A"),
-                    usage_item.get("foreground_time_s", 0)
-                ])
+    with _write_lock(DEVICE_FOLDER):
+        # Waktu diambil di dalam lock: baris satu perangkat selalu urut di CSV
+        # (index offset dan replay `now < last` bergantung pada urutan ini)
+        now_dt = datetime.now()
+        now = now_dt.isoformat()
+        row = [now, "android_summary", temperature, humidity, air_quality, formatted_total, level, message]
+        record = {"device_id": device_id, "timestamp": now, "row": row, "usage": usage_list}
+
+        # Snapshot dicatat utuh di journal (fsync group commit) sebelum ditulis ke CSV
+        journal_seq = None
+        if JOURNAL is not None:
+            with metrics.timer("stress_stage_duration_seconds", stage="journal"):
+                journal_seq = JOURNAL.append(record)
+
+        try:
+            if not info.probed:
+                # Folder ditulis proses lain sejak kontak terakhir
+                info.probe()
+
+            # Snapshot lama yang gagal ditulis harus masuk lebih dulu agar urutan tetap terjaga
+            _retry_pending_writes(info)
+
+            with metrics.timer("stress_stage_duration_seconds", stage="rotate"):
+                SEGMENTS.maybe_rotate(DEVICE_FOLDER, info.overall_csv, now, on_rotate, info.overall_bytes)
+                SEGMENTS.maybe_rotate(DEVICE_FOLDER, info.detail_csv, now, on_rotate, info.detail_bytes)
+
+            with metrics.timer("stress_stage_duration_seconds", stage="rollup"):
+                ROLLUPS.record_usage(
+                    device_id, now_dt, result["stress_value"],
+                    temperature, humidity, air_quality, total_sec_all
+                )
+
+            with metrics.timer("stress_stage_duration_seconds", stage="storage_write"):
+                _write_snapshot(info, now, row, usage_list)
+        except Exception as e:
+            if journal_seq is None:
+                raise
+            # Snapshot sudah aman di journal: jangan di-checkpoint, tulis ulang
+            # sebelum laporan berikutnya atau saat replay setelah restart
+            JOURNAL.failed(journal_seq)
+            info.pending_writes.append((journal_seq, record))
+            print(f"[JOURNAL] Gagal menulis snapshot {device_id} ({e}), disimpan untuk ditulis ulang")
+        else:
+            if journal_seq is not None:
+                JOURNAL.applied(journal_seq)
+
+        # EWMA + jendela 1 jam / 24 jam, O(1) per laporan
+        with metrics.timer("stress_stage_duration_seconds", stage="trend"):
+            trend = info.trend.update(now_dt, result["stress_value"], total_sec_all)
+
+    STREAM.publish({
+        "type": "device",
+        "device": device_id,
+        "timestamp": now,
+        "stress_value": result["stress_value"],
+        "level": level,
+        "total_screen_time_s": total_sec_all,
+        "temperature": temperature,
+        "humidity": humidity,
+        "air_quality": air_quality
+    })
 
     print(f"\n[{now}] === Data Android ({device_id}) ===")
     print(f"Total Screen Time: {formatted_total} → Level: {level}")
-    print(f"Suhu dipakai: {LAST_TEMPERATURE}°C, Humid: {LAST_HUMIDITY}%, AQ: {LAST_AIRQUALITY} ppm")
+    print(f"Suhu dipakai: {temperature}°C, Humid: {humidity}%, AQ: {air_quality} ppm")
     print(f"FUZZY MESSAGE: {message}")
 
-    return jsonify({
+    return {
         "status": "ok",
         "source": "android",
         "device": device_id,
         "folder": DEVICE_FOLDER,
         "message": message,
-        "level": level
-    }), 200
+        "level": level,
+        "trend": trend
+    }
+
+# --- ANTREAN INGEST ---
+# Laporan smartphone diproses worker thread dari antrean terbatas. Jika antrean
+# penuh, request langsung ditolak 429 + Retry-After (UsageDataWorker akan retry)
+# daripada menumpuk thread yang menunggu fuzzy/disk.
+INGEST_QUEUE_SIZE = int(os.environ.get("STRESS_INGEST_QUEUE_SIZE", "64"))
+INGEST_WORKERS = int(os.environ.get("STRESS_INGEST_WORKERS", "2"))
+# Batas waktu handler menunggu hasil; setelah itu dibalas 202 (tetap diproses).
+# Handler tetap menunggu karena UsageDataWorker menampilkan level/pesan dari
+# respons: antrean hanya membatasi kerja fuzzy/disk dan memberi 429 cepat saat
+# penuh, thread Flask yang menunggu tetap dibatasi oleh server WSGI-nya.
+INGEST_RESULT_TIMEOUT_S = 30
+
+metrics.define_histogram("stress_ingest_wait_seconds", "Waktu laporan menunggu di antrean ingest sebelum diproses")
+metrics.define_counter("stress_ingest_rejected_total", "Laporan yang ditolak karena antrean ingest penuh/shutdown")
+
+# --- IDEMPOTENCY ---
+# Kunci: header Idempotency-Key, atau device_id + captured_at dari payload.
+# Laporan dengan kunci yang sudah diproses dibalas dengan respons aslinya.
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_CAPACITY = 10000
+if SHARED is not None:
+    DEDUP = shared_state.SharedDedupIndex(SHARED, IDEMPOTENCY_CAPACITY)
+else:
+    DEDUP = dedup_index.load_default(DATA_FOLDER, IDEMPOTENCY_CAPACITY)
+
+metrics.define_counter("stress_duplicate_uploads_total", "Laporan duplikat yang tidak diproses ulang")
+
+def _idempotency_key(data):
+    device_id = data["device_id"]
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key:
+        # Dibatasi per perangkat agar kunci dari HP berbeda tidak bertabrakan
+        return f"{device_id}:{key[:128]}"
+    if data.get("captured_at") is not None:
+        return f"{device_id}:{data['captured_at']}"
+    return None
+
+def _ingest_job(job):
+    data, key, profile = job
+    try:
+        if profile:
+            # Profil di thread worker, tempat fuzzy/penyimpanan benar-benar berjalan
+            response = PROFILER.run_claimed("receive_usage", _process_usage, data)
+        else:
+            response = _process_usage(data)
+    except BaseException:
+        if key is not None:
+            DEDUP.release(key)
+        raise
+    if key is not None:
+        DEDUP.complete(key, response)
+    return response
+
+INGEST = ingest_queue.IngestQueue(
+    _ingest_job,
+    maxsize=INGEST_QUEUE_SIZE,
+    workers=INGEST_WORKERS,
+    on_wait=lambda seconds: metrics.observe("stress_ingest_wait_seconds", seconds),
+)
+metrics.register_callback("stress_ingest_queue_depth", "Jumlah laporan di antrean ingest", INGEST.depth)
+metrics.register_callback("stress_ingest_queue_capacity", "Kapasitas antrean ingest", lambda: INGEST.maxsize)
+# Didaftarkan setelah ROLLUPS.flush: atexit berjalan LIFO, jadi antrean
+# dikosongkan dulu sebelum rollup terakhir disimpan
+atexit.register(INGEST.shutdown)
+
+@app.route('/receive_usage', methods=['POST'])
+def receive_usage():
+    data, error = _read_payload(payload_codec.validate_usage)
+    if error is not None:
+        return error
+
+    if not FUZZY.wait(FUZZY_WAIT_S):
+        metrics.inc("stress_ingest_rejected_total", reason="warming_up")
+        response = jsonify({"status": "unavailable", "message": "fuzzy engine masih dimuat"})
+        response.headers["Retry-After"] = str(FUZZY_RETRY_AFTER_S)
+        return response, 503
+
+    key = _idempotency_key(data)
+    if key is not None:
+        is_new, previous = DEDUP.claim(key)
+        if not is_new:
+            metrics.inc("stress_duplicate_uploads_total")
+            print(f"[INFO] Laporan duplikat diabaikan: {key}")
+            if previous is None:
+                return jsonify({
+                    "status": "accepted",
+                    "source": "android",
+                    "device": data["device_id"],
+                    "message": "Laporan yang sama sedang diproses"
+                }), 202
+            response = jsonify(previous)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response, 200
+
+    # Handler hanya menunggu future; profil (jika terpilih) diambil di _ingest_job
+    profile = PROFILER.claim()
+    try:
+        future = INGEST.submit((data, key, profile))
+    except ingest_queue.QueueFull as e:
+        if profile:
+            PROFILER.release()
+        if key is not None:
+            DEDUP.release(key)
+        metrics.inc("stress_ingest_rejected_total", reason="full")
+        response = jsonify({"status": "busy", "message": str(e), "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    except ingest_queue.QueueClosed as e:
+        if profile:
+            PROFILER.release()
+        if key is not None:
+            DEDUP.release(key)
+        metrics.inc("stress_ingest_rejected_total", reason="shutdown")
+        response = jsonify({"status": "unavailable", "message": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    try:
+        return jsonify(future.result(timeout=INGEST_RESULT_TIMEOUT_S)), 200
+    except ingest_queue.ResultTimeout:
+        return jsonify({
+            "status": "accepted",
+            "source": "android",
+            "device": data.get("device_id", "unknown_device"),
+            "message": "Data diterima dan sedang diproses"
+        }), 202
 
 @app.route('/receive_sensor', methods=['POST'])
+@PROFILER.wrap
 def receive_sensor():
     global LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, LAST_IOT_TIMESTAMP
 
-    data = request.get_json(force=True)
-    if not data:
-        return jsonify({"status": "error", "message": "no json received"}), 400
+    data, error = _read_payload(payload_codec.validate_sensor)
+    if error is not None:
+        return error
+
+    room_id = data.get("room_id", DEFAULT_ROOM_ID)
 
-    LAST_TEMPERATURE = data.get("temperature", LAST_TEMPERATURE)
-    LAST_HUMIDITY = data.get("humidity", LAST_HUMIDITY)
-    LAST_AIRQUALITY = data.get("air_quality", LAST_AIRQUALITY)
+    # Nilai yang dikarantina tidak menggantikan bacaan terakhir yang valid
+    accepted, decisions = ANOMALY.evaluate(
+        room_id, {metric: data[metric] for metric in sensor_anomaly.METRICS if metric in data}
+    )
+    anomalies = {}
+    for metric, decision in decisions.items():
+        metrics.inc("stress_sensor_readings_total", room=room_id, metric=metric, decision=decision["decision"])
+        if decision["decision"] not in ("ok", "warmup"):
+            anomalies[metric] = dict(decision, value=data[metric])
+            print(f"[ANOMALI] {room_id}/{metric} = {data[metric]} (median {decision['median']}, "
+                  f"skor {decision['score']}) -> {decision['decision']}")
+
+    # Mulai dari snapshot bersama (bisa ditulis worker lain), bukan global lokal yang mungkin basi
+    temperature, humidity, air_quality, _ = _current_sensor()
+    LAST_TEMPERATURE = accepted.get("temperature", temperature)
+    LAST_HUMIDITY = accepted.get("humidity", humidity)
+    LAST_AIRQUALITY = accepted.get("air_quality", air_quality)
     LAST_IOT_TIMESTAMP = datetime.now()
 
+    SENSOR_LAST_SEEN[room_id] = LAST_IOT_TIMESTAMP
+    if SHARED is not None:
+        SHARED.set_sensor(room_id, LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY, LAST_IOT_TIMESTAMP)
+
+    with _write_lock(os.path.join(DATA_FOLDER, "rooms")):
+        ROLLUPS.record_sensor(room_id, LAST_IOT_TIMESTAMP, LAST_TEMPERATURE, LAST_HUMIDITY, LAST_AIRQUALITY)
+
+    STREAM.publish({
+        "type": "room",
+        "room": room_id,
+        "timestamp": LAST_IOT_TIMESTAMP.isoformat(),
+        "temperature": LAST_TEMPERATURE,
+        "humidity": LAST_HUMIDITY,
+        "air_quality": LAST_AIRQUALITY
+    })
+
     print(f"\n[{LAST_IOT_TIMESTAMP.isoformat()}] === Data IoT ===")
     print(f"Suhu: {LAST_TEMPERATURE} °C | Humid: {LAST_HUMIDITY}% | AQ: {LAST_AIRQUALITY} ppm")
 
-    return jsonify({"status": "ok", "message": "Sensor data updated"}), 200
+    response = {"status": "ok", "message": "Sensor data updated"}
+    if anomalies:
+        response["anomalies"] = anomalies
+    return jsonify(response), 200
+
+@app.route('/health', methods=['GET'])
+def health():
+    # Liveness: selalu 200 selama proses hidup; "ready" menandakan engine siap
+    return jsonify({
+        "status": "ok" if FUZZY.ready else "starting",
+        "ready": FUZZY.ready,
+        "error": str(FUZZY.error) if FUZZY.error is not None else None,
+        "startup_s": {phase: round(seconds, 4) for phase, seconds in _startup_timings().items()}
+    }), 200
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    if FUZZY.ready:
+        return jsonify({"status": "ok"}), 200
+    response = jsonify({"status": "starting"})
+    response.headers["Retry-After"] = str(FUZZY_RETRY_AFTER_S)
+    return response, 503
+
+def _split_param(name):
+    return [value.strip() for value in request.args.get(name, "").split(",") if value.strip()]
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    subscriber = STREAM.subscribe(_split_param("device"), _split_param("room"))
+    if subscriber is None:
+        response = jsonify({"status": "busy", "message": "jumlah subscriber /stream sudah maksimum"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                events = subscriber.next_events(STREAM_HEARTBEAT_S)
+                if not events:
+                    # Komentar SSE menjaga koneksi tetap hidup lewat proxy
+                    yield ": keepalive\n\n"
+                    continue
+                for event in events:
+                    yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            STREAM.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/devices/<device_id>/history', methods=['GET'])
+def device_history(device_id):
+    _, OVERALL_CSV, _ = _device_paths(device_id)
+    if not segments.segment_paths(OVERALL_CSV):
+        return jsonify({"status": "error", "message": f"device {device_id} tidak ditemukan"}), 404
+
+    try:
+        start = history_index.normalize_timestamp(request.args.get("from"))
+        end = history_index.normalize_timestamp(request.args.get("to"))
+        limit = int(request.args.get("limit", HISTORY_DEFAULT_LIMIT))
+        cursor = request.args.get("cursor") or None
+        if cursor is not None:
+            # Cursor lama/kedaluwarsa ditolak sebelum respons mulai di-stream
+            segments.resolve_cursor(OVERALL_CSV, cursor, start, end)
+    except segments.StaleCursor as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"parameter tidak valid: {e}"}), 400
+
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+    info = REGISTRY.get(device_id)
+    trend = info.trend.snapshot(datetime.now()) if info is not None else None
+
+    def generate():
+        # JSON dikirim bertahap: baris di-stream langsung dari file
+        yield json.dumps({"status": "ok", "device": device_id, "trend": trend})[:-1] + ', "rows": ['
+        rows = segments.query_range(OVERALL_CSV, start, end, limit, cursor)
+        first = True
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration as stop:
+                next_cursor = stop.value
+                break
+            yield ("" if first else ",") + json.dumps(row)
+            first = False
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+    return Response(generate(), mimetype="application/json")
+
+def _rollup_response(scope, key):
+    resolution = request.args.get("resolution", "hour")
+    if resolution not in rollups.RESOLUTIONS:
+        return jsonify({"status": "error", "message": f"resolution harus salah satu dari {rollups.RESOLUTIONS}"}), 400
+    try:
+        days = int(request.args.get("days", ROLLUP_DEFAULT_DAYS))
+    except ValueError:
+        return jsonify({"status": "error", "message": "days harus berupa angka"}), 400
+    days = max(1, min(days, ROLLUP_MAX_DAYS))
+
+    buckets = ROLLUPS.query_days(scope, key, resolution, days)
+    return jsonify({
+        "status": "ok",
+        scope: key,
+        "resolution": resolution,
+        "days": days,
+        "buckets": buckets
+    }), 200
+
+@app.route('/devices/<device_id>/rollups', methods=['GET'])
+def device_rollups(device_id):
+    return _rollup_response("device", device_id)
+
+@app.route('/rooms/<room_id>/rollups', methods=['GET'])
+def room_rollups(room_id):
+    return _rollup_response("room", room_id)
+
+# Engine mulai dimuat begitu modul selesai diimport (worker gunicorn hasil
+# fork --preload memulai ulang sendiri lewat FUZZY.wait)
+_replay_journal()
+REGISTRY.load()
+STARTUP_TIMINGS["server_import"] = time.perf_counter() - STARTUP_BEGIN
+FUZZY.start()
+print(f"[STARTUP] server.py dimuat dalam {STARTUP_TIMINGS['server_import']:.2f}s, fuzzy engine dimuat di background")
+
+def _handle_sigterm(signum, frame):
+    # SystemExit menjalankan atexit: antrean ingest dikosongkan, rollup disimpan
+    print("[INFO] SIGTERM diterima, menyelesaikan antrean ingest...")
+    sys.exit(0)
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _handle_sigterm)
     print("Server Flask aktif di http://0.0.0.0:5000 ...")
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
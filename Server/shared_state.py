@@ -0,0 +1,223 @@
+"""
+State bersama untuk mode multi-worker (mis. gunicorn -w 4).
+
+Setiap worker adalah proses terpisah, jadi state global di server.py tidak
+terlihat oleh worker lain. Modul ini menyimpan:
+- data sensor terakhir per ruangan  -> SQLite (data/shared_state.db)
+- registry perangkat (first/last seen) -> SQLite
+- kepemilikan tulis per perangkat   -> file lock (fcntl) di folder perangkat
+- kunci idempotency upload          -> SQLite (SharedDedupIndex)
+
+Menjalankan:
+    STRESS_MULTI_WORKER=1 gunicorn -w 4 -b 0.0.0.0:5000 server:app
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LOCK_FILENAME = ".write.lock"
+
+# Klaim idempotency tanpa respons lebih tua dari ini dianggap milik worker
+# yang crash, jadi boleh diklaim ulang (detik)
+IDEMPOTENCY_PENDING_TIMEOUT = 120
+# Pemangkasan tabel idempotency dijalankan setiap N laporan selesai
+IDEMPOTENCY_PRUNE_EVERY = 100
+
+# Interval minimum antar update last_seen per perangkat (detik), agar tidak
+# menulis SQLite di setiap request
+LAST_SEEN_INTERVAL = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sensor_state (
+    room_id     TEXT PRIMARY KEY,
+    temperature REAL,
+    humidity    REAL,
+    air_quality REAL,
+    updated_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS devices (
+    device_id  TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS idempotency (
+    key        TEXT PRIMARY KEY,
+    response   TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_created ON idempotency (created_at);
+"""
+
+
+class SharedState:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._seen = {}  # device_id -> waktu update last_seen terakhir (monotonic)
+        # marker kepemilikan terakhir yang ditulis proses ini per folder perangkat
+        self._markers = {}
+        self._marker_seq = 0
+        self._marker_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        # Koneksi SQLite tidak boleh dipakai lintas fork (gunicorn --preload)
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local = threading.local()
+            self._local.pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- SENSOR ---
+    def set_sensor(self, room_id, temperature, humidity, air_quality, timestamp):
+        self._conn().execute(
+            "INSERT INTO sensor_state (room_id, temperature, humidity, air_quality, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(room_id) DO UPDATE SET temperature=excluded.temperature, "
+            "humidity=excluded.humidity, air_quality=excluded.air_quality, updated_at=excluded.updated_at",
+            (room_id, temperature, humidity, air_quality, timestamp.isoformat())
+        )
+
+    def latest_sensor(self):
+        """(room_id, temperature, humidity, air_quality, datetime) terbaru, atau None."""
+        row = self._conn().execute(
+            "SELECT room_id, temperature, humidity, air_quality, updated_at "
+            "FROM sensor_state ORDER BY updated_at DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2], row[3], datetime.fromisoformat(row[4])
+
+    def sensor_last_seen(self):
+        rows = self._conn().execute("SELECT room_id, updated_at FROM sensor_state").fetchall()
+        return {room_id: datetime.fromisoformat(updated_at) for room_id, updated_at in rows}
+
+    # --- REGISTRY PERANGKAT ---
+    def touch_device(self, device_id, now_dt):
+        """Catat kontak perangkat; True jika perangkat belum pernah terlihat sama sekali."""
+        last = self._seen.get(device_id)
+        now_mono = time.monotonic()
+        if last is not None and now_mono - last < LAST_SEEN_INTERVAL:
+            return False
+        self._seen[device_id] = now_mono
+
+        now = now_dt.isoformat()
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO devices (device_id, first_seen, last_seen) VALUES (?, ?, ?)",
+            (device_id, now, now)
+        )
+        if cursor.rowcount == 1:
+            return True
+        conn.execute("UPDATE devices SET last_seen = ? WHERE device_id = ?", (now, device_id))
+        return False
+
+    def device_count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    # --- KEPEMILIKAN TULIS ---
+    @contextmanager
+    def device_lock(self, device_folder, on_foreign_write=None):
+        """Kunci eksklusif antar proses untuk menulis file di folder perangkat.
+
+        Setelah menulis, proses menyimpan marker unik ke file lock. Jika saat
+        mengambil lock marker berbeda dari yang terakhir ditulis proses ini,
+        berarti worker lain sempat menulis; on_foreign_write(device_folder)
+        dipanggil supaya cache in-memory (offset index, snapshot delta)
+        dibuang sebelum menulis lagi.
+        """
+        import fcntl
+
+        os.makedirs(device_folder, exist_ok=True)
+        lock_path = os.path.join(device_folder, LOCK_FILENAME)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            current = os.pread(fd, 64, 0).decode("ascii", "ignore")
+            expected = self._markers.get(device_folder)
+            if current != expected and on_foreign_write is not None:
+                on_foreign_write(device_folder)
+
+            with self._marker_lock:
+                self._marker_seq += 1
+                marker = f"{os.getpid()}:{self._marker_seq}"
+            try:
+                yield
+            except BaseException:
+                # Tulisan mungkin setengah jadi: marker "dirty" memaksa semua
+                # proses (termasuk proses ini) membuang cache perangkat ini
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, f"dirty:{marker}".encode("ascii"), 0)
+                self._markers.pop(device_folder, None)
+                raise
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, marker.encode("ascii"), 0)
+            self._markers[device_folder] = marker
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+class SharedDedupIndex:
+    """Padanan dedup_index.DedupIndex untuk mode multi-worker (tabel SQLite bersama)."""
+
+    def __init__(self, shared, capacity=10000):
+        self.shared = shared
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._completed = 0
+
+    def __len__(self):
+        return self.shared._conn().execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+
+    def claim(self, key):
+        conn = self.shared._conn()
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO idempotency (key, response, created_at) VALUES (?, NULL, ?)",
+            (key, now)
+        )
+        if cursor.rowcount == 1:
+            self.misses += 1
+            return True, None
+
+        # Klaim lama tanpa respons: worker pemiliknya kemungkinan mati
+        cursor = conn.execute(
+            "UPDATE idempotency SET created_at = ? WHERE key = ? AND response IS NULL AND created_at < ?",
+            (now, key, now - IDEMPOTENCY_PENDING_TIMEOUT)
+        )
+        if cursor.rowcount == 1:
+            self.misses += 1
+            return True, None
+
+        self.hits += 1
+        row = conn.execute("SELECT response FROM idempotency WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return False, None
+        return False, json.loads(row[0])
+
+    def complete(self, key, response):
+        conn = self.shared._conn()
+        conn.execute("UPDATE idempotency SET response = ? WHERE key = ?", (json.dumps(response), key))
+        self._completed += 1
+        if self._completed % IDEMPOTENCY_PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM idempotency WHERE key IN "
+                "(SELECT key FROM idempotency ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.capacity,)
+            )
+
+    def release(self, key):
+        self.shared._conn().execute("DELETE FROM idempotency WHERE key = ? AND response IS NULL", (key,))
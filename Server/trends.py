@@ -0,0 +1,126 @@
+"""
+Tren stres per perangkat yang diperbarui inkremental di jalur ingest.
+
+Untuk setiap perangkat disimpan:
+- EWMA (exponentially weighted moving average) stress_value dan screen
+  time. Bobot memperhitungkan jarak waktu antar laporan: laporan yang
+  datang setelah jeda panjang lebih menggeser rata-rata
+  (alpha = 1 - 2^(-dt / half_life)).
+- Jendela bergulir tetap (1 jam, 24 jam): count, rata-rata, min dan max.
+  Setiap jendela dibagi menjadi WINDOW_SLOTS slot waktu, jadi memori tetap
+  dan update O(1) (amortized) tanpa membaca ulang baris yang tersimpan.
+  Batas jendela mengikuti granularitas slot (1 menit untuk 1 jam, 24 menit
+  untuk 24 jam).
+
+Tren hanya ada di memori proses: dimulai kosong setelah restart, dan di
+mode multi-worker setiap proses hanya melihat laporan yang diprosesnya.
+"""
+
+import math
+import threading
+from collections import deque
+
+METRICS = ("stress_value", "screen_time_s")
+
+EWMA_HALF_LIFE_S = 15 * 60
+WINDOWS = {"1h": 3600, "24h": 24 * 3600}
+WINDOW_SLOTS = 60
+
+
+class _Slot:
+    __slots__ = ("start", "count", "sum", "min", "max")
+
+    def __init__(self, start):
+        self.start = start
+        self.count = 0
+        self.sum = [0.0] * len(METRICS)
+        self.min = [math.inf] * len(METRICS)
+        self.max = [-math.inf] * len(METRICS)
+
+
+class RollingWindow:
+    def __init__(self, span_s, slots=WINDOW_SLOTS):
+        self.span_s = span_s
+        self.slot_s = span_s / slots
+        self._slots = deque()
+        self.count = 0
+        self.sum = [0.0] * len(METRICS)
+
+    def add(self, ts, values):
+        start = ts - ts % self.slot_s
+        if not self._slots or self._slots[-1].start < start:
+            self._slots.append(_Slot(start))
+        # Laporan yang datang terlambat (jam mundur) masuk ke slot terakhir
+        slot = self._slots[-1]
+        slot.count += 1
+        self.count += 1
+        for i, value in enumerate(values):
+            slot.sum[i] += value
+            self.sum[i] += value
+            if value < slot.min[i]:
+                slot.min[i] = value
+            if value > slot.max[i]:
+                slot.max[i] = value
+        self._evict(ts)
+
+    def _evict(self, now_ts):
+        cutoff = now_ts - self.span_s
+        while self._slots and self._slots[0].start + self.slot_s <= cutoff:
+            slot = self._slots.popleft()
+            self.count -= slot.count
+            for i in range(len(METRICS)):
+                self.sum[i] -= slot.sum[i]
+        if not self._slots:
+            # Buang sisa galat pembulatan saat jendela kosong
+            self.sum = [0.0] * len(METRICS)
+
+    def snapshot(self, now_ts):
+        self._evict(now_ts)
+        result = {"count": self.count}
+        for i, metric in enumerate(METRICS):
+            if self.count:
+                result[f"{metric}_mean"] = round(self.sum[i] / self.count, 3)
+                # min/max dihitung dari paling banyak WINDOW_SLOTS slot
+                result[f"{metric}_min"] = min(slot.min[i] for slot in self._slots)
+                result[f"{metric}_max"] = max(slot.max[i] for slot in self._slots)
+            else:
+                result[f"{metric}_mean"] = result[f"{metric}_min"] = result[f"{metric}_max"] = None
+        return result
+
+
+class DeviceTrend:
+    def __init__(self, half_life_s=EWMA_HALF_LIFE_S, windows=None):
+        self.half_life_s = half_life_s
+        self.windows = {name: RollingWindow(span) for name, span in (windows or WINDOWS).items()}
+        self.ewma = None
+        self.last_ts = None
+        self._lock = threading.Lock()
+
+    def update(self, now_dt, stress_value, screen_time_s):
+        """Tambahkan satu laporan; mengembalikan snapshot tren setelah update."""
+        ts = now_dt.timestamp()
+        values = (float(stress_value), float(screen_time_s))
+        with self._lock:
+            if self.ewma is None:
+                self.ewma = list(values)
+            else:
+                dt = max(ts - self.last_ts, 0.0)
+                alpha = 1.0 - 2.0 ** (-dt / self.half_life_s)
+                for i, value in enumerate(values):
+                    self.ewma[i] += alpha * (value - self.ewma[i])
+            self.last_ts = ts
+            for window in self.windows.values():
+                window.add(ts, values)
+            return self._snapshot(ts)
+
+    def snapshot(self, now_dt):
+        with self._lock:
+            return self._snapshot(now_dt.timestamp())
+
+    def _snapshot(self, now_ts):
+        return {
+            "ewma": None if self.ewma is None else {
+                metric: round(value, 3) for metric, value in zip(METRICS, self.ewma)
+            },
+            "windows": {name: window.snapshot(now_ts) for name, window in self.windows.items()},
+        }
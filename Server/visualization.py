@@ -12,11 +12,17 @@ FEATURES:
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
 import seaborn as sns
 from datetime import datetime
 import os
 import re
 
+import history_index
+import segments
+import data_layout
+import report_render
+
 try:
     import fuzzy_logic
     print("✅ Modul 'fuzzy_logic' berhasil diimpor.")
@@ -33,6 +39,50 @@ except Exception as e:
 # PATH CSV
 # ====================================
 YOUR_CSV_FILE = 'data/dataset_overall.csv'
+# Isi dengan device_id untuk memakai dataset perangkat dari folder data server
+# (path diselesaikan lewat data_layout, flat maupun sharded)
+DEVICE_ID = None
+
+# Jendela waktu (ISO, mis. '2025-12-01' atau None = semua data). Untuk file
+# server (<folder perangkat>/dataset_<id>.csv) hanya segmen hasil rotasi yang
+# beririsan dengan jendela ini yang dibuka.
+WINDOW_START = None
+WINDOW_END = None
+
+# Mode streaming (out-of-core) untuk CSV gabungan yang sangat besar: CSV dibaca
+# per CHUNK_ROWS baris, statistik & input plot dihitung inkremental, memori
+# tetap. True/False, atau "auto" = aktif jika total file > STREAMING_THRESHOLD_BYTES.
+STREAMING_MODE = "auto"
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+CHUNK_ROWS = 200_000
+# Sampel per kategori untuk scatter dan box plot di mode streaming
+STREAM_SAMPLE_PER_CATEGORY = 2000
+
+# Tabel validasi (04_validation_table):
+# "paged"   = semua baris, dipecah per TABLE_ROWS_PER_PAGE baris
+# "summary" = sampel terstratifikasi TABLE_SAMPLE_PER_CATEGORY baris per kategori
+# "auto"    = paged, kecuali data lebih dari TABLE_MAX_PAGES halaman atau mode streaming
+# Halaman ditulis sebagai 04_validation_table.png, 04_validation_table_p2.png, ...
+# atau satu PDF multi-halaman (TABLE_FORMAT = "pdf").
+TABLE_MODE = "auto"
+TABLE_FORMAT = "png"
+TABLE_ROWS_PER_PAGE = 50
+TABLE_MAX_PAGES = 20
+TABLE_SAMPLE_PER_CATEGORY = 10
+
+# Plot progresi (05_line_plot_progression): di atas PROGRESSION_MAX_POINTS titik
+# kurva di-downsample dengan LTTB; di atas PROGRESSION_LABEL_ALL titik hanya
+# nilai ekstrem & perpindahan kategori (batas 35/65) yang diberi label.
+PROGRESSION_MAX_POINTS = 2000
+PROGRESSION_LABEL_ALL = 50
+STRESS_BOUNDARIES = [35, 65]
+
+# Jumlah proses untuk render figur (None = sebanyak CPU, maksimal 5; 1 = berurutan)
+RENDER_WORKERS = None
+
+# Lewati figur yang input, kode plot dan rule base fuzzy-nya tidak berubah sejak
+# render terakhir (manifest: <output_dir>/render_manifest.json). False = render semua.
+REPORT_CACHE = True
 
 
 # ====================================
@@ -72,147 +122,181 @@ def parse_time_indonesian(time_str):
     return round(total_hours, 3)
 
 
+# Satu regex untuk "<j> jam <m> menit <d> detik" (setiap bagian opsional)
+TIME_PARTS_PATTERN = r'(?i)^(?:.*?(\d+)\s*jam)?(?:.*?(\d+)\s*menit)?(?:.*?(\d+)\s*detik)?'
+
+
+def parse_time_series(series):
+    """Versi vektor parse_time_indonesian untuk satu kolom (Series jam float)"""
+    text = series.astype(str).str.strip()
+    numeric = pd.to_numeric(text, errors='coerce')
+    # "nan"/"inf" adalah angka bagi float(), tapi bukan durasi: jadikan NaN
+    # (bukan 0 dari parser jam/menit) agar baris itu terbuang sebagai data kosong
+    is_number = numeric.notna() | text.str.fullmatch(r'(?i)[+-]?(?:nan|inf|infinity)')
+    numeric = numeric.where(np.isfinite(numeric))
+    parts = text.str.extract(TIME_PARTS_PATTERN).astype(float).fillna(0)
+    total_hours = (parts[0] + parts[1] / 60 + parts[2] / 3600).round(3)
+    return numeric.where(is_number, total_hours).where(series.notna())
+
+
+CATEGORY_STRESS = {
+    'Rendah': 25.0,
+    'Sedang': 50.0,
+    'Tinggi': 80.0,
+    'Low': 25.0,
+    'Medium': 50.0,
+    'High': 80.0
+}
+
+
 def category_to_stress(category):
     """Konversi kategori ke stress value (estimasi)"""
-    mapping = {
-        'Rendah': 25.0,
-        'Sedang': 50.0,
-        'Tinggi': 80.0,
-        'Low': 25.0,
-        'Medium': 50.0,
-        'High': 80.0
-    }
-    return mapping.get(category, 50.0)
+    return CATEGORY_STRESS.get(category, 50.0)
+
+
 
 
 # ====================================
 # GENERATE DATASET
 # ====================================
-def generate_from_csv(csv_file):
-    """Load test cases from CSV with smart detection"""
-    try:
-        if not os.path.exists(csv_file):
-            raise FileNotFoundError(f"File tidak ditemukan: {csv_file}")
-        
-        df_input = pd.read_csv(csv_file)
-        print(f"✅ Berhasil membaca CSV: {len(df_input)} baris")
-        print(f"📋 Kolom yang tersedia: {list(df_input.columns)}")
-        
-        # Deteksi kolom waktu
-        if 'total_usage_time' in df_input.columns:
-            time_col = 'total_usage_time'
-        elif 'screentime' in df_input.columns:
-            time_col = 'screentime'
-        else:
-            raise ValueError("Kolom waktu tidak ditemukan")
-        
-        # ⭐ CEK: Apakah sudah ada fuzzy_level di CSV?
-        has_fuzzy_level = 'fuzzy_level' in df_input.columns
-        
+def prepare_frame(df_input, id_start=1, verbose=True):
+    """Bersihkan & hitung stress untuk satu DataFrame mentah (seluruh file atau satu chunk)"""
+    # Deteksi kolom waktu
+    if 'total_usage_time' in df_input.columns:
+        time_col = 'total_usage_time'
+    elif 'screentime' in df_input.columns:
+        time_col = 'screentime'
+    else:
+        raise ValueError("Kolom waktu tidak ditemukan")
+
+    # ⭐ CEK: Apakah sudah ada fuzzy_level di CSV?
+    has_fuzzy_level = 'fuzzy_level' in df_input.columns
+
+    if verbose:
         if has_fuzzy_level:
             print(f"✅ Terdeteksi kolom 'fuzzy_level' - Akan menggunakan data yang sudah ada")
         else:
             print(f"⚠️  Kolom 'fuzzy_level' tidak ada - Akan menghitung dengan fuzzy_logic")
-        
+
         print(f"✅ Menggunakan kolom waktu: '{time_col}'")
-        
-        # Validasi kolom yang diperlukan
-        required_cols = [time_col, 'temperature', 'humidity', 'air_quality']
-        missing_cols = [col for col in required_cols if col not in df_input.columns]
-        if missing_cols:
-            raise ValueError(f"Kolom yang hilang: {missing_cols}")
-        
-        # Konversi waktu dari format Indonesia
+
+    # Validasi kolom yang diperlukan
+    required_cols = [time_col, 'temperature', 'humidity', 'air_quality']
+    missing_cols = [col for col in required_cols if col not in df_input.columns]
+    if missing_cols:
+        raise ValueError(f"Kolom yang hilang: {missing_cols}")
+
+    # Konversi waktu dari format Indonesia
+    df_input['screentime_hours'] = parse_time_series(df_input[time_col])
+    if verbose:
         print(f"\n🔄 Konversi format waktu...")
-        df_input['screentime_hours'] = df_input[time_col].apply(parse_time_indonesian)
         print(f"   Range waktu: {df_input['screentime_hours'].min():.1f}h - {df_input['screentime_hours'].max():.1f}h")
-        
-        # Bersihkan data numerik lainnya
-        numeric_cols = ['temperature', 'humidity', 'air_quality']
-        for col in numeric_cols:
-            if df_input[col].dtype == 'object':
-                df_input[col] = df_input[col].astype(str).str.replace(',', '.')
-            df_input[col] = pd.to_numeric(df_input[col], errors='coerce')
-        
-        # Hapus baris dengan nilai NaN
-        rows_before = len(df_input)
-        check_cols = ['screentime_hours'] + numeric_cols
-        if has_fuzzy_level:
-            check_cols.append('fuzzy_level')
-        
-        df_input.dropna(subset=check_cols, inplace=True)
-        rows_after = len(df_input)
-        
-        if rows_before != rows_after:
-            print(f"⚠️ Dihapus {rows_before - rows_after} baris dengan data tidak valid")
-        
-        if len(df_input) == 0:
-            raise ValueError("Tidak ada data valid setelah pembersihan")
-        
+
+    # Bersihkan data numerik lainnya
+    numeric_cols = ['temperature', 'humidity', 'air_quality']
+    for col in numeric_cols:
+        if df_input[col].dtype == 'object':
+            df_input[col] = df_input[col].astype(str).str.replace(',', '.')
+        df_input[col] = pd.to_numeric(df_input[col], errors='coerce')
+
+    # Hapus baris dengan nilai NaN
+    rows_before = len(df_input)
+    check_cols = ['screentime_hours'] + numeric_cols
+    if has_fuzzy_level:
+        check_cols.append('fuzzy_level')
+
+    df_input.dropna(subset=check_cols, inplace=True)
+    rows_after = len(df_input)
+
+    if rows_before != rows_after:
+        print(f"⚠️ Dihapus {rows_before - rows_after} baris dengan data tidak valid")
+
+    if verbose:
         print(f"✅ Data valid: {len(df_input)} baris")
-        
-        # Proses setiap baris
-        data = []
+
+    # Proses semua baris sekaligus (tanpa iterrows)
+    if verbose:
         print(f"\n🧮 Memproses data...")
-        
-        for idx, row in df_input.iterrows():
-            screen = row['screentime_hours']
-            temp = row['temperature']
-            humid = row['humidity']
-            aq = row['air_quality']
-            desc = row.get('message', row.get('description', f"Case ID: {idx + 1}"))
-            
-            # ⭐ LOGIC: Gunakan fuzzy_level dari CSV jika ada
-            if has_fuzzy_level and pd.notna(row['fuzzy_level']):
-                category = row['fuzzy_level']
-                stress_val = category_to_stress(category)
-                source = "CSV"
-            else:
-                # Hitung dengan fuzzy logic
-                if SKFUZZY_AVAILABLE:
-                    try:
-                        result = fuzzy_logic.calculate_stress(screen, temp, humid, aq)
-                        stress_val = result['stress_value']
-                        category = result['category']
-                        source = "Calculated"
-                    except Exception as e:
-                        print(f"⚠️ Error menghitung stress untuk baris {idx}: {e}")
-                        stress_val = 50.0
-                        category = "Sedang"
-                        source = "Default"
-                else:
-                    # Fallback calculation
-                    stress_val = min(100, max(0, (screen * 3) + (temp * 0.5) + (humid * 0.3) + (aq * 0.5)))
-                    if stress_val < 35:
-                        category = "Rendah"
-                    elif stress_val < 65:
-                        category = "Sedang"
-                    else:
-                        category = "Tinggi"
-                    source = "Fallback"
-            
-            data.append({
-                'id': len(data) + 1,
-                'screentime': screen,
-                'temperature': temp,
-                'humidity': humid,
-                'air_quality': aq,
-                'stress_value': stress_val,
-                'category': category,
-                'description': desc,
-                'source': source
-            })
-        
-        df_result = pd.DataFrame(data)
-        
+    screen = df_input['screentime_hours'].to_numpy(dtype=float)
+    temp = df_input['temperature'].to_numpy(dtype=float)
+    humid = df_input['humidity'].to_numpy(dtype=float)
+    aq = df_input['air_quality'].to_numpy(dtype=float)
+
+    if 'message' in df_input.columns:
+        desc = df_input['message']
+    elif 'description' in df_input.columns:
+        desc = df_input['description']
+    else:
+        desc = "Case ID: " + (df_input.index + 1).astype(str)
+
+    # ⭐ LOGIC: Gunakan fuzzy_level dari CSV jika ada (baris NaN sudah dibuang)
+    if len(df_input) == 0:
+        stress_val = np.empty(0)
+        category = np.empty(0, dtype=object)
+        source = None
+    elif has_fuzzy_level:
+        category = df_input['fuzzy_level'].to_numpy()
+        stress_val = df_input['fuzzy_level'].map(CATEGORY_STRESS).fillna(50.0).to_numpy()
+        source = "CSV"
+    elif SKFUZZY_AVAILABLE:
+        # Hitung dengan fuzzy logic, satu evaluasi batch untuk semua baris
+        try:
+            result = fuzzy_logic.calculate_stress_batch(screen, temp, humid, aq)
+            stress_val = result['stress_value']
+            category = result['category']
+            source = "Calculated"
+        except Exception as e:
+            # Jangan buang seluruh batch: hitung per baris, error hanya
+            # membuat baris itu sendiri bernilai default 50
+            print(f"⚠️ Error menghitung stress (batch): {e} - dihitung per baris")
+            results = [fuzzy_logic.calculate_stress(*row) for row in zip(screen, temp, humid, aq)]
+            stress_val = np.array([r['stress_value'] for r in results], dtype=float)
+            category = np.array([r['category'] for r in results])
+            source = "Calculated"
+    else:
+        # Fallback calculation
+        stress_val = np.clip((screen * 3) + (temp * 0.5) + (humid * 0.3) + (aq * 0.5), 0, 100)
+        category = np.where(stress_val < 35, "Rendah", np.where(stress_val < 65, "Sedang", "Tinggi"))
+        source = "Fallback"
+
+    return pd.DataFrame({
+        'id': np.arange(id_start, id_start + len(df_input)),
+        'screentime': screen,
+        'temperature': temp,
+        'humidity': humid,
+        'air_quality': aq,
+        'stress_value': stress_val,
+        'category': category,
+        'description': np.asarray(desc),
+        'source': source
+    })
+
+
+def generate_from_csv(csv_file):
+    """Load test cases from CSV with smart detection"""
+    try:
+        df_input = segments.read_dataset(
+            csv_file,
+            history_index.normalize_timestamp(WINDOW_START),
+            history_index.normalize_timestamp(WINDOW_END)
+        )
+        print(f"✅ Berhasil membaca CSV: {len(df_input)} baris")
+        print(f"📋 Kolom yang tersedia: {list(df_input.columns)}")
+
+        has_fuzzy_level = 'fuzzy_level' in df_input.columns
+        df_result = prepare_frame(df_input)
+
+        if len(df_result) == 0:
+            raise ValueError("Tidak ada data valid setelah pembersihan")
+
         # Print summary
-        print(f"\n✅ Berhasil memproses {len(data)} test cases")
+        print(f"\n✅ Berhasil memproses {len(df_result)} test cases")
         if has_fuzzy_level:
             print(f"   📊 Distribusi kategori dari CSV:")
             print(f"      {df_result['category'].value_counts().to_dict()}")
-        
+
         return df_result
-    
+
     except FileNotFoundError as e:
         print(f"❌ ERROR: {e}")
         print(f"   Path yang dicoba: {os.path.abspath(csv_file)}")
@@ -228,309 +312,523 @@ def generate_from_csv(csv_file):
 
 
 # ====================================
-# VISUALIZATION FUNCTIONS
+# RINGKASAN DATA (input semua plot & laporan)
 # ====================================
-def create_visualizations(df, output_dir='custom_results'):
-    """Create all 5 visualization types"""
-    
-    if df.empty:
-        print("❌ Tidak ada data untuk visualisasi.")
-        return
-    
+NUMERIC_COLS = ['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value']
+
+
+def summarize(df):
+    """Ringkasan persis dari DataFrame yang dimuat penuh"""
+    stress = df['stress_value']
+    return {
+        'n': len(df),
+        'stress_mean': stress.mean(),
+        'stress_median': stress.median(),
+        'stress_std': stress.std(),
+        'stress_min': stress.min(),
+        'stress_max': stress.max(),
+        'stress_nunique': stress.nunique(),
+        # Histogram: nilai + bobot (None = setiap nilai berbobot 1)
+        'stress_values': stress,
+        'stress_weights': None,
+        'category_counts': df['category'].value_counts(),
+        'corr': df[NUMERIC_COLS].corr(),
+        'progression': (np.arange(len(df)), np.sort(stress.to_numpy())),
+    }
+
+
+class StreamingAggregates:
+    """Statistik inkremental per chunk dengan memori tetap.
+
+    - histogram stress resolusi 0.1 (median, kuantil, distribusi)
+    - mean & co-moment gabungan (algoritma paralel Chan) untuk korelasi
+    - jumlah per kategori
+    - sampel acak per kategori (kunci acak terkecil) untuk plot titik
+    """
+
+    HIST_BINS = np.linspace(0, 100, 1001)
+
+    def __init__(self, sample_per_category=STREAM_SAMPLE_PER_CATEGORY, seed=42):
+        self.n = 0
+        self.mean = np.zeros(len(NUMERIC_COLS))
+        self.comoment = np.zeros((len(NUMERIC_COLS), len(NUMERIC_COLS)))
+        self.stress_min = np.inf
+        self.stress_max = -np.inf
+        self.hist = np.zeros(len(self.HIST_BINS) - 1, dtype=np.int64)
+        self.category_counts = {}
+        self.sample_per_category = sample_per_category
+        self.sample = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        if len(chunk) == 0:
+            return
+        values = chunk[NUMERIC_COLS].to_numpy(dtype=float)
+        n_b = len(values)
+        mean_b = values.mean(axis=0)
+        centered = values - mean_b
+        comoment_b = centered.T @ centered
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.comoment += comoment_b + np.outer(delta, delta) * self.n * n_b / n
+        self.mean += delta * n_b / n
+        self.n = n
+
+        stress = values[:, -1]
+        self.stress_min = min(self.stress_min, stress.min())
+        self.stress_max = max(self.stress_max, stress.max())
+        self.hist += np.histogram(np.clip(stress, 0, 100), bins=self.HIST_BINS)[0]
+        for category, count in chunk['category'].value_counts().items():
+            self.category_counts[category] = self.category_counts.get(category, 0) + int(count)
+
+        keyed = chunk.assign(_key=self._rng.random(n_b))
+        if self.sample is not None:
+            keyed = pd.concat([self.sample, keyed], ignore_index=True)
+        self.sample = (keyed.sort_values('_key')
+                       .groupby('category', sort=False).head(self.sample_per_category))
+
+    def _quantile(self, q):
+        cumulative = np.cumsum(self.hist)
+        index = np.searchsorted(cumulative, q * (cumulative[-1] - 1) + 1)
+        # Batas bawah bin: tepat untuk nilai yang sudah berkelipatan 0.1
+        return self.HIST_BINS[index]
+
+    def summary(self, progression_points=1000):
+        edges = self.HIST_BINS[:-1]
+        occupied = self.hist > 0
+        std = np.sqrt(np.diag(self.comoment) / max(self.n - 1, 1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(std, std) / max(self.n - 1, 1)
+        k = min(self.n, progression_points)
+        quantiles = np.array([self._quantile(q) for q in np.linspace(0, 1, k)])
+        return {
+            'n': self.n,
+            'stress_mean': self.mean[-1],
+            'stress_median': self._quantile(0.5),
+            'stress_std': std[-1],
+            'stress_min': self.stress_min,
+            'stress_max': self.stress_max,
+            'stress_nunique': int(occupied.sum()),
+            'stress_values': edges[occupied],
+            'stress_weights': self.hist[occupied],
+            'category_counts': pd.Series(self.category_counts).sort_values(ascending=False),
+            'corr': pd.DataFrame(corr, index=NUMERIC_COLS, columns=NUMERIC_COLS),
+            # Kurva terurut dari kuantil histogram, diskalakan ke jumlah baris penuh
+            'progression': (np.linspace(0, self.n - 1, k), quantiles),
+        }
+
+    def sample_frame(self):
+        return self.sample.drop(columns='_key').sort_values('id').reset_index(drop=True)
+
+
+def _dataset_bytes(csv_file):
+    start = history_index.normalize_timestamp(WINDOW_START)
+    end = history_index.normalize_timestamp(WINDOW_END)
+    return sum(os.path.getsize(p) for p in segments.segment_paths(csv_file, start, end))
+
+
+def use_streaming(csv_file):
+    if STREAMING_MODE != "auto":
+        return bool(STREAMING_MODE)
+    return _dataset_bytes(csv_file) > STREAMING_THRESHOLD_BYTES
+
+
+def generate_streaming(csv_file, output_dir='custom_results'):
+    """Mode out-of-core: baca per chunk, tulis test_results.csv bertahap,
+    kembalikan (sampel DataFrame, ringkasan) untuk plot & laporan."""
     os.makedirs(output_dir, exist_ok=True)
-    
-    plt.style.use('seaborn-v0_8-darkgrid')
-    sns.set_palette("husl")
-    
-    print("\n🎨 Creating Visualizations...\n")
-    
-    # ========================================
-    # 1. MAIN DASHBOARD (2x3 grid)
-    # ========================================
+    results_path = f'{output_dir}/test_results.csv'
+    aggregates = StreamingAggregates()
+    chunks = segments.iter_dataset_chunks(
+        csv_file,
+        history_index.normalize_timestamp(WINDOW_START),
+        history_index.normalize_timestamp(WINDOW_END),
+        CHUNK_ROWS
+    )
+    try:
+        rows_read = 0
+        for i, chunk in enumerate(chunks):
+            rows_read += len(chunk)
+            df_chunk = prepare_frame(chunk, id_start=aggregates.n + 1, verbose=(i == 0))
+            df_chunk.to_csv(results_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            aggregates.update(df_chunk)
+            print(f"   📦 Chunk {i + 1}: {rows_read} baris dibaca, {aggregates.n} valid")
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: {e}")
+        print(f"   Path yang dicoba: {os.path.abspath(csv_file)}")
+        return pd.DataFrame(), None
+    except ValueError as e:
+        print(f"❌ ERROR: {e}")
+        return pd.DataFrame(), None
+
+    if aggregates.n == 0:
+        print("❌ ERROR: Tidak ada data valid setelah pembersihan")
+        return pd.DataFrame(), None
+
+    print(f"\n✅ Berhasil memproses {aggregates.n} test cases (streaming)")
+    print(f"✅ Exported: test_results.csv")
+    return aggregates.sample_frame(), aggregates.summary()
+
+
+# ====================================
+# VISUALIZATION FUNCTIONS
+# ====================================
+CATEGORY_COLORS = {'Rendah': '#90EE90', 'Sedang': '#FFD700', 'Tinggi': '#FF6B6B',
+                   'Low': '#90EE90', 'Medium': '#FFD700', 'High': '#FF6B6B'}
+
+
+@report_render.produces('01_main_dashboard.png', columns=['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value'])
+def plot_main_dashboard(df, summary, output_dir):
     fig1, axes = plt.subplots(2, 3, figsize=(18, 10))
-    fig1.suptitle('Custom Test Cases - Fuzzy Logic Analysis Dashboard', 
+    fig1.suptitle('Custom Test Cases - Fuzzy Logic Analysis Dashboard',
                   fontsize=16, fontweight='bold')
-    
+
     # 1.1 Stress Value Distribution
-    unique_values = df['stress_value'].nunique()
-    stress_range = df['stress_value'].max() - df['stress_value'].min()
-    
+    unique_values = summary['stress_nunique']
+    stress_range = summary['stress_max'] - summary['stress_min']
+
     if unique_values == 1 or stress_range < 0.1:
-        stress_val = df['stress_value'].iloc[0]
-        axes[0, 0].bar([stress_val], [len(df)], color='skyblue', edgecolor='black', alpha=0.7, width=5)
+        stress_val = summary['stress_min']
+        axes[0, 0].bar([stress_val], [summary['n']], color='skyblue', edgecolor='black', alpha=0.7, width=5)
         axes[0, 0].set_xlim(max(0, stress_val - 10), min(100, stress_val + 10))
-        axes[0, 0].axvline(stress_val, color='red', linestyle='--', linewidth=2, 
+        axes[0, 0].axvline(stress_val, color='red', linestyle='--', linewidth=2,
                           label=f'Value: {stress_val:.1f}')
-        axes[0, 0].text(stress_val, len(df)/2, f'{len(df)} cases\n@ {stress_val:.1f}', 
+        axes[0, 0].text(stress_val, summary['n']/2, f"{summary['n']} cases\n@ {stress_val:.1f}",
                        ha='center', va='center', fontsize=12, fontweight='bold',
                        bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
     else:
         n_bins = min(max(3, unique_values), 10)
-        axes[0, 0].hist(df['stress_value'], bins=n_bins, color='skyblue', edgecolor='black', alpha=0.7)
-        axes[0, 0].axvline(df['stress_value'].mean(), color='red', 
-                          linestyle='--', linewidth=2, 
-                          label=f'Mean: {df["stress_value"].mean():.1f}')
-    
+        axes[0, 0].hist(summary['stress_values'], bins=n_bins, weights=summary['stress_weights'],
+                        color='skyblue', edgecolor='black', alpha=0.7)
+        axes[0, 0].axvline(summary['stress_mean'], color='red',
+                          linestyle='--', linewidth=2,
+                          label=f"Mean: {summary['stress_mean']:.1f}")
+
     axes[0, 0].set_title('Distribution of Stress Values', fontweight='bold')
     axes[0, 0].set_xlabel('Stress Value')
     axes[0, 0].set_ylabel('Frequency')
     axes[0, 0].legend()
     axes[0, 0].grid(alpha=0.3)
-    
+
     # 1.2 Category Distribution (Pie Chart)
-    cat_counts = df['category'].value_counts()
-    colors = {'Rendah': '#90EE90', 'Sedang': '#FFD700', 'Tinggi': '#FF6B6B',
-              'Low': '#90EE90', 'Medium': '#FFD700', 'High': '#FF6B6B'}
+    cat_counts = summary['category_counts']
     axes[0, 1].pie(cat_counts.values, labels=cat_counts.index, autopct='%1.1f%%',
-                   colors=[colors.get(cat, 'gray') for cat in cat_counts.index],
+                   colors=[CATEGORY_COLORS.get(cat, 'gray') for cat in cat_counts.index],
                    startangle=90, textprops={'fontsize': 10, 'fontweight': 'bold'})
     axes[0, 1].set_title('Category Distribution', fontweight='bold')
-    
-    # 1.3 Screen Time vs Stress
-    if df['stress_value'].nunique() > 1:
-        scatter1 = axes[0, 2].scatter(df['screentime'], df['stress_value'], 
-                                      c=df['stress_value'], cmap='RdYlGn_r', 
-                                      s=100, alpha=0.7, edgecolors='black')
-        plt.colorbar(scatter1, ax=axes[0, 2], label='Stress')
-    else:
-        axes[0, 2].scatter(df['screentime'], df['stress_value'], 
-                          color='red', s=100, alpha=0.7, edgecolors='black',
-                          label=f'Stress: {df["stress_value"].iloc[0]:.1f}')
-        axes[0, 2].legend()
-    
-    axes[0, 2].set_title('App Usage Time vs Stress', fontweight='bold')
-    axes[0, 2].set_xlabel('Total Usage Time (hours)')
-    axes[0, 2].set_ylabel('Stress Value')
-    axes[0, 2].grid(alpha=0.3)
-    
-    # 1.4 Temperature vs Stress
-    if df['stress_value'].nunique() > 1:
-        scatter2 = axes[1, 0].scatter(df['temperature'], df['stress_value'], 
-                                      c=df['stress_value'], cmap='RdYlGn_r', 
-                                      s=100, alpha=0.7, edgecolors='black')
-        plt.colorbar(scatter2, ax=axes[1, 0], label='Stress')
-    else:
-        axes[1, 0].scatter(df['temperature'], df['stress_value'], 
-                          color='red', s=100, alpha=0.7, edgecolors='black')
-    
-    axes[1, 0].set_title('Temperature vs Stress', fontweight='bold')
-    axes[1, 0].set_xlabel('Temperature (°C)')
-    axes[1, 0].set_ylabel('Stress Value')
-    axes[1, 0].grid(alpha=0.3)
-    
-    # 1.5 Humidity vs Stress
-    if df['stress_value'].nunique() > 1:
-        scatter3 = axes[1, 1].scatter(df['humidity'], df['stress_value'], 
-                                      c=df['stress_value'], cmap='RdYlGn_r', 
-                                      s=100, alpha=0.7, edgecolors='black')
-        plt.colorbar(scatter3, ax=axes[1, 1], label='Stress')
-    else:
-        axes[1, 1].scatter(df['humidity'], df['stress_value'], 
-                          color='red', s=100, alpha=0.7, edgecolors='black')
-    
-    axes[1, 1].set_title('Humidity vs Stress', fontweight='bold')
-    axes[1, 1].set_xlabel('Humidity (%)')
-    axes[1, 1].set_ylabel('Stress Value')
-    axes[1, 1].grid(alpha=0.3)
-    
-    # 1.6 Air Quality vs Stress
-    if df['stress_value'].nunique() > 1:
-        scatter4 = axes[1, 2].scatter(df['air_quality'], df['stress_value'], 
-                                      c=df['stress_value'], cmap='RdYlGn_r', 
-                                      s=100, alpha=0.7, edgecolors='black')
-        plt.colorbar(scatter4, ax=axes[1, 2], label='Stress')
-    else:
-        axes[1, 2].scatter(df['air_quality'], df['stress_value'], 
-                          color='red', s=100, alpha=0.7, edgecolors='black')
-    
-    axes[1, 2].set_title('Air Quality vs Stress', fontweight='bold')
-    axes[1, 2].set_xlabel('Air Quality (PPM)')
-    axes[1, 2].set_ylabel('Stress Value')
-    axes[1, 2].grid(alpha=0.3)
-    
+
+    # 1.3 - 1.6 Variabel input vs Stress
+    panels = [
+        (axes[0, 2], 'screentime', 'App Usage Time vs Stress', 'Total Usage Time (hours)'),
+        (axes[1, 0], 'temperature', 'Temperature vs Stress', 'Temperature (°C)'),
+        (axes[1, 1], 'humidity', 'Humidity vs Stress', 'Humidity (%)'),
+        (axes[1, 2], 'air_quality', 'Air Quality vs Stress', 'Air Quality (PPM)'),
+    ]
+    for ax, column, title, xlabel in panels:
+        if df['stress_value'].nunique() > 1:
+            scatter = ax.scatter(df[column], df['stress_value'],
+                                 c=df['stress_value'], cmap='RdYlGn_r',
+                                 s=100, alpha=0.7, edgecolors='black')
+            plt.colorbar(scatter, ax=ax, label='Stress')
+        elif column == 'screentime':
+            ax.scatter(df[column], df['stress_value'],
+                       color='red', s=100, alpha=0.7, edgecolors='black',
+                       label=f'Stress: {df["stress_value"].iloc[0]:.1f}')
+            ax.legend()
+        else:
+            ax.scatter(df[column], df['stress_value'],
+                       color='red', s=100, alpha=0.7, edgecolors='black')
+
+        ax.set_title(title, fontweight='bold')
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('Stress Value')
+        ax.grid(alpha=0.3)
+
     plt.tight_layout()
     fig1.savefig(f'{output_dir}/01_main_dashboard.png', dpi=300, bbox_inches='tight')
     print("✅ [1/5] Main Dashboard")
     plt.close(fig1)
-    
-    # ========================================
-    # 2. CORRELATION HEATMAP
-    # ========================================
+
+
+@report_render.produces('02_correlation_heatmap.png', columns=[])
+def plot_correlation_heatmap(df, summary, output_dir):
     fig2, ax = plt.subplots(figsize=(10, 8))
-    numeric_cols = ['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value']
-    corr_matrix = df[numeric_cols].corr()
-    
+    corr_matrix = summary['corr']
+
     sns.heatmap(corr_matrix, annot=True, fmt='.3f', cmap='coolwarm',
                 center=0, square=True, linewidths=2, cbar_kws={"shrink": 0.8},
                 vmin=-1, vmax=1, ax=ax)
-    ax.set_title('Correlation Matrix - Variables vs Stress', 
+    ax.set_title('Correlation Matrix - Variables vs Stress',
                  fontsize=14, fontweight='bold', pad=20)
-    
+
     fig2.tight_layout()
     fig2.savefig(f'{output_dir}/02_correlation_heatmap.png', dpi=300, bbox_inches='tight')
     print("✅ [2/5] Correlation Heatmap")
     plt.close(fig2)
-    
-    # ========================================
-    # 3. BOX PLOTS BY CATEGORY
-    # ========================================
-    if df['category'].nunique() > 1:
+
+
+@report_render.produces('03_boxplots_by_category.png', columns=['screentime', 'temperature', 'air_quality', 'category'])
+def plot_boxplots(df, summary, output_dir):
+    if len(summary['category_counts']) > 1:
         fig3, axes = plt.subplots(1, 3, figsize=(15, 5))
-        fig3.suptitle('Input Variables Distribution by Stress Category', 
+        fig3.suptitle('Input Variables Distribution by Stress Category',
                       fontsize=14, fontweight='bold')
-        
+
         for idx, var in enumerate(['screentime', 'temperature', 'air_quality']):
-            df.boxplot(column=var, by='category', ax=axes[idx], 
+            df.boxplot(column=var, by='category', ax=axes[idx],
                        patch_artist=True, grid=True)
             axes[idx].set_title(f'{var.capitalize()} by Category')
             axes[idx].set_xlabel('Stress Category')
             axes[idx].set_ylabel(var.capitalize())
             plt.sca(axes[idx])
             plt.xticks(rotation=0)
-        
+
         plt.tight_layout()
         fig3.savefig(f'{output_dir}/03_boxplots_by_category.png', dpi=300, bbox_inches='tight')
         print("✅ [3/5] Box Plots by Category")
         plt.close(fig3)
     else:
         print("⏭️  [3/5] Box Plots skipped (only 1 category)")
-    
-    # ========================================
-    # 4. VALIDATION TABLE
-    # ========================================
-    fig4, ax = plt.subplots(figsize=(16, len(df)*0.5 + 2))
+
+
+def table_mode(n_rows, n_total):
+    """Mode tabel validasi untuk df berisi n_rows dari n_total baris data."""
+    if TABLE_MODE != "auto":
+        return TABLE_MODE
+    if n_rows < n_total or n_rows > TABLE_ROWS_PER_PAGE * TABLE_MAX_PAGES:
+        return "summary"
+    return "paged"
+
+
+def stratified_sample(df, per_category=TABLE_SAMPLE_PER_CATEGORY, seed=0):
+    """Paling banyak per_category baris acak per kategori, urutan asli dipertahankan."""
+    shuffled = df.sample(frac=1, random_state=seed)
+    return shuffled.groupby('category', sort=False).head(per_category).sort_index()
+
+
+def table_cells(df):
+    """Teks sel dan warna sel tabel validasi, dibentuk per kolom (tanpa iterrows)."""
+    category = df['category'].astype(str)
+    emoji = np.select([category.isin(['Rendah', 'Low']), category.isin(['Sedang', 'Medium'])],
+                      ['🟢', '🟡'], '🔴')
+    columns = [
+        df['id'].tolist(),
+        [f"{v:.1f}h" for v in df['screentime']],
+        [f"{v:.1f}°C" for v in df['temperature']],
+        [f"{v:.0f}%" for v in df['humidity']],
+        [f"{v:.2f}" for v in df['air_quality']],
+        [f"{v:.1f}" for v in df['stress_value']],
+        [f"{e} {c}" for e, c in zip(emoji, category)],
+        df['description'].tolist(),
+    ]
+    cell_text = [list(row) for row in zip(*columns)]
+
+    stress = df['stress_value'].to_numpy()
+    stress_colors = np.select([stress < 35, stress < 65], ['#90EE90', '#FFD700'], '#FF6B6B')
+    return cell_text, stress_colors
+
+
+def _draw_table_page(cell_text, stress_colors, title):
+    fig, ax = plt.subplots(figsize=(16, len(cell_text)*0.5 + 2))
     ax.axis('tight')
     ax.axis('off')
-    
-    table_data = []
-    for _, row in df.iterrows():
-        if row['category'] in ['Rendah', 'Low']:
-            emoji = '🟢'
-        elif row['category'] in ['Sedang', 'Medium']:
-            emoji = '🟡'
-        else:
-            emoji = '🔴'
-        
-        table_data.append([
-            row['id'],
-            f"{row['screentime']:.1f}h",
-            f"{row['temperature']:.1f}°C",
-            f"{row['humidity']:.0f}%",
-            f"{row['air_quality']:.2f}",
-            f"{row['stress_value']:.1f}",
-            f"{emoji} {row['category']}",
-            row['description']
-        ])
-    
-    table = ax.table(cellText=table_data,
-                     colLabels=['ID', 'Screen', 'Temp', 'Humid', 'AQ', 
+
+    table = ax.table(cellText=cell_text,
+                     colLabels=['ID', 'Screen', 'Temp', 'Humid', 'AQ',
                                'Stress', 'Category', 'Description'],
                      cellLoc='center',
                      loc='center',
                      colWidths=[0.05, 0.08, 0.08, 0.08, 0.08, 0.08, 0.12, 0.43])
-    
+
     table.auto_set_font_size(False)
     table.set_fontsize(9)
     table.scale(1, 2.5)
-    
+
     # Color code
-    for i in range(len(table_data)):
-        stress_val = df.iloc[i]['stress_value']
-        if stress_val < 35:
-            table[(i+1, 5)].set_facecolor('#90EE90')
-        elif stress_val < 65:
-            table[(i+1, 5)].set_facecolor('#FFD700')
-        else:
-            table[(i+1, 5)].set_facecolor('#FF6B6B')
-    
-    plt.title(f'Test Cases Results Table ({len(df)} cases)', 
-              fontsize=14, fontweight='bold', pad=20)
-    
-    plt.savefig(f'{output_dir}/04_validation_table.png', dpi=300, bbox_inches='tight')
-    print("✅ [4/5] Validation Table")
-    plt.close(fig4)
-    
-    # ========================================
-    # 5. LINE PLOT PROGRESSION
-    # ========================================
+    for i, color in enumerate(stress_colors):
+        table[(i+1, 5)].set_facecolor(color)
+
+    plt.title(title, fontsize=14, fontweight='bold', pad=20)
+    return fig
+
+
+@report_render.produces('04_validation_table.png', '04_validation_table_p*.png',
+                        '04_validation_table.pdf')
+def plot_validation_table(df, summary, output_dir):
+    mode = table_mode(len(df), summary['n'])
+    title = f"Test Cases Results Table ({summary['n']} cases)"
+    if mode == "summary":
+        # Mode streaming: df sudah berupa sampel per kategori, disaring lagi di sini
+        df = stratified_sample(df)
+        counts = ", ".join(f"{cat} {count}" for cat, count in summary['category_counts'].items())
+        title = (f"Test Cases Results Table ({summary['n']} cases: {counts}; "
+                 f"sampel {TABLE_SAMPLE_PER_CATEGORY} per kategori)")
+
+    n_pages = max(1, -(-len(df) // TABLE_ROWS_PER_PAGE))
+    if n_pages > TABLE_MAX_PAGES:
+        print(f"⚠️  Tabel dibatasi {TABLE_MAX_PAGES} dari {n_pages} halaman")
+        n_pages = TABLE_MAX_PAGES
+
+    cell_text, stress_colors = table_cells(df.iloc[:n_pages * TABLE_ROWS_PER_PAGE])
+
+    # Halaman dari render sebelumnya (data lebih banyak) dibuang
+    for name in os.listdir(output_dir):
+        if re.fullmatch(r'04_validation_table_p\d+\.png', name):
+            os.remove(os.path.join(output_dir, name))
+
+    pdf = PdfPages(f'{output_dir}/04_validation_table.pdf') if TABLE_FORMAT == "pdf" else None
+    try:
+        for page in range(n_pages):
+            rows = slice(page * TABLE_ROWS_PER_PAGE, (page + 1) * TABLE_ROWS_PER_PAGE)
+            page_title = title if n_pages == 1 else f"{title} - halaman {page + 1}/{n_pages}"
+            fig4 = _draw_table_page(cell_text[rows], stress_colors[rows], page_title)
+            if pdf is not None:
+                pdf.savefig(fig4, bbox_inches='tight')
+            else:
+                suffix = "" if page == 0 else f"_p{page + 1}"
+                plt.savefig(f'{output_dir}/04_validation_table{suffix}.png', dpi=300, bbox_inches='tight')
+            plt.close(fig4)
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+    print(f"✅ [4/5] Validation Table ({mode}, {len(cell_text)} baris, {n_pages} halaman)")
+
+
+@report_render.produces('05_line_plot_progression.png', columns=[])
+def plot_progression(df, summary, output_dir):
     fig5, ax = plt.subplots(figsize=(14, 6))
-    
-    df_sorted = df.sort_values('stress_value').reset_index(drop=True)
-    
-    ax.plot(range(len(df_sorted)), df_sorted['stress_value'], 
-            marker='o', linewidth=2, markersize=8, color='purple',
-            label='Stress Value')
-    
-    ax.axhline(y=35, color='green', linestyle=':', linewidth=2, 
+
+    x, stress_sorted = summary['progression']
+    n_points = len(stress_sorted)
+
+    if n_points > PROGRESSION_LABEL_ALL:
+        labeled = report_render.key_points(stress_sorted, STRESS_BOUNDARIES)
+    else:
+        labeled = np.arange(n_points)
+
+    if n_points > PROGRESSION_MAX_POINTS:
+        # Titik berlabel ikut digambar agar label tetap berada di kurva
+        shown = np.union1d(report_render.lttb(x, stress_sorted, PROGRESSION_MAX_POINTS), labeled)
+        ax.plot(x[shown], stress_sorted[shown], linewidth=2, color='purple',
+                label=f'Stress Value ({len(shown)} dari {n_points} titik)')
+        ax.plot(x[labeled], stress_sorted[labeled], 'o', markersize=8, color='purple')
+        band_x = x[shown]
+    else:
+        ax.plot(x, stress_sorted,
+                marker='o', linewidth=2, markersize=8, color='purple',
+                label='Stress Value')
+        band_x = x
+
+    ax.axhline(y=35, color='green', linestyle=':', linewidth=2,
                label='Low/Medium Boundary')
-    ax.axhline(y=65, color='red', linestyle=':', linewidth=2, 
+    ax.axhline(y=65, color='red', linestyle=':', linewidth=2,
                label='Medium/High Boundary')
-    
-    ax.fill_between(range(len(df_sorted)), 0, 35, alpha=0.2, color='green')
-    ax.fill_between(range(len(df_sorted)), 35, 65, alpha=0.2, color='yellow')
-    ax.fill_between(range(len(df_sorted)), 65, 100, alpha=0.2, color='red')
-    
-    for i, row in df_sorted.iterrows():
-        ax.text(i, row['stress_value'] + 3, f"{row['stress_value']:.1f}", 
-                ha='center', fontsize=7, bbox=dict(facecolor='white', 
+
+    ax.fill_between(band_x, 0, 35, alpha=0.2, color='green')
+    ax.fill_between(band_x, 35, 65, alpha=0.2, color='yellow')
+    ax.fill_between(band_x, 65, 100, alpha=0.2, color='red')
+
+    for i in labeled:
+        value = stress_sorted[i]
+        ax.text(x[i], value + 3, f"{value:.1f}",
+                ha='center', fontsize=7, bbox=dict(facecolor='white',
                 alpha=0.7, boxstyle='round,pad=0.3'))
-    
-    ax.set_title('Stress Value Progression (Sorted)', 
+
+    ax.set_title('Stress Value Progression (Sorted)',
                  fontsize=14, fontweight='bold')
     ax.set_xlabel('Test Case Index (sorted by stress)')
     ax.set_ylabel('Stress Value (0-100)')
     ax.set_ylim(-5, 105)
     ax.legend(loc='upper left')
     ax.grid(alpha=0.3)
-    
+
     plt.tight_layout()
     fig5.savefig(f'{output_dir}/05_line_plot_progression.png', dpi=300, bbox_inches='tight')
     print("✅ [5/5] Line Plot Progression")
     plt.close(fig5)
-    
+
+
+FIGURES = [
+    plot_main_dashboard,
+    plot_correlation_heatmap,
+    plot_boxplots,
+    plot_validation_table,
+    plot_progression,
+]
+
+
+def create_visualizations(df, output_dir='custom_results', summary=None):
+    """Create all 5 visualization types
+
+    `summary` (dari StreamingAggregates) dipakai di mode streaming; df
+    kemudian hanya sampel untuk plot titik. Tanpa summary, ringkasan
+    dihitung dari df.
+    """
+
+    if df.empty:
+        print("❌ Tidak ada data untuk visualisasi.")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("\n🎨 Creating Visualizations...\n")
+
+    if summary is None:
+        summary = summarize(df)
+    report_render.render_figures(FIGURES, df, output_dir, summary, workers=RENDER_WORKERS,
+                                 cache=REPORT_CACHE)
+
     print(f"\n✅ All visualizations saved to: {output_dir}/\n")
 
 
 # ====================================
 # EXPORT FUNCTIONS
 # ====================================
-def export_results(df, output_dir='custom_results'):
-    """Export results to CSV and TXT"""
-    
+def export_results(df, output_dir='custom_results', summary=None):
+    """Export results to CSV and TXT
+
+    Di mode streaming (summary diberikan) test_results.csv sudah ditulis
+    per chunk, jadi hanya summary_report.txt yang dibuat.
+    """
+
     if df.empty:
         return
-    
-    df.to_csv(f'{output_dir}/test_results.csv', index=False)
-    print(f"✅ Exported: test_results.csv")
-    
+
+    if summary is None:
+        summary = summarize(df)
+        df.to_csv(f'{output_dir}/test_results.csv', index=False)
+        print(f"✅ Exported: test_results.csv")
+
     with open(f'{output_dir}/summary_report.txt', 'w', encoding='utf-8') as f:
         f.write("="*70 + "\n")
         f.write("CUSTOM TEST CASES - FUZZY LOGIC STRESS DETECTION\n")
         f.write("="*70 + "\n\n")
         f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total Test Cases: {len(df)}\n\n")
-        
+        f.write(f"Total Test Cases: {summary['n']}\n\n")
+
         f.write("STRESS STATISTICS:\n")
         f.write("-" * 70 + "\n")
-        f.write(f"Mean      : {df['stress_value'].mean():.2f}\n")
-        f.write(f"Median    : {df['stress_value'].median():.2f}\n")
-        f.write(f"Std Dev   : {df['stress_value'].std():.2f}\n")
-        f.write(f"Min       : {df['stress_value'].min():.2f}\n")
-        f.write(f"Max       : {df['stress_value'].max():.2f}\n\n")
-        
+        f.write(f"Mean      : {summary['stress_mean']:.2f}\n")
+        f.write(f"Median    : {summary['stress_median']:.2f}\n")
+        f.write(f"Std Dev   : {summary['stress_std']:.2f}\n")
+        f.write(f"Min       : {summary['stress_min']:.2f}\n")
+        f.write(f"Max       : {summary['stress_max']:.2f}\n\n")
+
         f.write("CATEGORY DISTRIBUTION:\n")
         f.write("-" * 70 + "\n")
-        cat_dist = df['category'].value_counts()
+        cat_dist = summary['category_counts']
         for cat, count in cat_dist.items():
-            pct = (count / len(df)) * 100
+            pct = (count / summary['n']) * 100
             f.write(f"{cat:8s}: {count:3d} cases ({pct:5.1f}%)\n")
-        
+
         f.write("\nCORRELATION WITH STRESS:\n")
         f.write("-" * 70 + "\n")
-        corr = df[['screentime', 'temperature', 'humidity', 'air_quality', 'stress_value']].corr()
+        corr = summary['corr']
         for var in ['screentime', 'temperature', 'humidity', 'air_quality']:
             f.write(f"{var:15s}: {corr.loc[var, 'stress_value']:+.4f}\n")
-    
+
     print(f"✅ Exported: summary_report.txt\n")
 
 
@@ -538,26 +836,34 @@ def export_results(df, output_dir='custom_results'):
 # MAIN
 # ====================================
 def main():
+    csv_file = data_layout.DataLayout('data').dataset_path(DEVICE_ID) if DEVICE_ID else YOUR_CSV_FILE
+    streaming = use_streaming(csv_file) if segments.segment_paths(csv_file) else False
     print("\n" + "="*70)
     print(" CUSTOM TEST CASE GENERATOR - FUZZY LOGIC STRESS DETECTION")
     print(" VERSION 2.0 - Smart Detection")
     print("="*70)
-    print(f" CSV File: {YOUR_CSV_FILE}")
+    print(f" CSV File: {csv_file}")
+    if streaming:
+        print(f" Mode: streaming (chunk {CHUNK_ROWS} baris)")
     print("="*70 + "\n")
-    
-    df_results = generate_from_csv(YOUR_CSV_FILE)
-    
+
+    output_dir = 'custom_results'
+    if streaming:
+        df_results, summary = generate_streaming(csv_file, output_dir)
+    else:
+        df_results = generate_from_csv(csv_file)
+        summary = summarize(df_results) if not df_results.empty else None
+
     if not df_results.empty:
         print(f"\n📊 Dataset Summary:")
-        print(f"   Total Cases: {len(df_results)}")
-        print(f"   Stress Range: {df_results['stress_value'].min():.1f} - {df_results['stress_value'].max():.1f}")
-        print(f"   Unique Stress Values: {df_results['stress_value'].nunique()}")
-        print(f"   Categories: {df_results['category'].value_counts().to_dict()}")
-        
-        output_dir = 'custom_results'
-        create_visualizations(df_results, output_dir)
-        export_results(df_results, output_dir)
-        
+        print(f"   Total Cases: {summary['n']}")
+        print(f"   Stress Range: {summary['stress_min']:.1f} - {summary['stress_max']:.1f}")
+        print(f"   Unique Stress Values: {summary['stress_nunique']}")
+        print(f"   Categories: {summary['category_counts'].to_dict()}")
+
+        create_visualizations(df_results, output_dir, summary)
+        export_results(df_results, output_dir, summary if streaming else None)
+
         print("\n" + "="*70)
         print("🎉 SELESAI! Cek folder 'custom_results' untuk hasil visualisasi")
         print("="*70)
@@ -566,4 +872,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
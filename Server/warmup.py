@@ -0,0 +1,92 @@
+"""
+Pemanasan komponen berat di background thread.
+
+Import `fuzzy_logic` (numpy + skfuzzy + membangun ControlSystem) memakan
+beberapa detik. Dengan BackgroundLoader, Flask bisa langsung bind port dan
+menjawab health check, sementara engine dimuat paralel. Setiap tahap
+dicatat durasinya (timings) untuk dilaporkan saat startup, di /health,
+dan di /metrics.
+"""
+
+import os
+import threading
+import time
+
+
+class NotReady(Exception):
+    pass
+
+
+class BackgroundLoader:
+    def __init__(self, name, steps, retry_after_s=5):
+        """`steps`: list (nama_tahap, fungsi); hasil fungsi terakhir menjadi `value`.
+
+        Jika pemuatan gagal, start()/wait() berikutnya mencoba lagi paling
+        cepat `retry_after_s` detik setelah kegagalan terakhir.
+        """
+        self.name = name
+        self.steps = steps
+        self.retry_after_s = retry_after_s
+        self.timings = {}
+        self.value = None
+        self.error = None
+        self._ready = threading.Event()
+        self._cond = threading.Condition()
+        self._pid = None          # proses yang sedang/sudah menjalankan thread pemuat
+        self._running = False
+        self._failed_at = None
+
+    def start(self):
+        with self._cond:
+            # Thread tidak ikut ter-fork (gunicorn --preload): mulai ulang di proses anak
+            if self._ready.is_set() or (self._pid == os.getpid() and self._running):
+                return
+            if (self._pid == os.getpid() and self._failed_at is not None
+                    and time.monotonic() - self._failed_at < self.retry_after_s):
+                return
+            self._pid = os.getpid()
+            self._running = True
+            threading.Thread(target=self._run, name=f"warmup-{self.name}", daemon=True).start()
+
+    def _run(self):
+        total_start = time.perf_counter()
+        try:
+            for step_name, func in self.steps:
+                start = time.perf_counter()
+                self.value = func()
+                self.timings[step_name] = time.perf_counter() - start
+        except Exception as e:
+            print(f"[WARMUP] Gagal memuat {self.name}: {type(e).__name__}: {e} "
+                  f"(dicoba lagi dalam {self.retry_after_s}s)")
+            with self._cond:
+                self.error = e
+                self._failed_at = time.monotonic()
+                self._running = False
+                self._cond.notify_all()
+            return
+        self.timings["total"] = time.perf_counter() - total_start
+        with self._cond:
+            self.error = None
+            self._running = False
+            self._ready.set()
+            self._cond.notify_all()
+        detail = ", ".join(f"{k}={v:.2f}s" for k, v in self.timings.items())
+        print(f"[WARMUP] {self.name} siap ({detail})")
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """True jika siap dalam `timeout` detik (berhenti lebih awal jika percobaan gagal)."""
+        self.start()
+        with self._cond:
+            self._cond.wait_for(lambda: self._ready.is_set() or not self._running, timeout)
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        if not self.wait(timeout):
+            if self.error is not None:
+                raise NotReady(f"{self.name} gagal dimuat: {self.error}")
+            raise NotReady(f"{self.name} belum siap")
+        return self.value